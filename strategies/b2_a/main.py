@@ -16,6 +16,7 @@ Rules (current):
 - Entry: buy selected top3 at 09:35; failed orders retry next minute.
 """
 
+import bisect
 import datetime
 
 try:
@@ -23,6 +24,25 @@ try:
 except Exception:
     xtdata = None
 
+try:
+    import qmt_common
+except ImportError:
+    import os
+    import sys
+
+    # Local runs: qmt_common.py lives in strategies/, next to this script's folder.
+    # QMT built-in scripts have no __file__ and need it on QMT's Python path.
+    _script_file = globals().get("__file__")
+    if _script_file:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(_script_file))))
+    try:
+        import qmt_common
+    except ImportError:
+        raise ImportError(
+            "qmt_common.py not found: copy strategies/qmt_common.py into the QMT "
+            "Python path (e.g. bin.x64/Lib/site-packages), see README.md"
+        ) from None
+
 
 # QMT ContextInfo variables roll back after handlebar; use global state.
 class G:
@@ -32,6 +52,11 @@ class G:
 g = G()
 
 STRATEGY_NAME = "b2_a"
+# One JSON line of stage timings / filter counts per day; "" disables the file.
+METRICS_FILE = qmt_common.default_metrics_path(STRATEGY_NAME)
+# "DEBUG" adds per-code diagnostics; log lines are printed once per bar.
+LOG_LEVEL = "INFO"
+LOG = qmt_common.BufferedLogger(STRATEGY_NAME, LOG_LEVEL)
 STRATEGY_REV = "2026-02-11-daily-pattern-zhixing-pullback6"
 
 # --- Config (confirm/adjust with final rules) ---
@@ -49,8 +74,10 @@ VOLUME_RATIO_WINDOW_END = datetime.time(9, 35)
 TRADING_MINUTES_PER_DAY = 240.0
 WATCHLIST_SIZE = 3
 WATCHLIST_TIME = datetime.time(9, 35)
+PATTERN_DAILY_BARS = 120
 
 MINUTE_BAR_PERIOD = "1m"
+# Initial codes per batch call; qmt_common.ChunkSizer adapts it from call timing.
 BATCH_FETCH_CHUNK_SIZE = 200
 
 TICK_SIZE = 0.01
@@ -77,6 +104,11 @@ ZHIXING_M2 = 28
 ZHIXING_M3 = 57
 ZHIXING_M4 = 114
 
+# Rolling MA periods kept by the intraday entry stream.
+ENTRY_STREAM_CLOSE_MA_PERIODS = (5, 10, ZHIXING_M1, ZHIXING_M2, ZHIXING_M3, ZHIXING_M4)
+ENTRY_STREAM_VOLUME_MA_PERIODS = (5,)
+ENTRY_STREAM_FIRST_FETCH_COUNT = 320
+
 SECOND_CANNON_MIN_FIRST_VOL_RATIO = 0.80
 SECOND_CANNON_VOL_MA_MULT = 1.00
 REBOUND_LOOKBACK = 5
@@ -106,11 +138,31 @@ UNIVERSE_SECTOR_NAMES = (
     "\u6caa\u6df1A\u80a1",  # HS A-share
     "A\u80a1",              # A-share
 )
+MAIN_BOARD_PREFIXES = frozenset(("600", "601", "603", "605", "000", "001", "002"))
 
 
 # --- QMT API adapters ---
 
 def get_universe(context):
+    """Return the main-board universe, cached per trading date.
+
+    Only non-empty results are cached, so callers that retry on an empty
+    universe still re-query the sector APIs.
+    """
+    now = _get_current_dt(context)
+    date_key = now.strftime("%Y%m%d") if now is not None else ""
+    cache = getattr(g, "universe_cache", None)
+    if cache and cache["date"] == date_key and cache["codes"]:
+        _log("universe_source=cache date={0} size={1}".format(date_key, len(cache["codes"])))
+        return list(cache["codes"])
+
+    codes = _resolve_universe(context)
+    if codes:
+        g.universe_cache = {"date": date_key, "codes": list(codes)}
+    return codes
+
+
+def _resolve_universe(context):
     """Return list of stock codes in universe.
 
     Priority:
@@ -167,7 +219,11 @@ def _normalize_main_board_codes(codes):
     normalized = []
     seen = set()
     for c in codes or []:
-        n = normalize_stock_code(c)
+        # Fast path: already "XXXXXX.SH" / "XXXXXX.SZ".
+        if type(c) is str and len(c) == 9 and c[6] == "." and c[7:] in ("SH", "SZ"):
+            n = c
+        else:
+            n = normalize_stock_code(c)
         if not n or (n in seen):
             continue
         if not is_main_board_a_share(n):
@@ -178,131 +234,51 @@ def _normalize_main_board_codes(codes):
 
 
 def _get_main_board_universe_from_sector(context):
-    """Load A-share list from sector APIs (context/global/xtdata)."""
-    all_codes = []
+    """Load A-share list from sector APIs (context/global/xtdata).
 
-    # context method in some QMT runtimes
+    Sources are tried in that order per sector name and the first one that
+    returns codes wins, since they expose the same sector lists.
+    """
+    getters = []
     if hasattr(context, "get_stock_list_in_sector"):
-        for name in UNIVERSE_SECTOR_NAMES:
-            try:
-                codes = context.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
-            except Exception:
-                pass
-
-    # global helper in some QMT runtimes
-    if "get_stock_list_in_sector" in globals():
-        func = globals().get("get_stock_list_in_sector")
-        if callable(func):
-            for name in UNIVERSE_SECTOR_NAMES:
-                try:
-                    codes = func(name)
-                    if codes:
-                        all_codes.extend(list(codes))
-                except Exception:
-                    pass
-
-    # xtdata fallback
-    if xtdata is not None:
-        for name in UNIVERSE_SECTOR_NAMES:
+        getters.append(context.get_stock_list_in_sector)
+    func = globals().get("get_stock_list_in_sector")
+    if callable(func):
+        getters.append(func)
+    xt_func = getattr(xtdata, "get_stock_list_in_sector", None) if xtdata is not None else None
+    if callable(xt_func):
+        getters.append(xt_func)
+
+    all_codes = []
+    for name in UNIVERSE_SECTOR_NAMES:
+        for getter in getters:
             try:
-                codes = xtdata.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
+                codes = getter(name)
             except Exception:
-                pass
-
+                continue
+            if codes:
+                all_codes.extend(list(codes))
+                break
     return all_codes
 
 
-def fetch_daily_bars(context, code, end_date, count):
-    """Return list of daily bars up to end_date (inclusive), ascending by date.
-
-    Each bar is a dict with keys: date, open, high, low, close, volume
-    date: "YYYYMMDD"
-    """
-    end_date = _normalize_trade_date(end_date)
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-
-    df = None
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                [code],
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            cur = data.get(code)
-            if cur is not None and (not cur.empty):
-                df = cur
-                break
-        except Exception:
-            continue
-    if df is None or df.empty:
-        return []
-
-    return _daily_df_to_bars(df)
+fetch_daily_bars = qmt_common.fetch_daily_bars
 
 
 def fetch_daily_bars_batch(context, codes, end_date, count):
-    """Batch fetch daily bars for codes.
+    """Batch fetch daily bars for codes; chunks adapt to observed latency.
 
     Return: dict(code -> bars list)
     """
-    result = {}
-    if not codes:
-        return result
-
-    end_date = _normalize_trade_date(end_date)
-    if not end_date:
-        return result
-
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-    data = {}
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                list(codes),
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            if data:
-                break
-        except Exception:
-            data = {}
-
-    if not data:
-        return result
-
-    for code in codes:
-        try:
-            df = data.get(code)
-            if df is None or df.empty:
-                continue
-            bars = _daily_df_to_bars(df)
-            if bars:
-                result[code] = bars
-        except Exception:
-            continue
-    return result
+    return qmt_common.fetch_daily_bars_batch(
+        context, codes, end_date, count, BATCH_FETCH_CHUNK_SIZE, getattr(g, "daily_fetch_sizer", None)
+    )
 
 
-def fetch_minute_bars(context, code, trade_date, end_time, count):
+def fetch_minute_bars(context, code, trade_date, end_time, count, start_time=""):
     """Return list of minute bars for trade_date up to end_time (inclusive).
 
+    start_time: optional "HH:MM" lower bound (inclusive); default is day start.
     Each bar is a dict with keys: time, open, high, low, close, volume
     time: "HH:MM"
     """
@@ -314,7 +290,10 @@ def fetch_minute_bars(context, code, trade_date, end_time, count):
     if len(end_hhmm) != 4:
         end_hhmm = "1500"
     end_ts = trade_date + end_hhmm + "00"
-    start_ts_day = trade_date + "090000"
+    start_hhmm = "".join(ch for ch in str(start_time) if ch.isdigit())[:4]
+    if len(start_hhmm) != 4:
+        start_hhmm = "0900"
+    start_ts_day = trade_date + start_hhmm + "00"
 
     # Historical minute bars in backtest are more stable with subscribe=False
     # and explicit same-day start/end range.
@@ -378,43 +357,71 @@ def fetch_minute_bars_batch(context, codes, trade_date, end_time, count):
         {"start_time": "", "end_time": end_ts, "subscribe": True, "count": count},
     ]
 
-    for batch_codes in _chunked_unique_codes(codes, BATCH_FETCH_CHUNK_SIZE):
-        pending = set(batch_codes)
-        for q in query_plan:
-            if not pending:
-                break
+    sizer = getattr(g, "minute_fetch_sizer", None) or qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
+    uniq = qmt_common.unique_codes(codes)
+    bars_per_code = max(count, 480)
+    failed_before = sizer.n_failed
+    for batch_codes in qmt_common.iter_adaptive_chunks(uniq, sizer, bars_per_code):
+        _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result)
+
+    # Same single retry as fetch_daily_bars_batch: leftovers, including whole
+    # chunks where every query raised, go again as smaller batches.
+    missing = [c for c in uniq if c not in result]
+    if missing and (result or sizer.n_failed > failed_before):
+        sizer.n_retry += len(missing)
+        for batch_codes in qmt_common.iter_adaptive_chunks(missing, sizer, bars_per_code, retry=True):
+            _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result)
+    return result
+
+
+def _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result):
+    """One chunk through query_plan, each query asking only for codes still pending.
+
+    A query that raises moves on to the next; the chunk counts as one failed
+    call only when no query answered.
+    """
+    pending = set(batch_codes)
+    answered = False
+    t_start = qmt_common.clock()
+    for q in query_plan:
+        if not pending:
+            break
+        t0 = qmt_common.clock()
+        try:
+            data = context.get_market_data_ex(
+                ["open", "high", "low", "close", "volume"],
+                list(pending),
+                period="1m",
+                start_time=q["start_time"],
+                end_time=q["end_time"],
+                count=q["count"],
+                dividend_type="none",
+                fill_data=True,
+                subscribe=q["subscribe"],
+            )
+        except Exception:
+            continue
+        answered = True
+        if not data:
+            sizer.record(len(pending), 0, qmt_common.clock() - t0)
+            continue
+        hit_codes = []
+        for code in pending:
             try:
-                data = context.get_market_data_ex(
-                    ["open", "high", "low", "close", "volume"],
-                    list(pending),
-                    period="1m",
-                    start_time=q["start_time"],
-                    end_time=q["end_time"],
-                    count=q["count"],
-                    dividend_type="none",
-                    fill_data=True,
-                    subscribe=q["subscribe"],
-                )
+                df = data.get(code)
             except Exception:
+                df = None
+            if df is None or df.empty:
                 continue
-            if not data:
-                continue
-            hit_codes = []
-            for code in pending:
-                try:
-                    df = data.get(code)
-                except Exception:
-                    df = None
-                if df is None or df.empty:
-                    continue
-                bars = _minute_df_to_bars(df, trade_date, end_hhmm)
-                if bars:
-                    result[code] = bars
-                    hit_codes.append(code)
-            for code in hit_codes:
-                pending.discard(code)
-
-    return result
+            bars = _minute_df_to_bars(df, trade_date, end_hhmm)
+            if bars:
+                result[code] = bars
+                hit_codes.append(code)
+        sizer.record(len(pending), len(hit_codes), qmt_common.clock() - t0)
+        for code in hit_codes:
+            pending.discard(code)
+    if not answered:
+        sizer.record(len(batch_codes), 0, qmt_common.clock() - t_start, ok=False)
 
 
 def get_current_price(context, code):
@@ -440,6 +447,72 @@ def get_current_price(context, code):
     return float(df["close"].iloc[-1])
 
 
+def get_current_prices(context, codes, now=None):
+    """Return latest prices for codes in one data call.
+
+    Return: dict(code -> price); codes without data are omitted.
+    """
+    prices = {}
+    for code, rows in get_latest_minute_bars(context, codes, now, count=1).items():
+        prices[code] = rows[-1]["close"]
+    return prices
+
+
+def get_latest_minute_bars(context, codes, now=None, count=2):
+    """Return the latest `count` minute bars for codes in one data call.
+
+    Return: dict(code -> list of {"date", "time", "close", "volume"}, ascending);
+    "time" is HHMM, rows may span the previous session, codes without data are
+    omitted.
+    """
+    result = {}
+    uniq = []
+    seen = set()
+    for c in codes or []:
+        if c and c not in seen:
+            seen.add(c)
+            uniq.append(c)
+    if not uniq:
+        return result
+
+    if now is None:
+        now = _get_current_dt(context)
+    if now is None:
+        return result
+    end_ts = now.strftime("%Y%m%d%H%M%S")
+    try:
+        data = context.get_market_data_ex(
+            ["close", "volume"],
+            uniq,
+            period="1m",
+            start_time="",
+            end_time=end_ts,
+            count=count,
+            dividend_type="none",
+            fill_data=True,
+            subscribe=True,
+        )
+    except Exception:
+        return result
+    if not data:
+        return result
+
+    for code in uniq:
+        try:
+            df = data.get(code)
+            if df is None or df.empty:
+                continue
+            rows = []
+            for idx, close, volume in zip(df.index, df["close"], df["volume"]):
+                d, hhmm = _extract_yyyymmdd_hhmm(idx)
+                rows.append({"date": d, "time": hhmm, "close": float(close), "volume": float(volume)})
+            if rows:
+                result[code] = rows
+        except Exception:
+            continue
+    return result
+
+
 def place_buy_order(context, code, cash_amount):
     """Place a buy order using cash_amount.
 
@@ -462,13 +535,50 @@ def place_buy_order(context, code, cash_amount):
             "",
             context,
         )
+        _invalidate_account_snapshot()
         return True
     except Exception:
         return False
 
 
 def get_available_cash(context):
-    """Return available cash."""
+    """Return available cash (from the per-bar account snapshot)."""
+    snap = _get_account_snapshot()
+    if "cash" not in snap:
+        snap["cash"] = _query_available_cash(context)
+    return snap["cash"]
+
+
+def get_positions(context):
+    """Return current positions as dict: code -> position quantity."""
+    snap = _get_account_snapshot()
+    if "positions" not in snap:
+        snap["positions"], snap["costs"] = _query_positions(context)
+    return dict(snap["positions"])
+
+def get_position_cost(context, code):
+    """Return average cost price for a position, or None if unavailable."""
+    snap = _get_account_snapshot()
+    if "costs" not in snap:
+        snap["positions"], snap["costs"] = _query_positions(context)
+    return snap["costs"].get(code)
+
+
+def _get_account_snapshot():
+    """Return account-state cache for the current bar, creating it on demand."""
+    snap = getattr(g, "account_snapshot", None)
+    if snap is None:
+        snap = {}
+        g.account_snapshot = snap
+    return snap
+
+
+def _invalidate_account_snapshot():
+    """Drop cached account state (new bar or after an order is placed)."""
+    g.account_snapshot = None
+
+
+def _query_available_cash(context):
     account_id = _get_account_id(context)
     if not account_id:
         return 0.0
@@ -481,36 +591,24 @@ def get_available_cash(context):
     return float(accounts[0].m_dAvailable)
 
 
-def get_positions(context):
-    """Return current positions as dict: code -> position quantity."""
+def _query_positions(context):
+    """Return (code -> quantity, code -> average cost) from one position query."""
     account_id = _get_account_id(context)
     if not account_id:
-        return {}
+        return {}, {}
     try:
         positions = get_trade_detail_data(account_id, ACCOUNT_TYPE, "position")
     except Exception:
-        return {}
+        return {}, {}
     pos = {}
+    costs = {}
     for p in positions:
         code = p.m_strInstrumentID + "." + p.m_strExchangeID
         qty = int(getattr(p, "m_nCanUseVolume", p.m_nVolume))
         pos[code] = qty
-    return pos
-
-def get_position_cost(context, code):
-    """Return average cost price for a position, or None if unavailable."""
-    account_id = _get_account_id(context)
-    if not account_id:
-        return None
-    try:
-        positions = get_trade_detail_data(account_id, ACCOUNT_TYPE, "position")
-    except Exception:
-        return None
-    for p in positions:
-        pos_code = p.m_strInstrumentID + "." + p.m_strExchangeID
-        if pos_code == code:
-            return float(getattr(p, "m_dOpenPrice", 0.0)) or None
-    return None
+        if code not in costs:
+            costs[code] = float(getattr(p, "m_dOpenPrice", 0.0)) or None
+    return pos, costs
 
 
 def place_sell_order(context, code, quantity):
@@ -535,20 +633,79 @@ def place_sell_order(context, code, quantity):
             "",
             context,
         )
+        _invalidate_account_snapshot()
         return True
     except Exception:
         return False
 
 
+def load_trading_calendar(context):
+    """Load the full SH trading-day list once per session.
+
+    Return: {"dates": sorted YYYYMMDD list, "index": date -> position,
+    "reloaded_for": date that last triggered a reload}.
+    """
+    dates = []
+    try:
+        raw = context.get_trading_dates("SH", "", "", -1, "1d")
+        dates = sorted(set(d for d in (_normalize_trade_date(x) for x in (raw or [])) if d))
+    except Exception:
+        dates = []
+    return {
+        "dates": dates,
+        "index": dict((d, i) for i, d in enumerate(dates)),
+        "reloaded_for": "",
+    }
+
+
+def trading_calendar_offset(context, date_str, offset):
+    """Return the trading date `offset` trading days away from date_str.
+
+    Trading dates are looked up by index; a non-trading date counts as lying
+    between its neighbouring trading days. Return "" when the result falls
+    outside the loaded calendar (callers then fall back to the data service).
+    """
+    cal = getattr(g, "trading_calendar", None)
+    date_str = _normalize_trade_date(date_str)
+    if not cal or not cal["dates"] or not date_str:
+        return ""
+
+    if date_str > cal["dates"][-1] and cal["reloaded_for"] != date_str:
+        # Session outlived the loaded list (e.g. ran into a new day): reload once.
+        fresh = load_trading_calendar(context)
+        if fresh["dates"]:
+            cal = fresh
+            g.trading_calendar = fresh
+        cal["reloaded_for"] = date_str
+
+    dates = cal["dates"]
+    idx = cal["index"].get(date_str)
+    if idx is not None:
+        idx += offset
+    elif offset == 0:
+        return ""
+    else:
+        pos = bisect.bisect_left(dates, date_str)
+        idx = pos + offset if offset < 0 else pos + offset - 1
+    if idx < 0 or idx >= len(dates):
+        return ""
+    return dates[idx]
+
+
 def get_trading_calendar_prev_date(context, date_str):
     """Return previous trading date for date_str (YYYYMMDD).
 
-    Default fallback only skips weekends; replace with QMT trading calendar.
+    Uses the session calendar loaded in init(); outside it, asks the data
+    service and finally falls back to skipping weekends only.
     """
     date_str = _normalize_trade_date(date_str)
     if not date_str:
         date_str = datetime.datetime.now().strftime("%Y%m%d")
 
+    prev = trading_calendar_offset(context, date_str, -1)
+    if prev:
+        return prev
+
     try:
         dates = context.get_trading_dates("SH", "", date_str, 2, "1d")
         if len(dates) >= 2:
@@ -582,6 +739,7 @@ def init(context):
     g.watchlist = []
     g.watchlist_built = False
     g.entry_patterns = {}
+    g.entry_streams = {}
     g.bought = set()
     g.pending_buy = {}
     g.pending_buy_stop_low = {}
@@ -593,6 +751,14 @@ def init(context):
     g.take_profit_state = {}
     g.exit_checked = None
     g.logged_once = set()
+    g.account_snapshot = None
+    g.trading_calendar = load_trading_calendar(context)
+    g.intraday_volume = {}
+    g.exit_daily_stats = None
+    g.daily_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
+    g.day_metrics = None
+    g.minute_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
+    g.bar_window_cache = None
 
     # initialize universe
     try:
@@ -603,21 +769,31 @@ def init(context):
         g.universe = []
 
     _log("init done, universe size={0}".format(len(g.universe)))
+    _log("trading_calendar loaded days={0}".format(len(g.trading_calendar["dates"])))
     _log("revision={0}".format(STRATEGY_REV))
     if g.universe:
         sample = ",".join(g.universe[:5])
         _log("universe sample={0}".format(sample))
     if not g.universe:
         _log("universe is empty; backtest may stop immediately")
+    LOG.flush()
 
 
 def handlebar(context):
-    """Called on each minute bar."""
+    """Called on each minute bar; buffered log lines are flushed after it."""
+    try:
+        _handlebar(context)
+    finally:
+        LOG.flush()
+
+
+def _handlebar(context):
     now = _get_current_dt(context)
     if now is None:
         return
 
     trade_date = now.strftime("%Y%m%d")
+    _invalidate_account_snapshot()
 
     # New trading day initialization
     if g.trade_date != trade_date:
@@ -625,7 +801,9 @@ def handlebar(context):
         g.watchlist_built = False
         g.watchlist = []
         g.entry_patterns = {}
+        g.entry_streams = {}
         g.bought = set()
+        g.intraday_volume = {}
         g.pending_buy = {}
         g.pending_buy_stop_low = {}
         g.entry_submitted = set()
@@ -662,12 +840,12 @@ def handlebar(context):
 
     entry_due = (now.time() >= WATCHLIST_TIME) or bool(fallback_reason)
 
+    # One batched price snapshot per bar, shared by entry and exit checks
+    prices = _snapshot_bar_prices(context, trade_date, now)
+
     # At/after 09:35, place entry for selected top3 once; failed orders retry next minute.
     for code in g.watchlist:
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -696,23 +874,85 @@ def handlebar(context):
             )
 
     # Profit-taking checks (any time)
-    _check_take_profit(context, now)
+    _check_take_profit(context, now, prices)
 
     # Stop-loss and volume-based exit checks at 14:45
     if now.time() >= STOP_CHECK_TIME and g.exit_checked != trade_date:
         _log_end_of_day_entry_stats(trade_date)
-        _check_stop_rules(context, trade_date, now)
+        _check_stop_rules(context, trade_date, now, prices)
         g.exit_checked = trade_date
 
 
 # --- Core logic ---
 
+def _snapshot_bar_prices(context, trade_date, now):
+    """Fetch current prices for watchlist + held codes once per bar.
+
+    The same call feeds the intraday volume tracker used by exit checks.
+    """
+    try:
+        positions = get_positions(context)
+    except Exception:
+        positions = {}
+    codes = list(g.watchlist) + [c for c in positions if c not in g.watchlist]
+    try:
+        bars_by_code = get_latest_minute_bars(context, codes, now, count=2)
+    except Exception:
+        return {}
+    _track_intraday_volume(trade_date, bars_by_code)
+    return dict((code, rows[-1]["close"]) for code, rows in bars_by_code.items())
+
+
+def _track_intraday_volume(trade_date, bars_by_code):
+    """Accumulate today's minute volume per code from the per-bar snapshot.
+
+    Each snapshot carries the latest two minute bars, so a bar's final volume is
+    added once the next bar appears. Codes first seen after the session's first
+    bar, or that skip a bar, are marked incomplete and exit checks fall back to
+    fetching the day's minute bars.
+    """
+    for code, rows in bars_by_code.items():
+        today = [r for r in rows if r["date"] == trade_date and r["time"]]
+        if not today:
+            continue
+        cur = today[-1]
+        st = g.intraday_volume.get(code)
+        if st is None:
+            # A lone bar for today means it is the session's first bar.
+            g.intraday_volume[code] = {
+                "time": cur["time"],
+                "closed": 0.0,
+                "last": cur["volume"],
+                "complete": len(today) == 1,
+            }
+            continue
+        if cur["time"] == st["time"]:
+            st["last"] = cur["volume"]
+            continue
+        if cur["time"] < st["time"]:
+            continue
+        if len(today) >= 2 and today[-2]["time"] == st["time"]:
+            st["closed"] += today[-2]["volume"]
+        else:
+            st["complete"] = False
+        st["time"] = cur["time"]
+        st["last"] = cur["volume"]
+
+
+def _intraday_cum_volume(code):
+    """Return today's cumulative volume from the tracker, or None if incomplete."""
+    st = g.intraday_volume.get(code)
+    if st is None or not st["complete"]:
+        return None
+    return st["closed"] + st["last"]
+
+
 def build_daily_candidates(context, t_date):
     candidates = []
     stats = {
         "total": 0,
         "batch_hit": 0,
-        "single_fallback_hit": 0,
+        "batch_miss": 0,
         "bars_short": 0,
         "kdj_t1_fail": 0,
         "kdj_t_fail": 0,
@@ -722,70 +962,78 @@ def build_daily_candidates(context, t_date):
     }
     stats["total"] = len(g.universe)
     short_samples = []
+    # Day metrics start here and are emitted once the watchlist is built.
+    metrics = qmt_common.RunMetrics(STRATEGY_NAME, g.trade_date)
+    g.day_metrics = metrics
+    metrics.set("t_date", t_date)
     daily_batch = {}
-    try:
-        daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_KDJ_N + 2)
-    except Exception:
-        daily_batch = {}
-    _log("daily_batch_fetch date={0} hit={1}".format(t_date, len(daily_batch)))
+    with metrics.stage("daily_fetch"):
+        try:
+            daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_KDJ_N + 2)
+        except Exception:
+            daily_batch = {}
+    metrics.set("daily_fetch", g.daily_fetch_sizer.summary())
+    metrics.set("batch_hit_rate", _hit_rate(len(daily_batch), len(g.universe)))
+    _log(
+        "daily_batch_fetch date={0} hit={1} {2}".format(
+            t_date, len(daily_batch), g.daily_fetch_sizer.describe(reset=True)
+        )
+    )
 
-    for code in g.universe:
-        if not is_main_board_a_share(code):
-            continue
+    with metrics.stage("daily_filter"):
+        for code in g.universe:
+            if not is_main_board_a_share(code):
+                continue
 
-        bars = daily_batch.get(code, [])
-        if bars:
-            stats["batch_hit"] += 1
-        else:
-            try:
-                bars = fetch_daily_bars(context, code, t_date, DAILY_KDJ_N + 2)
-            except Exception:
-                bars = []
+            # Misses were already retried as smaller batches inside the fetch.
+            bars = daily_batch.get(code, [])
             if bars:
-                stats["single_fallback_hit"] += 1
-
-        if len(bars) < DAILY_KDJ_N + 2:
-            stats["bars_short"] += 1
-            if len(short_samples) < 3:
-                short_samples.append("{0}:{1}".format(code, len(bars)))
-            continue
+                stats["batch_hit"] += 1
+            else:
+                stats["batch_miss"] += 1
+
+            if len(bars) < DAILY_KDJ_N + 2:
+                stats["bars_short"] += 1
+                if len(short_samples) < 3:
+                    short_samples.append("{0}:{1}".format(code, len(bars)))
+                continue
 
-        bar_t_minus1 = bars[-2]
-        bar_t = bars[-1]
+            bar_t_minus1 = bars[-2]
+            bar_t = bars[-1]
 
-        k_list, d_list, j_list = compute_kdj(bars, DAILY_KDJ_N, KDJ_INIT, KDJ_INIT)
-        if len(j_list) < 2:
-            continue
+            k_list, d_list, j_list = compute_kdj(bars, DAILY_KDJ_N, KDJ_INIT, KDJ_INIT)
+            if len(j_list) < 2:
+                continue
 
-        j_t_minus1 = j_list[-2]
-        j_t = j_list[-1]
+            j_t_minus1 = j_list[-2]
+            j_t = j_list[-1]
 
-        if j_t_minus1 >= J_T_MINUS1_MAX:
-            stats["kdj_t1_fail"] += 1
-            continue
-        if j_t >= J_T_MAX:
-            stats["kdj_t_fail"] += 1
-            continue
+            if j_t_minus1 >= J_T_MINUS1_MAX:
+                stats["kdj_t1_fail"] += 1
+                continue
+            if j_t >= J_T_MAX:
+                stats["kdj_t_fail"] += 1
+                continue
 
-        if not daily_return_ok(bar_t_minus1, bar_t):
-            stats["ret_fail"] += 1
-            continue
-        prev_vol = bar_t_minus1["volume"]
-        if prev_vol <= 0 or bar_t["volume"] < (prev_vol * DAILY_VOLUME_RATIO_MIN):
-            stats["vol_fail"] += 1
-            continue
-        if upper_shadow_ratio(bar_t) >= UPPER_SHADOW_MAX_RATIO:
-            stats["upper_shadow_fail"] += 1
-            continue
+            if not daily_return_ok(bar_t_minus1, bar_t):
+                stats["ret_fail"] += 1
+                continue
+            prev_vol = bar_t_minus1["volume"]
+            if prev_vol <= 0 or bar_t["volume"] < (prev_vol * DAILY_VOLUME_RATIO_MIN):
+                stats["vol_fail"] += 1
+                continue
+            if upper_shadow_ratio(bar_t) >= UPPER_SHADOW_MAX_RATIO:
+                stats["upper_shadow_fail"] += 1
+                continue
 
-        candidates.append(code)
+            candidates.append(code)
 
     _log(
-        "daily_filter_stats total={0} batch_hit={1} fallback_hit={2} bars_short={3} "
+        "daily_filter_stats total={0} batch_hit={1} batch_miss={2} bars_short={3} "
         "kdj_t1_fail={4} kdj_t_fail={5} ret_fail={6} vol_fail={7} upper_shadow_fail={8} pass={9}".format(
             stats["total"],
             stats["batch_hit"],
-            stats["single_fallback_hit"],
+            stats["batch_miss"],
             stats["bars_short"],
             stats["kdj_t1_fail"],
             stats["kdj_t_fail"],
@@ -797,6 +1045,8 @@ def build_daily_candidates(context, t_date):
     )
     if short_samples:
         _log("bars_short_samples t_date={0} {1}".format(t_date, ",".join(short_samples)))
+    metrics.update_counters(stats, "daily.")
+    metrics.count("daily.pass", len(candidates))
     return candidates
 
 
@@ -814,26 +1064,45 @@ def build_watchlist(context, trade_date, now):
     pattern_date = get_trading_calendar_prev_date(context, trade_date)
     _log("graphic_pattern_date={0}".format(pattern_date))
     _log("ranking_metric=daily_volume_ratio(T/avg5)")
-    for code in g.daily_candidates:
-        matched, sig = _match_graphic_pattern_with_signal_on_date(context, code, pattern_date)
-        if sig.get("first_hit", False):
-            stats["sig_first_hit"] += 1
-        if sig.get("second_checked", False):
-            stats["sig_second_checked"] += 1
-        if sig.get("second_pass", False):
-            stats["sig_second_pass"] += 1
-
-        if not matched:
-            stats["pattern_fail"] += 1
-            reason = sig.get("fail_reason", "unknown")
-            fail_reason_counts[reason] = fail_reason_counts.get(reason, 0) + 1
-            continue
+    metrics = g.day_metrics or qmt_common.RunMetrics(STRATEGY_NAME, trade_date)
+    daily_batch = {}
+    with metrics.stage("pattern_fetch"):
+        try:
+            daily_batch = fetch_daily_bars_batch(
+                context, g.daily_candidates, pattern_date, PATTERN_DAILY_BARS
+            )
+        except Exception:
+            daily_batch = {}
+    metrics.set("pattern_fetch", g.daily_fetch_sizer.summary())
+    _log(
+        "pattern_batch_fetch date={0} hit={1} {2}".format(
+            pattern_date, len(daily_batch), g.daily_fetch_sizer.describe(reset=True)
+        )
+    )
+    with metrics.stage("pattern_filter"):
+        for code in g.daily_candidates:
+            bars = daily_batch.get(code)
+            matched, sig = _match_graphic_pattern_with_signal_on_date(
+                context, code, pattern_date, bars=bars
+            )
+            if sig.get("first_hit", False):
+                stats["sig_first_hit"] += 1
+            if sig.get("second_checked", False):
+                stats["sig_second_checked"] += 1
+            if sig.get("second_pass", False):
+                stats["sig_second_pass"] += 1
+
+            if not matched:
+                stats["pattern_fail"] += 1
+                reason = sig.get("fail_reason", "unknown")
+                fail_reason_counts[reason] = fail_reason_counts.get(reason, 0) + 1
+                continue
 
-        rank_score = _daily_volume_ratio_score(context, code, pattern_date)
-        if rank_score is None:
-            stats["daily_rank_none"] += 1
-            continue
-        ranked.append((code, rank_score))
+            rank_score = _daily_volume_ratio_score(context, code, pattern_date, bars=bars)
+            if rank_score is None:
+                stats["daily_rank_none"] += 1
+                continue
+            ranked.append((code, rank_score))
 
     ranked.sort(key=lambda x: x[1], reverse=True)
     watchlist = [code for code, _ in ranked[:WATCHLIST_SIZE]]
@@ -863,18 +1132,24 @@ def build_watchlist(context, trade_date, now):
     if ranked:
         top = ",".join(["{0}:{1:.2f}".format(c, v) for c, v in ranked[:5]])
         _log("watchlist_rank_top={0}".format(top))
+    metrics.update_counters(stats, "watchlist.")
+    metrics.update_counters(fail_reason_counts, "pattern_fail.")
+    metrics.count("watchlist.selected", len(watchlist))
+    metrics.emit(_log, METRICS_FILE)
     return watchlist
 
 
-def _daily_volume_ratio_score(context, code, end_date):
+def _daily_volume_ratio_score(context, code, end_date, bars=None):
     """Daily ranking ratio.
 
     ratio = volume(T) / avg volume(T-1 ... T-5)
+    bars: optional prefetched daily bars ending at end_date.
     """
-    try:
-        bars = fetch_daily_bars(context, code, end_date, 6)
-    except Exception:
-        return None
+    if not bars:
+        try:
+            bars = fetch_daily_bars(context, code, end_date, 6)
+        except Exception:
+            return None
     if len(bars) < 6:
         return None
 
@@ -888,11 +1163,22 @@ def _daily_volume_ratio_score(context, code, end_date):
 
 
 def _process_b2_a_entry(context, code, trade_date, now, price):
-    """Evaluate b2_a entry state machine and place order on second cannon."""
+    """Evaluate b2_a entry state machine and place order on second cannon.
+
+    Minute bars are streamed per code: each call fetches only bars newer than
+    the last one seen and pushes them into rolling MA sums, so each bar is
+    evaluated once with O(1) indicator lookups.
+    """
+    stream = g.entry_streams.get(code)
+    if stream is None:
+        stream = _new_entry_stream()
+        g.entry_streams[code] = stream
+
     try:
-        bars = fetch_minute_bars(context, code, trade_date, now.strftime("%H:%M"), 320)
+        _fetch_entry_stream_bars(context, code, trade_date, now, stream)
     except Exception:
         return False
+    bars = stream["bars"]
     if not bars:
         return False
 
@@ -902,13 +1188,16 @@ def _process_b2_a_entry(context, code, trade_date, now, price):
         _reset_entry_pattern_state(state, "")
 
     triggered = False
-    for idx, bar in enumerate(bars):
+    while stream["next_idx"] < len(bars):
+        idx = stream["next_idx"]
+        stream["next_idx"] = idx + 1
+        bar = bars[idx]
         hhmm = bar.get("time", "")
         if (not hhmm) or hhmm <= state.get("last_bar_time", ""):
             continue
 
         if state.get("stage") == "wait_first":
-            ok, zone_high = _is_first_cannon_bar(bars, idx)
+            ok, zone_high = _is_first_cannon_bar(bars, idx, stream)
             if ok:
                 state["stage"] = "wait_pullback"
                 state["first_idx"] = idx
@@ -927,7 +1216,7 @@ def _process_b2_a_entry(context, code, trade_date, now, price):
                 state["last_bar_time"] = hhmm
                 continue
 
-            zhixing_line = _zhixing_duokong_line_on_close(bars, idx)
+            zhixing_line = _zhixing_duokong_line_on_close(bars, idx, stream)
             if zhixing_line is not None and float(bar["close"]) < zhixing_line:
                 _reset_entry_pattern_state(state, hhmm)
                 continue
@@ -937,7 +1226,7 @@ def _process_b2_a_entry(context, code, trade_date, now, price):
                 continue
 
             min_gap_for_second = PULLBACK_MIN_BARS + 1
-            if gap >= min_gap_for_second and _is_second_cannon_bar(bars, idx, state):
+            if gap >= min_gap_for_second and _is_second_cannon_bar(bars, idx, state, stream):
                 stop_low = state.get("pullback_low")
                 if stop_low is None:
                     stop_low = float(bar["low"])
@@ -965,19 +1254,109 @@ def _process_b2_a_entry(context, code, trade_date, now, price):
     return triggered
 
 
-def _match_graphic_pattern_with_signal_on_date(context, code, trade_date):
-    """Return (matched, signal) for b2_a graphic pattern on daily bars."""
+def _new_entry_stream():
+    """Return empty per-code minute-bar stream with rolling MA sums."""
+    return {
+        "bars": [],
+        "next_idx": 0,
+        "close_sums": dict((p, 0.0) for p in ENTRY_STREAM_CLOSE_MA_PERIODS),
+        "volume_sums": dict((p, 0.0) for p in ENTRY_STREAM_VOLUME_MA_PERIODS),
+        "close_ma": dict((p, []) for p in ENTRY_STREAM_CLOSE_MA_PERIODS),
+        "volume_ma": dict((p, []) for p in ENTRY_STREAM_VOLUME_MA_PERIODS),
+    }
+
+
+def _fetch_entry_stream_bars(context, code, trade_date, now, stream):
+    """Fetch minute bars newer than the stream tail and push them.
+
+    The tail bar is re-fetched and replaced, so a bar that was still forming
+    on the previous call is completed before later bars use it.
+    """
+    bars = stream["bars"]
+    end_hhmm = now.strftime("%H:%M")
+    if not bars:
+        new_bars = fetch_minute_bars(
+            context, code, trade_date, end_hhmm, ENTRY_STREAM_FIRST_FETCH_COUNT
+        )
+    else:
+        last_time = bars[-1]["time"]
+        count = int(_elapsed_minutes_between_hhmm(last_time, end_hhmm)) + 2
+        new_bars = fetch_minute_bars(
+            context, code, trade_date, end_hhmm, count, start_time=last_time
+        )
+
+    for bar in new_bars:
+        hhmm = bar.get("time", "")
+        if not hhmm:
+            continue
+        if bars:
+            last_time = bars[-1]["time"]
+            if hhmm < last_time:
+                continue
+            if hhmm == last_time:
+                _entry_stream_pop(stream)
+        _entry_stream_push(stream, bar)
+
+
+def _entry_stream_push(stream, bar):
+    bars = stream["bars"]
+    bars.append(bar)
+    n = len(bars)
+    close = float(bar["close"])
+    volume = float(bar["volume"])
+    for period, total in stream["close_sums"].items():
+        total += close
+        if n > period:
+            total -= float(bars[n - 1 - period]["close"])
+        stream["close_sums"][period] = total
+        stream["close_ma"][period].append(total / float(period) if n >= period else None)
+    for period, total in stream["volume_sums"].items():
+        total += volume
+        if n > period:
+            total -= float(bars[n - 1 - period]["volume"])
+        stream["volume_sums"][period] = total
+        stream["volume_ma"][period].append(total / float(period) if n >= period else None)
+
+
+def _entry_stream_pop(stream):
+    bars = stream["bars"]
+    n = len(bars)
+    bar = bars.pop()
+    close = float(bar["close"])
+    volume = float(bar["volume"])
+    for period, total in stream["close_sums"].items():
+        total -= close
+        if n > period:
+            total += float(bars[n - 1 - period]["close"])
+        stream["close_sums"][period] = total
+        stream["close_ma"][period].pop()
+    for period, total in stream["volume_sums"].items():
+        total -= volume
+        if n > period:
+            total += float(bars[n - 1 - period]["volume"])
+        stream["volume_sums"][period] = total
+        stream["volume_ma"][period].pop()
+    if stream["next_idx"] > len(bars):
+        stream["next_idx"] = len(bars)
+
+
+def _match_graphic_pattern_with_signal_on_date(context, code, trade_date, bars=None):
+    """Return (matched, signal) for b2_a graphic pattern on daily bars.
+
+    bars: optional prefetched daily bars ending at trade_date.
+    """
     signal = {
         "first_hit": False,
         "second_checked": False,
         "second_pass": False,
         "fail_reason": "unknown",
     }
-    try:
-        bars = fetch_daily_bars(context, code, trade_date, 120)
-    except Exception:
-        signal["fail_reason"] = "daily_fetch_error"
-        return False, signal
+    if not bars:
+        try:
+            bars = fetch_daily_bars(context, code, trade_date, PATTERN_DAILY_BARS)
+        except Exception:
+            signal["fail_reason"] = "daily_fetch_error"
+            return False, signal
     if not bars:
         signal["fail_reason"] = "bars_empty"
         return False, signal
@@ -1099,7 +1478,7 @@ def _reset_entry_pattern_state(state, last_bar_time):
     )
 
 
-def _is_first_cannon_bar(bars, idx):
+def _is_first_cannon_bar(bars, idx, stream=None):
     if idx <= 0:
         return False, 0.0
 
@@ -1118,13 +1497,13 @@ def _is_first_cannon_bar(bars, idx):
     if (body / total) < FIRST_CANNON_BODY_MIN_RATIO:
         return False, 0.0
 
-    vol_ma = _ma_on_volume(bars, idx - 1, 5)
+    vol_ma = _ma_on_volume(bars, idx - 1, 5, stream)
     if vol_ma is None or vol_ma <= 0:
         return False, 0.0
     if float(bar["volume"]) < vol_ma * FIRST_CANNON_VOL_MA_MULT:
         return False, 0.0
 
-    parallel_ok, zone_high = _parallel_context_ok(bars, idx - 1)
+    parallel_ok, zone_high = _parallel_context_ok(bars, idx - 1, stream)
     if not parallel_ok:
         return False, 0.0
     if close <= (zone_high + TICK_SIZE):
@@ -1132,12 +1511,12 @@ def _is_first_cannon_bar(bars, idx):
     return True, zone_high
 
 
-def _is_second_cannon_bar(bars, idx, state):
-    ok, _ = _is_second_cannon_bar_with_reason(bars, idx, state)
+def _is_second_cannon_bar(bars, idx, state, stream=None):
+    ok, _ = _is_second_cannon_bar_with_reason(bars, idx, state, stream)
     return ok
 
 
-def _is_second_cannon_bar_with_reason(bars, idx, state):
+def _is_second_cannon_bar_with_reason(bars, idx, state, stream=None):
     if idx <= 1:
         return False, "idx_too_small"
     pullback_low = state.get("pullback_low")
@@ -1166,7 +1545,7 @@ def _is_second_cannon_bar_with_reason(bars, idx, state):
     if prev_close > (recent_min + REBOUND_LOCAL_LOW_TICKS * TICK_SIZE):
         return False, "rebound_prev_not_local_low"
 
-    vol_ma = _ma_on_volume(bars, idx - 1, 5)
+    vol_ma = _ma_on_volume(bars, idx - 1, 5, stream)
     if vol_ma is None or vol_ma <= 0:
         return False, "vol_ma_invalid"
 
@@ -1178,7 +1557,7 @@ def _is_second_cannon_bar_with_reason(bars, idx, state):
     return True, "ok"
 
 
-def _parallel_context_ok(bars, end_idx):
+def _parallel_context_ok(bars, end_idx, stream=None):
     start_idx = end_idx - PARALLEL_LOOKBACK + 1
     if start_idx < 0:
         return False, 0.0
@@ -1189,8 +1568,8 @@ def _parallel_context_ok(bars, end_idx):
     zone_low = None
 
     for i in range(start_idx, end_idx + 1):
-        ma5 = _ma_on_close(bars, i, 5)
-        ma10 = _ma_on_close(bars, i, 10)
+        ma5 = _ma_on_close(bars, i, 5, stream)
+        ma10 = _ma_on_close(bars, i, 10, stream)
         if ma5 is None or ma10 is None or ma10 <= 0:
             return False, 0.0
 
@@ -1226,35 +1605,72 @@ def _parallel_context_ok(bars, end_idx):
     return True, zone_high
 
 
-def _ma_on_close(bars, end_idx, period):
+def _ma_on_close(bars, end_idx, period, stream=None):
     if end_idx < 0:
         return None
-    start_idx = end_idx - period + 1
-    if start_idx < 0:
+    if stream is not None and period in stream["close_ma"]:
+        return stream["close_ma"][period][end_idx]
+    if end_idx - period + 1 < 0:
         return None
-    total = 0.0
-    for i in range(start_idx, end_idx + 1):
-        total += float(bars[i]["close"])
-    return total / float(period)
+    return _window_mean(bars, "close", end_idx, period)
 
 
-def _ma_on_volume(bars, end_idx, period):
+def _ma_on_volume(bars, end_idx, period, stream=None):
     if end_idx < 0:
         return None
-    start_idx = end_idx - period + 1
-    if start_idx < 0:
+    if stream is not None and period in stream["volume_ma"]:
+        return stream["volume_ma"][period][end_idx]
+    if end_idx - period + 1 < 0:
         return None
-    total = 0.0
-    for i in range(start_idx, end_idx + 1):
-        total += float(bars[i]["volume"])
-    return total / float(period)
+    return _window_mean(bars, "volume", end_idx, period)
 
 
-def _zhixing_duokong_line_on_close(bars, idx):
-    ma1 = _ma_on_close(bars, idx, ZHIXING_M1)
-    ma2 = _ma_on_close(bars, idx, ZHIXING_M2)
-    ma3 = _ma_on_close(bars, idx, ZHIXING_M3)
-    ma4 = _ma_on_close(bars, idx, ZHIXING_M4)
+def _window_mean(bars, field, end_idx, period):
+    """Mean of bars[end_idx-period+1 .. end_idx][field], memoized per bars list.
+
+    Summed oldest-first like the original loop, so values are bit-identical
+    to it (prefix-sum differences are not); repeated pattern checks on the
+    same bars then cost one dict lookup.
+    """
+    means = _bar_window_cache(bars)["means"]
+    key = (field, period, end_idx)
+    value = means.get(key)
+    if value is None:
+        total = 0.0
+        for i in range(end_idx - period + 1, end_idx + 1):
+            total += float(bars[i][field])
+        value = total / float(period)
+        means[key] = value
+    return value
+
+
+def _bar_window_cache(bars):
+    """Return the window-mean memo for bars.
+
+    Kept for the most recent bars list (held by reference, so ids are never
+    reused); kept while that list only grows, reset if it shrank or its last
+    seen bar was replaced.
+    """
+    cache = getattr(g, "bar_window_cache", None)
+    size = len(bars)
+    if (
+        cache is None
+        or cache["bars"] is not bars
+        or cache["size"] > size
+        or (cache["size"] > 0 and bars[cache["size"] - 1] is not cache["tail"])
+    ):
+        cache = {"bars": bars, "means": {}}
+        g.bar_window_cache = cache
+    cache["size"] = size
+    cache["tail"] = bars[-1] if bars else None
+    return cache
+
+
+def _zhixing_duokong_line_on_close(bars, idx, stream=None):
+    ma1 = _ma_on_close(bars, idx, ZHIXING_M1, stream)
+    ma2 = _ma_on_close(bars, idx, ZHIXING_M2, stream)
+    ma3 = _ma_on_close(bars, idx, ZHIXING_M3, stream)
+    ma4 = _ma_on_close(bars, idx, ZHIXING_M4, stream)
     if ma1 is None or ma2 is None or ma3 is None or ma4 is None:
         return None
     return (ma1 + ma2 + ma3 + ma4) / 4.0
@@ -1328,7 +1744,7 @@ def _try_place_buy(context, code, price, now, stop_low=None):
         )
 
 
-def _check_take_profit(context, now):
+def _check_take_profit(context, now, prices):
     try:
         positions = get_positions(context)
     except Exception:
@@ -1341,10 +1757,7 @@ def _check_take_profit(context, now):
         if qty <= 0:
             continue
 
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -1367,7 +1780,7 @@ def _check_take_profit(context, now):
             g.take_profit_state[code] = 2
 
 
-def _check_stop_rules(context, trade_date, now):
+def _check_stop_rules(context, trade_date, now, prices):
     try:
         positions = get_positions(context)
     except Exception:
@@ -1376,15 +1789,15 @@ def _check_stop_rules(context, trade_date, now):
     if not positions:
         return
 
+    # One daily batch for all held codes; is_today_down_and_volume_expand reads it.
+    _get_exit_daily_stats(context, trade_date, [c for c, q in positions.items() if q > 0])
+
     for code, qty in positions.items():
         if qty <= 0:
             continue
 
         # Rule 1: stop loss if current price < buy day low
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -1394,7 +1807,7 @@ def _check_stop_rules(context, trade_date, now):
             continue
 
         # Rule 3: if today down, and today's volume > yesterday and > avg5, then clear
-        if is_today_down_and_volume_expand(context, code, trade_date, now):
+        if is_today_down_and_volume_expand(context, code, trade_date, now, current_price=price):
             _sell_all(context, code, qty)
 
 
@@ -1490,76 +1903,79 @@ def calc_volume_ratio(context, code, trade_date, now):
     window_end = min(now_hhmm, VOLUME_RATIO_WINDOW_END.strftime("%H:%M"))
     elapsed_minutes = _elapsed_minutes_between_hhmm(window_start, window_end)
     if elapsed_minutes <= 0:
-        _log("vol_ratio_debug code={0} date={1} elapsed_minutes=0 window={2}-{3}".format(
-            code, trade_date, window_start, window_end))
+        _log_debug("vol_ratio_debug code={0} date={1} elapsed_minutes=0 window={2}-{3}",
+            code, trade_date, window_start, window_end)
         return None
 
     try:
         bars = fetch_minute_bars(context, code, trade_date, window_end, 300)
     except Exception:
-        _log("vol_ratio_debug code={0} date={1} ERROR fetching today bars".format(code, trade_date))
+        _log_debug("vol_ratio_debug code={0} date={1} ERROR fetching today bars", code, trade_date)
         return None
 
     if not bars:
-        _log("vol_ratio_debug code={0} date={1} today_bars=EMPTY".format(code, trade_date))
+        _log_debug("vol_ratio_debug code={0} date={1} today_bars=EMPTY", code, trade_date)
         return None
 
     today_cum = _sum_window_volume(bars, window_start, window_end)
     if today_cum <= 0:
-        _log("vol_ratio_debug code={0} date={1} today_cum=0 (bars_count={2} window={3}-{4})".format(
-            code, trade_date, len(bars), window_start, window_end))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum=0 (bars_count={2} window={3}-{4})",
+            code, trade_date, len(bars), window_start, window_end)
         return None
     today_per_min = today_cum / elapsed_minutes
 
     prev_dates = get_prev_trading_dates(context, trade_date, 5)
     if len(prev_dates) < 5:
-        _log("vol_ratio_debug code={0} date={1} prev_dates_count={2} (need 5)".format(
-            code, trade_date, len(prev_dates)))
+        _log_debug("vol_ratio_debug code={0} date={1} prev_dates_count={2} (need 5)",
+            code, trade_date, len(prev_dates))
         return None
 
     hist_per_min_list = []
     cum_detail = []
+    debug = LOG.debug_enabled
     for d in prev_dates:
         try:
             d_bars = fetch_minute_bars(context, code, d, "15:00", 600)
         except Exception:
-            cum_detail.append("{0}=ERR".format(d))
+            if debug:
+                cum_detail.append("{0}=ERR".format(d))
             continue
         if not d_bars:
-            cum_detail.append("{0}=EMPTY".format(d))
+            if debug:
+                cum_detail.append("{0}=EMPTY".format(d))
             continue
         d_total = _sum_continuous_session_volume(d_bars)
         d_per_min = d_total / TRADING_MINUTES_PER_DAY if TRADING_MINUTES_PER_DAY > 0 else 0.0
-        cum_detail.append(
-            "{0}={1:.0f}/{2:.0f}m={3:.2f}".format(d, d_total, TRADING_MINUTES_PER_DAY, d_per_min)
-        )
+        if debug:
+            cum_detail.append(
+                "{0}={1:.0f}/{2:.0f}m={3:.2f}".format(d, d_total, TRADING_MINUTES_PER_DAY, d_per_min)
+            )
         if d_total > 0:
             hist_per_min_list.append(d_per_min)
 
     if len(hist_per_min_list) < 5:
-        _log("vol_ratio_debug code={0} date={1} today_cum={2:.0f} hist_valid={3}/5 hist=[{4}]".format(
-            code, trade_date, today_cum, len(hist_per_min_list), ",".join(cum_detail)))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum={2:.0f} hist_valid={3}/5 hist=[{4}]",
+            code, trade_date, today_cum, len(hist_per_min_list), ",".join(cum_detail))
         return None
 
     avg_prev_per_min = sum(hist_per_min_list) / 5.0
     if avg_prev_per_min <= 0:
-        _log("vol_ratio_debug code={0} date={1} today_cum={2:.0f} avg_prev=0".format(
-            code, trade_date, today_cum))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum={2:.0f} avg_prev=0",
+            code, trade_date, today_cum)
         return None
 
     ratio = today_per_min / avg_prev_per_min
-    _log(
+    _log_debug(
         "vol_ratio_debug code={0} date={1} today={2:.0f}/{3:.1f}m={4:.2f} "
-        "avg_prev_per_min(full_day)={5:.2f} ratio={6:.2f} hist=[{7}]".format(
-            code,
-            trade_date,
-            today_cum,
-            elapsed_minutes,
-            today_per_min,
-            avg_prev_per_min,
-            ratio,
-            ",".join(cum_detail),
-        )
+        "avg_prev_per_min(full_day)={5:.2f} ratio={6:.2f} hist=[{7}]",
+        code,
+        trade_date,
+        today_cum,
+        elapsed_minutes,
+        today_per_min,
+        avg_prev_per_min,
+        ratio,
+        ",".join(cum_detail),
     )
     return ratio
 
@@ -1666,41 +2082,79 @@ def is_downtrend(context, code, trade_date, now):
     return current_price < open_price
 
 
-def is_today_down_and_volume_expand(context, code, trade_date, now):
-    t_date = get_trading_calendar_prev_date(context, trade_date)
-    try:
-        daily = fetch_daily_bars(context, code, t_date, 6)
-    except Exception:
+def is_today_down_and_volume_expand(context, code, trade_date, now, current_price=None):
+    daily_stats = _get_exit_daily_stats(context, trade_date, [code]).get(code)
+    if daily_stats is None:
         return False
+    prev_close, prev_volume, avg5 = daily_stats
 
-    if len(daily) < 6:
-        return False
-
-    prev_close = daily[-1]["close"]
-    prev_volume = daily[-1]["volume"]
-    avg5 = sum(b["volume"] for b in daily[-6:-1]) / 5.0
-
-    try:
-        current_price = get_current_price(context, code)
-    except Exception:
+    if current_price is None:
+        try:
+            current_price = get_current_price(context, code)
+        except Exception:
+            return False
+    if current_price is None:
         return False
 
     if current_price >= prev_close:
         return False
 
     # today's cumulative volume
-    try:
-        bars = fetch_minute_bars(context, code, trade_date, now.strftime("%H:%M"), 240)
-    except Exception:
-        return False
+    today_cum = _intraday_cum_volume(code)
+    if today_cum is None:
+        try:
+            bars = fetch_minute_bars(context, code, trade_date, now.strftime("%H:%M"), 240)
+        except Exception:
+            return False
 
-    if not bars:
-        return False
+        if not bars:
+            return False
 
-    today_cum = sum(b["volume"] for b in bars)
+        today_cum = sum(b["volume"] for b in bars)
     return today_cum > prev_volume and today_cum > avg5
 
 
+def _get_exit_daily_stats(context, trade_date, codes):
+    """Return code -> (prev_close, prev_volume, avg5) from T's daily bars.
+
+    Cached per trading day; codes not cached yet are fetched in one batch.
+    Value is None when fewer than 6 daily bars are available.
+    """
+    stats = g.exit_daily_stats
+    if stats is None or stats["date"] != trade_date:
+        stats = {
+            "date": trade_date,
+            "t_date": get_trading_calendar_prev_date(context, trade_date),
+            "by_code": {},
+        }
+        g.exit_daily_stats = stats
+    by_code = stats["by_code"]
+    missing = [c for c in codes if c not in by_code]
+    if not missing:
+        return by_code
+
+    try:
+        batch = fetch_daily_bars_batch(context, missing, stats["t_date"], 6)
+    except Exception:
+        batch = {}
+    for code in missing:
+        daily = batch.get(code)
+        if not daily:
+            try:
+                daily = fetch_daily_bars(context, code, stats["t_date"], 6)
+            except Exception:
+                daily = []
+        if len(daily) < 6:
+            by_code[code] = None
+            continue
+        by_code[code] = (
+            daily[-1]["close"],
+            daily[-1]["volume"],
+            sum(b["volume"] for b in daily[-6:-1]) / 5.0,
+        )
+    return by_code
+
+
 # --- Helpers ---
 
 def _get_current_dt(context):
@@ -1716,42 +2170,7 @@ def _get_current_dt(context):
 
 
 def _parse_timetag(timetag):
-    if not timetag:
-        return None
-
-    # Prefer QMT helper if available.
-    if "timetag_to_datetime" in globals():
-        try:
-            ts = timetag_to_datetime(timetag, "%Y%m%d%H%M%S")
-            return datetime.datetime.strptime(ts, "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    s = str(timetag).strip()
-    digits = "".join(ch for ch in s if ch.isdigit())
-
-    # Common format: YYYYMMDDHHMMSS
-    if len(digits) >= 14:
-        try:
-            return datetime.datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    # Epoch milliseconds
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0)
-        except Exception:
-            pass
-
-    # Epoch seconds
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits))
-        except Exception:
-            pass
-
-    return None
+    return qmt_common.parse_timetag(timetag, globals().get("timetag_to_datetime"))
 
 
 def is_main_board_a_share(stock_code):
@@ -1760,54 +2179,12 @@ def is_main_board_a_share(stock_code):
     """
     if not stock_code:
         return False
-
-    code = stock_code.split(".")[0]
-
-    # Exclude ChiNext (300*) and STAR (688*, 689*)
-    if code.startswith("300") or code.startswith("688") or code.startswith("689"):
-        return False
-
     # Main board prefixes: SH 600/601/603/605, SZ 000/001/002
-    return (
-        code.startswith("600")
-        or code.startswith("601")
-        or code.startswith("603")
-        or code.startswith("605")
-        or code.startswith("000")
-        or code.startswith("001")
-        or code.startswith("002")
-    )
-
+    # (ChiNext 300* and STAR 688*/689* are not in the set).
+    return stock_code.split(".")[0][:3] in MAIN_BOARD_PREFIXES
 
-def normalize_stock_code(stock_code):
-    """Normalize symbol to 6-digit + .SH/.SZ if possible."""
-    if not stock_code:
-        return ""
-
-    s = str(stock_code).strip().upper()
-    if not s:
-        return ""
 
-    if "." in s:
-        left, right = s.split(".", 1)
-        if len(left) == 6 and right in ("SH", "SZ"):
-            return left + "." + right
-        if len(left) == 6 and right in ("XSHG", "SSE"):
-            return left + ".SH"
-        if len(left) == 6 and right in ("XSHE", "SZSE"):
-            return left + ".SZ"
-        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
-            return right + ".SH"
-        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
-            return right + ".SZ"
-        return s
-
-    if len(s) == 6 and s.isdigit():
-        if s.startswith(("600", "601", "603", "605", "688", "689")):
-            return s + ".SH"
-        return s + ".SZ"
-
-    return s
+normalize_stock_code = qmt_common.normalize_stock_code
 
 
 def get_prev_trading_dates(context, date_str, count):
@@ -1815,6 +2192,10 @@ def get_prev_trading_dates(context, date_str, count):
     if not date_str:
         return []
 
+    dates = [trading_calendar_offset(context, date_str, -k) for k in range(count, 0, -1)]
+    if all(dates):
+        return dates
+
     try:
         dates = context.get_trading_dates("SH", "", date_str, count + 1, "1d")
         if len(dates) >= count + 1:
@@ -1893,35 +2274,7 @@ def _extract_yyyymmdd_hhmm(index_value):
     return "", ""
 
 
-def _daily_df_to_bars(df):
-    bars = []
-    try:
-        iterator = df.iterrows()
-    except Exception:
-        return bars
-
-    for idx, row in iterator:
-        date_str = str(idx)
-        digits = "".join(ch for ch in date_str if ch.isdigit())
-        if len(digits) >= 8:
-            date_str = digits[:8]
-        else:
-            date_str = ""
-
-        try:
-            bars.append(
-                {
-                    "date": date_str,
-                    "open": float(row["open"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "close": float(row["close"]),
-                    "volume": float(row["volume"]),
-                }
-            )
-        except Exception:
-            continue
-    return bars
+_daily_df_to_bars = qmt_common.daily_df_to_bars
 
 
 def _minute_df_to_bars(df, trade_date, end_hhmm):
@@ -1953,20 +2306,7 @@ def _minute_df_to_bars(df, trade_date, end_hhmm):
     return bars
 
 
-def _chunked_unique_codes(codes, chunk_size):
-    uniq = []
-    seen = set()
-    for c in codes or []:
-        n = normalize_stock_code(c)
-        if not n or n in seen:
-            continue
-        seen.add(n)
-        uniq.append(n)
-
-    if chunk_size <= 0:
-        chunk_size = len(uniq) or 1
-    for i in range(0, len(uniq), chunk_size):
-        yield uniq[i : i + chunk_size]
+_chunked_unique_codes = qmt_common.chunked_unique_codes
 
 
 def _log_end_of_day_entry_stats(trade_date):
@@ -1988,45 +2328,20 @@ def _log_end_of_day_entry_stats(trade_date):
     )
 
 
-def _normalize_trade_date(value):
-    """Normalize date-like value to YYYYMMDD."""
-    if value is None:
-        return ""
-
-    s = str(value).strip()
-    if not s:
-        return ""
-
-    digits = "".join(ch for ch in s if ch.isdigit())
-    if not digits:
-        return ""
+_normalize_trade_date = qmt_common.normalize_trade_date
 
-    # epoch milliseconds
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
-        except Exception:
-            return ""
 
-    # epoch seconds
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
-        except Exception:
-            return ""
+def _hit_rate(hit, total):
+    return round(float(hit) / total, 4) if total else 0.0
 
-    # datetime-like string
-    if len(digits) >= 8:
-        return digits[:8]
 
-    return ""
+def _log(msg):
+    LOG.info(msg)
 
 
-def _log(msg):
-    try:
-        print("[{0}] {1}".format(STRATEGY_NAME, msg))
-    except Exception:
-        pass
+def _log_debug(msg, *args):
+    """Formatted only when LOG_LEVEL is DEBUG."""
+    LOG.debug(msg, *args)
 
 
 def _log_once(key, msg):
@@ -14,13 +14,34 @@ Rules (current):
 - Entry: buy when price rises >= 3 ticks from the intraday low.
 """
 
+import bisect
 import datetime
+import json
+import os
 
 try:
     from xtquant import xtdata
 except Exception:
     xtdata = None
 
+try:
+    import qmt_common
+except ImportError:
+    import sys
+
+    # Local runs: qmt_common.py lives in strategies/, next to this script's folder.
+    # QMT built-in scripts have no __file__ and need it on QMT's Python path.
+    _script_file = globals().get("__file__")
+    if _script_file:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(_script_file))))
+    try:
+        import qmt_common
+    except ImportError:
+        raise ImportError(
+            "qmt_common.py not found: copy strategies/qmt_common.py into the QMT "
+            "Python path (e.g. bin.x64/Lib/site-packages), see README.md"
+        ) from None
+
 
 # QMT ContextInfo variables roll back after handlebar; use global state.
 class G:
@@ -30,6 +51,11 @@ class G:
 g = G()
 
 STRATEGY_NAME = "b2_basic"
+# One JSON line of stage timings / filter counts per day; "" disables the file.
+METRICS_FILE = qmt_common.default_metrics_path(STRATEGY_NAME)
+# "DEBUG" adds per-code diagnostics; log lines are printed once per bar.
+LOG_LEVEL = "INFO"
+LOG = qmt_common.BufferedLogger(STRATEGY_NAME, LOG_LEVEL)
 
 # --- Config (confirm/adjust with final rules) ---
 DAILY_KDJ_N = 9
@@ -46,10 +72,14 @@ VOLUME_RATIO_MIN = 5.0
 VOLUME_RATIO_WINDOW_START = datetime.time(9, 30)
 VOLUME_RATIO_WINDOW_END = datetime.time(9, 35)
 TRADING_MINUTES_PER_DAY = 240.0
+# Optional JSON file persisting historical full-day minute volume totals
+# across sessions; empty keeps the cache in memory only.
+MINUTE_VOLUME_CACHE_FILE = ""
 WATCHLIST_SIZE = 3
 WATCHLIST_TIME = datetime.time(9, 35)
 
 MINUTE_BAR_PERIOD = "1m"
+# Initial codes per batch call; qmt_common.ChunkSizer adapts it from call timing.
 BATCH_FETCH_CHUNK_SIZE = 200
 
 ENTRY_TICK_MIN = 3
@@ -80,11 +110,31 @@ UNIVERSE_SECTOR_NAMES = (
     "\u6caa\u6df1A\u80a1",  # HS A-share
     "A\u80a1",              # A-share
 )
+MAIN_BOARD_PREFIXES = frozenset(("600", "601", "603", "605", "000", "001", "002"))
 
 
 # --- QMT API adapters ---
 
 def get_universe(context):
+    """Return the main-board universe, cached per trading date.
+
+    Only non-empty results are cached, so callers that retry on an empty
+    universe still re-query the sector APIs.
+    """
+    now = _get_current_dt(context)
+    date_key = now.strftime("%Y%m%d") if now is not None else ""
+    cache = getattr(g, "universe_cache", None)
+    if cache and cache["date"] == date_key and cache["codes"]:
+        _log("universe_source=cache date={0} size={1}".format(date_key, len(cache["codes"])))
+        return list(cache["codes"])
+
+    codes = _resolve_universe(context)
+    if codes:
+        g.universe_cache = {"date": date_key, "codes": list(codes)}
+    return codes
+
+
+def _resolve_universe(context):
     """Return list of stock codes in universe.
 
     Priority:
@@ -141,7 +191,11 @@ def _normalize_main_board_codes(codes):
     normalized = []
     seen = set()
     for c in codes or []:
-        n = normalize_stock_code(c)
+        # Fast path: already "XXXXXX.SH" / "XXXXXX.SZ".
+        if type(c) is str and len(c) == 9 and c[6] == "." and c[7:] in ("SH", "SZ"):
+            n = c
+        else:
+            n = normalize_stock_code(c)
         if not n or (n in seen):
             continue
         if not is_main_board_a_share(n):
@@ -152,126 +206,45 @@ def _normalize_main_board_codes(codes):
 
 
 def _get_main_board_universe_from_sector(context):
-    """Load A-share list from sector APIs (context/global/xtdata)."""
-    all_codes = []
+    """Load A-share list from sector APIs (context/global/xtdata).
 
-    # context method in some QMT runtimes
+    Sources are tried in that order per sector name and the first one that
+    returns codes wins, since they expose the same sector lists.
+    """
+    getters = []
     if hasattr(context, "get_stock_list_in_sector"):
-        for name in UNIVERSE_SECTOR_NAMES:
-            try:
-                codes = context.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
-            except Exception:
-                pass
-
-    # global helper in some QMT runtimes
-    if "get_stock_list_in_sector" in globals():
-        func = globals().get("get_stock_list_in_sector")
-        if callable(func):
-            for name in UNIVERSE_SECTOR_NAMES:
-                try:
-                    codes = func(name)
-                    if codes:
-                        all_codes.extend(list(codes))
-                except Exception:
-                    pass
-
-    # xtdata fallback
-    if xtdata is not None:
-        for name in UNIVERSE_SECTOR_NAMES:
+        getters.append(context.get_stock_list_in_sector)
+    func = globals().get("get_stock_list_in_sector")
+    if callable(func):
+        getters.append(func)
+    xt_func = getattr(xtdata, "get_stock_list_in_sector", None) if xtdata is not None else None
+    if callable(xt_func):
+        getters.append(xt_func)
+
+    all_codes = []
+    for name in UNIVERSE_SECTOR_NAMES:
+        for getter in getters:
             try:
-                codes = xtdata.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
+                codes = getter(name)
             except Exception:
-                pass
-
+                continue
+            if codes:
+                all_codes.extend(list(codes))
+                break
     return all_codes
 
 
-def fetch_daily_bars(context, code, end_date, count):
-    """Return list of daily bars up to end_date (inclusive), ascending by date.
-
-    Each bar is a dict with keys: date, open, high, low, close, volume
-    date: "YYYYMMDD"
-    """
-    end_date = _normalize_trade_date(end_date)
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-
-    df = None
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                [code],
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            cur = data.get(code)
-            if cur is not None and (not cur.empty):
-                df = cur
-                break
-        except Exception:
-            continue
-    if df is None or df.empty:
-        return []
-
-    return _daily_df_to_bars(df)
+fetch_daily_bars = qmt_common.fetch_daily_bars
 
 
 def fetch_daily_bars_batch(context, codes, end_date, count):
-    """Batch fetch daily bars for codes.
+    """Batch fetch daily bars for codes; chunks adapt to observed latency.
 
     Return: dict(code -> bars list)
     """
-    result = {}
-    if not codes:
-        return result
-
-    end_date = _normalize_trade_date(end_date)
-    if not end_date:
-        return result
-
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-    data = {}
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                list(codes),
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            if data:
-                break
-        except Exception:
-            data = {}
-
-    if not data:
-        return result
-
-    for code in codes:
-        try:
-            df = data.get(code)
-            if df is None or df.empty:
-                continue
-            bars = _daily_df_to_bars(df)
-            if bars:
-                result[code] = bars
-        except Exception:
-            continue
-    return result
+    return qmt_common.fetch_daily_bars_batch(
+        context, codes, end_date, count, BATCH_FETCH_CHUNK_SIZE, getattr(g, "daily_fetch_sizer", None)
+    )
 
 
 def fetch_minute_bars(context, code, trade_date, end_time, count):
@@ -352,43 +325,71 @@ def fetch_minute_bars_batch(context, codes, trade_date, end_time, count):
         {"start_time": "", "end_time": end_ts, "subscribe": True, "count": count},
     ]
 
-    for batch_codes in _chunked_unique_codes(codes, BATCH_FETCH_CHUNK_SIZE):
-        pending = set(batch_codes)
-        for q in query_plan:
-            if not pending:
-                break
+    sizer = getattr(g, "minute_fetch_sizer", None) or qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
+    uniq = qmt_common.unique_codes(codes)
+    bars_per_code = max(count, 480)
+    failed_before = sizer.n_failed
+    for batch_codes in qmt_common.iter_adaptive_chunks(uniq, sizer, bars_per_code):
+        _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result)
+
+    # Same single retry as fetch_daily_bars_batch: leftovers, including whole
+    # chunks where every query raised, go again as smaller batches.
+    missing = [c for c in uniq if c not in result]
+    if missing and (result or sizer.n_failed > failed_before):
+        sizer.n_retry += len(missing)
+        for batch_codes in qmt_common.iter_adaptive_chunks(missing, sizer, bars_per_code, retry=True):
+            _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result)
+    return result
+
+
+def _fetch_minute_chunk(context, batch_codes, query_plan, trade_date, end_hhmm, sizer, result):
+    """One chunk through query_plan, each query asking only for codes still pending.
+
+    A query that raises moves on to the next; the chunk counts as one failed
+    call only when no query answered.
+    """
+    pending = set(batch_codes)
+    answered = False
+    t_start = qmt_common.clock()
+    for q in query_plan:
+        if not pending:
+            break
+        t0 = qmt_common.clock()
+        try:
+            data = context.get_market_data_ex(
+                ["open", "high", "low", "close", "volume"],
+                list(pending),
+                period="1m",
+                start_time=q["start_time"],
+                end_time=q["end_time"],
+                count=q["count"],
+                dividend_type="none",
+                fill_data=True,
+                subscribe=q["subscribe"],
+            )
+        except Exception:
+            continue
+        answered = True
+        if not data:
+            sizer.record(len(pending), 0, qmt_common.clock() - t0)
+            continue
+        hit_codes = []
+        for code in pending:
             try:
-                data = context.get_market_data_ex(
-                    ["open", "high", "low", "close", "volume"],
-                    list(pending),
-                    period="1m",
-                    start_time=q["start_time"],
-                    end_time=q["end_time"],
-                    count=q["count"],
-                    dividend_type="none",
-                    fill_data=True,
-                    subscribe=q["subscribe"],
-                )
+                df = data.get(code)
             except Exception:
+                df = None
+            if df is None or df.empty:
                 continue
-            if not data:
-                continue
-            hit_codes = []
-            for code in pending:
-                try:
-                    df = data.get(code)
-                except Exception:
-                    df = None
-                if df is None or df.empty:
-                    continue
-                bars = _minute_df_to_bars(df, trade_date, end_hhmm)
-                if bars:
-                    result[code] = bars
-                    hit_codes.append(code)
-            for code in hit_codes:
-                pending.discard(code)
-
-    return result
+            bars = _minute_df_to_bars(df, trade_date, end_hhmm)
+            if bars:
+                result[code] = bars
+                hit_codes.append(code)
+        sizer.record(len(pending), len(hit_codes), qmt_common.clock() - t0)
+        for code in hit_codes:
+            pending.discard(code)
+    if not answered:
+        sizer.record(len(batch_codes), 0, qmt_common.clock() - t_start, ok=False)
 
 
 def get_current_price(context, code):
@@ -414,6 +415,72 @@ def get_current_price(context, code):
     return float(df["close"].iloc[-1])
 
 
+def get_current_prices(context, codes, now=None):
+    """Return latest prices for codes in one data call.
+
+    Return: dict(code -> price); codes without data are omitted.
+    """
+    prices = {}
+    for code, rows in get_latest_minute_bars(context, codes, now, count=1).items():
+        prices[code] = rows[-1]["close"]
+    return prices
+
+
+def get_latest_minute_bars(context, codes, now=None, count=2):
+    """Return the latest `count` minute bars for codes in one data call.
+
+    Return: dict(code -> list of {"date", "time", "close", "volume"}, ascending);
+    "time" is HHMM, rows may span the previous session, codes without data are
+    omitted.
+    """
+    result = {}
+    uniq = []
+    seen = set()
+    for c in codes or []:
+        if c and c not in seen:
+            seen.add(c)
+            uniq.append(c)
+    if not uniq:
+        return result
+
+    if now is None:
+        now = _get_current_dt(context)
+    if now is None:
+        return result
+    end_ts = now.strftime("%Y%m%d%H%M%S")
+    try:
+        data = context.get_market_data_ex(
+            ["close", "volume"],
+            uniq,
+            period="1m",
+            start_time="",
+            end_time=end_ts,
+            count=count,
+            dividend_type="none",
+            fill_data=True,
+            subscribe=True,
+        )
+    except Exception:
+        return result
+    if not data:
+        return result
+
+    for code in uniq:
+        try:
+            df = data.get(code)
+            if df is None or df.empty:
+                continue
+            rows = []
+            for idx, close, volume in zip(df.index, df["close"], df["volume"]):
+                d, hhmm = _extract_yyyymmdd_hhmm(idx)
+                rows.append({"date": d, "time": hhmm, "close": float(close), "volume": float(volume)})
+            if rows:
+                result[code] = rows
+        except Exception:
+            continue
+    return result
+
+
 def place_buy_order(context, code, cash_amount):
     """Place a buy order using cash_amount.
 
@@ -436,13 +503,50 @@ def place_buy_order(context, code, cash_amount):
             "",
             context,
         )
+        _invalidate_account_snapshot()
         return True
     except Exception:
         return False
 
 
 def get_available_cash(context):
-    """Return available cash."""
+    """Return available cash (from the per-bar account snapshot)."""
+    snap = _get_account_snapshot()
+    if "cash" not in snap:
+        snap["cash"] = _query_available_cash(context)
+    return snap["cash"]
+
+
+def get_positions(context):
+    """Return current positions as dict: code -> position quantity."""
+    snap = _get_account_snapshot()
+    if "positions" not in snap:
+        snap["positions"], snap["costs"] = _query_positions(context)
+    return dict(snap["positions"])
+
+def get_position_cost(context, code):
+    """Return average cost price for a position, or None if unavailable."""
+    snap = _get_account_snapshot()
+    if "costs" not in snap:
+        snap["positions"], snap["costs"] = _query_positions(context)
+    return snap["costs"].get(code)
+
+
+def _get_account_snapshot():
+    """Return account-state cache for the current bar, creating it on demand."""
+    snap = getattr(g, "account_snapshot", None)
+    if snap is None:
+        snap = {}
+        g.account_snapshot = snap
+    return snap
+
+
+def _invalidate_account_snapshot():
+    """Drop cached account state (new bar or after an order is placed)."""
+    g.account_snapshot = None
+
+
+def _query_available_cash(context):
     account_id = _get_account_id(context)
     if not account_id:
         return 0.0
@@ -455,36 +559,24 @@ def get_available_cash(context):
     return float(accounts[0].m_dAvailable)
 
 
-def get_positions(context):
-    """Return current positions as dict: code -> position quantity."""
+def _query_positions(context):
+    """Return (code -> quantity, code -> average cost) from one position query."""
     account_id = _get_account_id(context)
     if not account_id:
-        return {}
+        return {}, {}
     try:
         positions = get_trade_detail_data(account_id, ACCOUNT_TYPE, "position")
     except Exception:
-        return {}
+        return {}, {}
     pos = {}
+    costs = {}
     for p in positions:
         code = p.m_strInstrumentID + "." + p.m_strExchangeID
         qty = int(getattr(p, "m_nCanUseVolume", p.m_nVolume))
         pos[code] = qty
-    return pos
-
-def get_position_cost(context, code):
-    """Return average cost price for a position, or None if unavailable."""
-    account_id = _get_account_id(context)
-    if not account_id:
-        return None
-    try:
-        positions = get_trade_detail_data(account_id, ACCOUNT_TYPE, "position")
-    except Exception:
-        return None
-    for p in positions:
-        pos_code = p.m_strInstrumentID + "." + p.m_strExchangeID
-        if pos_code == code:
-            return float(getattr(p, "m_dOpenPrice", 0.0)) or None
-    return None
+        if code not in costs:
+            costs[code] = float(getattr(p, "m_dOpenPrice", 0.0)) or None
+    return pos, costs
 
 
 def place_sell_order(context, code, quantity):
@@ -509,20 +601,79 @@ def place_sell_order(context, code, quantity):
             "",
             context,
         )
+        _invalidate_account_snapshot()
         return True
     except Exception:
         return False
 
 
+def load_trading_calendar(context):
+    """Load the full SH trading-day list once per session.
+
+    Return: {"dates": sorted YYYYMMDD list, "index": date -> position,
+    "reloaded_for": date that last triggered a reload}.
+    """
+    dates = []
+    try:
+        raw = context.get_trading_dates("SH", "", "", -1, "1d")
+        dates = sorted(set(d for d in (_normalize_trade_date(x) for x in (raw or [])) if d))
+    except Exception:
+        dates = []
+    return {
+        "dates": dates,
+        "index": dict((d, i) for i, d in enumerate(dates)),
+        "reloaded_for": "",
+    }
+
+
+def trading_calendar_offset(context, date_str, offset):
+    """Return the trading date `offset` trading days away from date_str.
+
+    Trading dates are looked up by index; a non-trading date counts as lying
+    between its neighbouring trading days. Return "" when the result falls
+    outside the loaded calendar (callers then fall back to the data service).
+    """
+    cal = getattr(g, "trading_calendar", None)
+    date_str = _normalize_trade_date(date_str)
+    if not cal or not cal["dates"] or not date_str:
+        return ""
+
+    if date_str > cal["dates"][-1] and cal["reloaded_for"] != date_str:
+        # Session outlived the loaded list (e.g. ran into a new day): reload once.
+        fresh = load_trading_calendar(context)
+        if fresh["dates"]:
+            cal = fresh
+            g.trading_calendar = fresh
+        cal["reloaded_for"] = date_str
+
+    dates = cal["dates"]
+    idx = cal["index"].get(date_str)
+    if idx is not None:
+        idx += offset
+    elif offset == 0:
+        return ""
+    else:
+        pos = bisect.bisect_left(dates, date_str)
+        idx = pos + offset if offset < 0 else pos + offset - 1
+    if idx < 0 or idx >= len(dates):
+        return ""
+    return dates[idx]
+
+
 def get_trading_calendar_prev_date(context, date_str):
     """Return previous trading date for date_str (YYYYMMDD).
 
-    Default fallback only skips weekends; replace with QMT trading calendar.
+    Uses the session calendar loaded in init(); outside it, asks the data
+    service and finally falls back to skipping weekends only.
     """
     date_str = _normalize_trade_date(date_str)
     if not date_str:
         date_str = datetime.datetime.now().strftime("%Y%m%d")
 
+    prev = trading_calendar_offset(context, date_str, -1)
+    if prev:
+        return prev
+
     try:
         dates = context.get_trading_dates("SH", "", date_str, 2, "1d")
         if len(dates) >= 2:
@@ -565,6 +716,14 @@ def init(context):
     g.take_profit_state = {}
     g.exit_checked = None
     g.logged_once = set()
+    g.account_snapshot = None
+    g.trading_calendar = load_trading_calendar(context)
+    g.intraday_volume = {}
+    g.exit_daily_stats = None
+    g.minute_volume_cache = _load_minute_volume_cache()
+    g.daily_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
+    g.day_metrics = None
+    g.minute_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
 
     # initialize universe
     try:
@@ -575,20 +734,30 @@ def init(context):
         g.universe = []
 
     _log("init done, universe size={0}".format(len(g.universe)))
+    _log("trading_calendar loaded days={0}".format(len(g.trading_calendar["dates"])))
     if g.universe:
         sample = ",".join(g.universe[:5])
         _log("universe sample={0}".format(sample))
     if not g.universe:
         _log("universe is empty; backtest may stop immediately")
+    LOG.flush()
 
 
 def handlebar(context):
-    """Called on each minute bar."""
+    """Called on each minute bar; buffered log lines are flushed after it."""
+    try:
+        _handlebar(context)
+    finally:
+        LOG.flush()
+
+
+def _handlebar(context):
     now = _get_current_dt(context)
     if now is None:
         return
 
     trade_date = now.strftime("%Y%m%d")
+    _invalidate_account_snapshot()
 
     # New trading day initialization
     if g.trade_date != trade_date:
@@ -597,6 +766,7 @@ def handlebar(context):
         g.watchlist = []
         g.intraday_low = {}
         g.bought = set()
+        g.intraday_volume = {}
         g.entry_check_stats = {}
         g.logged_once = set()
 
@@ -616,12 +786,12 @@ def handlebar(context):
         if g.watchlist:
             _log("watchlist sample={0}".format(",".join(g.watchlist[:5])))
 
+    # One batched price snapshot per bar, shared by entry and exit checks
+    prices = _snapshot_bar_prices(context, trade_date, now)
+
     # Monitor watchlist for entry and retry pending orders
     for code in g.watchlist:
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -646,23 +816,85 @@ def handlebar(context):
             _try_place_buy(context, code, price, now)
 
     # Profit-taking checks (any time)
-    _check_take_profit(context, now)
+    _check_take_profit(context, now, prices)
 
     # Stop-loss and volume-based exit checks at 14:45
     if now.time() >= STOP_CHECK_TIME and g.exit_checked != trade_date:
         _log_end_of_day_entry_stats(trade_date)
-        _check_stop_rules(context, trade_date, now)
+        _check_stop_rules(context, trade_date, now, prices)
         g.exit_checked = trade_date
 
 
 # --- Core logic ---
 
+def _snapshot_bar_prices(context, trade_date, now):
+    """Fetch current prices for watchlist + held codes once per bar.
+
+    The same call feeds the intraday volume tracker used by exit checks.
+    """
+    try:
+        positions = get_positions(context)
+    except Exception:
+        positions = {}
+    codes = list(g.watchlist) + [c for c in positions if c not in g.watchlist]
+    try:
+        bars_by_code = get_latest_minute_bars(context, codes, now, count=2)
+    except Exception:
+        return {}
+    _track_intraday_volume(trade_date, bars_by_code)
+    return dict((code, rows[-1]["close"]) for code, rows in bars_by_code.items())
+
+
+def _track_intraday_volume(trade_date, bars_by_code):
+    """Accumulate today's minute volume per code from the per-bar snapshot.
+
+    Each snapshot carries the latest two minute bars, so a bar's final volume is
+    added once the next bar appears. Codes first seen after the session's first
+    bar, or that skip a bar, are marked incomplete and exit checks fall back to
+    fetching the day's minute bars.
+    """
+    for code, rows in bars_by_code.items():
+        today = [r for r in rows if r["date"] == trade_date and r["time"]]
+        if not today:
+            continue
+        cur = today[-1]
+        st = g.intraday_volume.get(code)
+        if st is None:
+            # A lone bar for today means it is the session's first bar.
+            g.intraday_volume[code] = {
+                "time": cur["time"],
+                "closed": 0.0,
+                "last": cur["volume"],
+                "complete": len(today) == 1,
+            }
+            continue
+        if cur["time"] == st["time"]:
+            st["last"] = cur["volume"]
+            continue
+        if cur["time"] < st["time"]:
+            continue
+        if len(today) >= 2 and today[-2]["time"] == st["time"]:
+            st["closed"] += today[-2]["volume"]
+        else:
+            st["complete"] = False
+        st["time"] = cur["time"]
+        st["last"] = cur["volume"]
+
+
+def _intraday_cum_volume(code):
+    """Return today's cumulative volume from the tracker, or None if incomplete."""
+    st = g.intraday_volume.get(code)
+    if st is None or not st["complete"]:
+        return None
+    return st["closed"] + st["last"]
+
+
 def build_daily_candidates(context, t_date):
     candidates = []
     stats = {
         "total": 0,
         "batch_hit": 0,
-        "single_fallback_hit": 0,
+        "batch_miss": 0,
         "bars_short": 0,
         "kdj_t1_fail": 0,
         "kdj_t_fail": 0,
@@ -672,70 +904,78 @@ def build_daily_candidates(context, t_date):
     }
     stats["total"] = len(g.universe)
     short_samples = []
+    # Day metrics start here and are emitted once the watchlist is built.
+    metrics = qmt_common.RunMetrics(STRATEGY_NAME, g.trade_date)
+    g.day_metrics = metrics
+    metrics.set("t_date", t_date)
     daily_batch = {}
-    try:
-        daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_KDJ_N + 2)
-    except Exception:
-        daily_batch = {}
-    _log("daily_batch_fetch date={0} hit={1}".format(t_date, len(daily_batch)))
+    with metrics.stage("daily_fetch"):
+        try:
+            daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_KDJ_N + 2)
+        except Exception:
+            daily_batch = {}
+    metrics.set("daily_fetch", g.daily_fetch_sizer.summary())
+    metrics.set("batch_hit_rate", _hit_rate(len(daily_batch), len(g.universe)))
+    _log(
+        "daily_batch_fetch date={0} hit={1} {2}".format(
+            t_date, len(daily_batch), g.daily_fetch_sizer.describe(reset=True)
+        )
+    )
 
-    for code in g.universe:
-        if not is_main_board_a_share(code):
-            continue
+    with metrics.stage("daily_filter"):
+        for code in g.universe:
+            if not is_main_board_a_share(code):
+                continue
 
-        bars = daily_batch.get(code, [])
-        if bars:
-            stats["batch_hit"] += 1
-        else:
-            try:
-                bars = fetch_daily_bars(context, code, t_date, DAILY_KDJ_N + 2)
-            except Exception:
-                bars = []
+            # Misses were already retried as smaller batches inside the fetch.
+            bars = daily_batch.get(code, [])
             if bars:
-                stats["single_fallback_hit"] += 1
-
-        if len(bars) < DAILY_KDJ_N + 2:
-            stats["bars_short"] += 1
-            if len(short_samples) < 3:
-                short_samples.append("{0}:{1}".format(code, len(bars)))
-            continue
+                stats["batch_hit"] += 1
+            else:
+                stats["batch_miss"] += 1
+
+            if len(bars) < DAILY_KDJ_N + 2:
+                stats["bars_short"] += 1
+                if len(short_samples) < 3:
+                    short_samples.append("{0}:{1}".format(code, len(bars)))
+                continue
 
-        bar_t_minus1 = bars[-2]
-        bar_t = bars[-1]
+            bar_t_minus1 = bars[-2]
+            bar_t = bars[-1]
 
-        k_list, d_list, j_list = compute_kdj(bars, DAILY_KDJ_N, KDJ_INIT, KDJ_INIT)
-        if len(j_list) < 2:
-            continue
+            k_list, d_list, j_list = compute_kdj(bars, DAILY_KDJ_N, KDJ_INIT, KDJ_INIT)
+            if len(j_list) < 2:
+                continue
 
-        j_t_minus1 = j_list[-2]
-        j_t = j_list[-1]
+            j_t_minus1 = j_list[-2]
+            j_t = j_list[-1]
 
-        if j_t_minus1 >= J_T_MINUS1_MAX:
-            stats["kdj_t1_fail"] += 1
-            continue
-        if j_t >= J_T_MAX:
-            stats["kdj_t_fail"] += 1
-            continue
+            if j_t_minus1 >= J_T_MINUS1_MAX:
+                stats["kdj_t1_fail"] += 1
+                continue
+            if j_t >= J_T_MAX:
+                stats["kdj_t_fail"] += 1
+                continue
 
-        if not daily_return_ok(bar_t_minus1, bar_t):
-            stats["ret_fail"] += 1
-            continue
-        prev_vol = bar_t_minus1["volume"]
-        if prev_vol <= 0 or bar_t["volume"] < (prev_vol * DAILY_VOLUME_RATIO_MIN):
-            stats["vol_fail"] += 1
-            continue
-        if upper_shadow_ratio(bar_t) >= UPPER_SHADOW_MAX_RATIO:
-            stats["upper_shadow_fail"] += 1
-            continue
+            if not daily_return_ok(bar_t_minus1, bar_t):
+                stats["ret_fail"] += 1
+                continue
+            prev_vol = bar_t_minus1["volume"]
+            if prev_vol <= 0 or bar_t["volume"] < (prev_vol * DAILY_VOLUME_RATIO_MIN):
+                stats["vol_fail"] += 1
+                continue
+            if upper_shadow_ratio(bar_t) >= UPPER_SHADOW_MAX_RATIO:
+                stats["upper_shadow_fail"] += 1
+                continue
 
-        candidates.append(code)
+            candidates.append(code)
 
     _log(
-        "daily_filter_stats total={0} batch_hit={1} fallback_hit={2} bars_short={3} "
+        "daily_filter_stats total={0} batch_hit={1} batch_miss={2} bars_short={3} "
         "kdj_t1_fail={4} kdj_t_fail={5} ret_fail={6} vol_fail={7} upper_shadow_fail={8} pass={9}".format(
             stats["total"],
             stats["batch_hit"],
-            stats["single_fallback_hit"],
+            stats["batch_miss"],
             stats["bars_short"],
             stats["kdj_t1_fail"],
             stats["kdj_t_fail"],
@@ -747,6 +987,8 @@ def build_daily_candidates(context, t_date):
     )
     if short_samples:
         _log("bars_short_samples t_date={0} {1}".format(t_date, ",".join(short_samples)))
+    metrics.update_counters(stats, "daily.")
+    metrics.count("daily.pass", len(candidates))
     return candidates
 
 
@@ -757,35 +999,43 @@ def build_watchlist(context, trade_date, now):
         "vol_ratio_none": 0,
         "vol_ratio_low": 0,
     }
+    metrics = g.day_metrics or qmt_common.RunMetrics(STRATEGY_NAME, trade_date)
     prev_dates = get_prev_trading_dates(context, trade_date, 5)
-    prefetch = _prefetch_volume_ratio_data(context, g.daily_candidates, trade_date, now, prev_dates)
+    with metrics.stage("minute_prefetch"):
+        prefetch = _prefetch_volume_ratio_data(context, g.daily_candidates, trade_date, now, prev_dates)
+    metrics.set("minute_fetch", g.minute_fetch_sizer.summary())
+    g.minute_fetch_sizer.reset_stats()
     _log(
         "volume_ratio_window={0}-{1}".format(
             VOLUME_RATIO_WINDOW_START.strftime("%H:%M"),
             VOLUME_RATIO_WINDOW_END.strftime("%H:%M"),
         )
     )
-    for code in g.daily_candidates:
-        decided, vol_ratio = _calc_volume_ratio_prefetched(
-            code=code,
-            prev_dates=prev_dates,
-            elapsed_minutes=prefetch.get("elapsed_minutes", 0.0),
-            window_start=prefetch.get("window_start", ""),
-            window_end=prefetch.get("window_end", ""),
-            today_bars_by_code=prefetch.get("today_bars_by_code", {}),
-            hist_bars_by_date=prefetch.get("hist_bars_by_date", {}),
-            today_prefetch_ok=prefetch.get("today_prefetch_ok", False),
-            hist_prefetch_ok_by_date=prefetch.get("hist_prefetch_ok_by_date", {}),
-        )
-        if not decided:
-            vol_ratio = calc_volume_ratio(context, code, trade_date, now)
-        if vol_ratio is None:
-            stats["vol_ratio_none"] += 1
-            continue
-        if vol_ratio <= VOLUME_RATIO_MIN:
-            stats["vol_ratio_low"] += 1
-            continue
-        ranked.append((code, vol_ratio))
+    with metrics.stage("volume_ratio"):
+        for code in g.daily_candidates:
+            decided, vol_ratio = _calc_volume_ratio_prefetched(
+                code=code,
+                prev_dates=prev_dates,
+                elapsed_minutes=prefetch.get("elapsed_minutes", 0.0),
+                window_start=prefetch.get("window_start", ""),
+                window_end=prefetch.get("window_end", ""),
+                today_bars_by_code=prefetch.get("today_bars_by_code", {}),
+                hist_volume_totals=g.minute_volume_cache,
+                today_prefetch_ok=prefetch.get("today_prefetch_ok", False),
+                hist_prefetch_ok_by_date=prefetch.get("hist_prefetch_ok_by_date", {}),
+            )
+            if not decided:
+                vol_ratio = calc_volume_ratio(context, code, trade_date, now)
+            if vol_ratio is None:
+                stats["vol_ratio_none"] += 1
+                continue
+            if vol_ratio <= VOLUME_RATIO_MIN:
+                stats["vol_ratio_low"] += 1
+                continue
+            ranked.append((code, vol_ratio))
+    if prev_dates:
+        _prune_minute_volume_cache(prev_dates)
+    _save_minute_volume_cache()
 
     ranked.sort(key=lambda x: x[1], reverse=True)
     watchlist = [code for code, _ in ranked[:WATCHLIST_SIZE]]
@@ -802,6 +1052,9 @@ def build_watchlist(context, trade_date, now):
     if ranked:
         top = ",".join(["{0}:{1:.2f}".format(c, v) for c, v in ranked[:5]])
         _log("watchlist_rank_top={0}".format(top))
+    metrics.update_counters(stats, "watchlist.")
+    metrics.count("watchlist.selected", len(watchlist))
+    metrics.emit(_log, METRICS_FILE)
     return watchlist
 
 
@@ -900,7 +1153,7 @@ def _try_place_buy(context, code, price, now):
         )
 
 
-def _check_take_profit(context, now):
+def _check_take_profit(context, now, prices):
     try:
         positions = get_positions(context)
     except Exception:
@@ -913,10 +1166,7 @@ def _check_take_profit(context, now):
         if qty <= 0:
             continue
 
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -939,7 +1189,7 @@ def _check_take_profit(context, now):
             g.take_profit_state[code] = 2
 
 
-def _check_stop_rules(context, trade_date, now):
+def _check_stop_rules(context, trade_date, now, prices):
     try:
         positions = get_positions(context)
     except Exception:
@@ -948,15 +1198,15 @@ def _check_stop_rules(context, trade_date, now):
     if not positions:
         return
 
+    # One daily batch for all held codes; is_today_down_and_volume_expand reads it.
+    _get_exit_daily_stats(context, trade_date, [c for c, q in positions.items() if q > 0])
+
     for code, qty in positions.items():
         if qty <= 0:
             continue
 
         # Rule 1: stop loss if current price < buy day low
-        try:
-            price = get_current_price(context, code)
-        except Exception:
-            continue
+        price = prices.get(code)
         if price is None:
             continue
 
@@ -966,7 +1216,7 @@ def _check_stop_rules(context, trade_date, now):
             continue
 
         # Rule 3: if today down, and today's volume > yesterday and > avg5, then clear
-        if is_today_down_and_volume_expand(context, code, trade_date, now):
+        if is_today_down_and_volume_expand(context, code, trade_date, now, current_price=price):
             _sell_all(context, code, qty)
 
 
@@ -1062,76 +1312,82 @@ def calc_volume_ratio(context, code, trade_date, now):
     window_end = min(now_hhmm, VOLUME_RATIO_WINDOW_END.strftime("%H:%M"))
     elapsed_minutes = _elapsed_minutes_between_hhmm(window_start, window_end)
     if elapsed_minutes <= 0:
-        _log("vol_ratio_debug code={0} date={1} elapsed_minutes=0 window={2}-{3}".format(
-            code, trade_date, window_start, window_end))
+        _log_debug("vol_ratio_debug code={0} date={1} elapsed_minutes=0 window={2}-{3}",
+            code, trade_date, window_start, window_end)
         return None
 
     try:
         bars = fetch_minute_bars(context, code, trade_date, window_end, 300)
     except Exception:
-        _log("vol_ratio_debug code={0} date={1} ERROR fetching today bars".format(code, trade_date))
+        _log_debug("vol_ratio_debug code={0} date={1} ERROR fetching today bars", code, trade_date)
         return None
 
     if not bars:
-        _log("vol_ratio_debug code={0} date={1} today_bars=EMPTY".format(code, trade_date))
+        _log_debug("vol_ratio_debug code={0} date={1} today_bars=EMPTY", code, trade_date)
         return None
 
     today_cum = _sum_window_volume(bars, window_start, window_end)
     if today_cum <= 0:
-        _log("vol_ratio_debug code={0} date={1} today_cum=0 (bars_count={2} window={3}-{4})".format(
-            code, trade_date, len(bars), window_start, window_end))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum=0 (bars_count={2} window={3}-{4})",
+            code, trade_date, len(bars), window_start, window_end)
         return None
     today_per_min = today_cum / elapsed_minutes
 
     prev_dates = get_prev_trading_dates(context, trade_date, 5)
     if len(prev_dates) < 5:
-        _log("vol_ratio_debug code={0} date={1} prev_dates_count={2} (need 5)".format(
-            code, trade_date, len(prev_dates)))
+        _log_debug("vol_ratio_debug code={0} date={1} prev_dates_count={2} (need 5)",
+            code, trade_date, len(prev_dates))
         return None
 
     hist_per_min_list = []
     cum_detail = []
+    debug = LOG.debug_enabled
     for d in prev_dates:
-        try:
-            d_bars = fetch_minute_bars(context, code, d, "15:00", 600)
-        except Exception:
-            cum_detail.append("{0}=ERR".format(d))
-            continue
-        if not d_bars:
-            cum_detail.append("{0}=EMPTY".format(d))
-            continue
-        d_total = _sum_continuous_session_volume(d_bars)
+        d_total = g.minute_volume_cache.get((code, d))
+        if d_total is None:
+            try:
+                d_bars = fetch_minute_bars(context, code, d, "15:00", 600)
+            except Exception:
+                if debug:
+                    cum_detail.append("{0}=ERR".format(d))
+                continue
+            if not d_bars:
+                if debug:
+                    cum_detail.append("{0}=EMPTY".format(d))
+                continue
+            d_total = _sum_continuous_session_volume(d_bars)
+            g.minute_volume_cache[(code, d)] = d_total
         d_per_min = d_total / TRADING_MINUTES_PER_DAY if TRADING_MINUTES_PER_DAY > 0 else 0.0
-        cum_detail.append(
-            "{0}={1:.0f}/{2:.0f}m={3:.2f}".format(d, d_total, TRADING_MINUTES_PER_DAY, d_per_min)
-        )
+        if debug:
+            cum_detail.append(
+                "{0}={1:.0f}/{2:.0f}m={3:.2f}".format(d, d_total, TRADING_MINUTES_PER_DAY, d_per_min)
+            )
         if d_total > 0:
             hist_per_min_list.append(d_per_min)
 
     if len(hist_per_min_list) < 5:
-        _log("vol_ratio_debug code={0} date={1} today_cum={2:.0f} hist_valid={3}/5 hist=[{4}]".format(
-            code, trade_date, today_cum, len(hist_per_min_list), ",".join(cum_detail)))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum={2:.0f} hist_valid={3}/5 hist=[{4}]",
+            code, trade_date, today_cum, len(hist_per_min_list), ",".join(cum_detail))
         return None
 
     avg_prev_per_min = sum(hist_per_min_list) / 5.0
     if avg_prev_per_min <= 0:
-        _log("vol_ratio_debug code={0} date={1} today_cum={2:.0f} avg_prev=0".format(
-            code, trade_date, today_cum))
+        _log_debug("vol_ratio_debug code={0} date={1} today_cum={2:.0f} avg_prev=0",
+            code, trade_date, today_cum)
         return None
 
     ratio = today_per_min / avg_prev_per_min
-    _log(
+    _log_debug(
         "vol_ratio_debug code={0} date={1} today={2:.0f}/{3:.1f}m={4:.2f} "
-        "avg_prev_per_min(full_day)={5:.2f} ratio={6:.2f} hist=[{7}]".format(
-            code,
-            trade_date,
-            today_cum,
-            elapsed_minutes,
-            today_per_min,
-            avg_prev_per_min,
-            ratio,
-            ",".join(cum_detail),
-        )
+        "avg_prev_per_min(full_day)={5:.2f} ratio={6:.2f} hist=[{7}]",
+        code,
+        trade_date,
+        today_cum,
+        elapsed_minutes,
+        today_per_min,
+        avg_prev_per_min,
+        ratio,
+        ",".join(cum_detail),
     )
     return ratio
 
@@ -1149,7 +1405,6 @@ def _prefetch_volume_ratio_data(context, codes, trade_date, now, prev_dates):
         "window_end": window_end,
         "elapsed_minutes": elapsed_minutes,
         "today_bars_by_code": {},
-        "hist_bars_by_date": {},
         "today_prefetch_ok": False,
         "hist_prefetch_ok_by_date": {},
     }
@@ -1163,17 +1418,64 @@ def _prefetch_volume_ratio_data(context, codes, trade_date, now, prev_dates):
         data["today_bars_by_code"] = {}
         data["today_prefetch_ok"] = False
 
+    # Full-day totals of past sessions never change: only (code, date) pairs
+    # missing from g.minute_volume_cache are fetched, normally just the newest day.
+    cache = g.minute_volume_cache
     for d in prev_dates[:5]:
+        data["hist_prefetch_ok_by_date"][d] = True
+        missing = [code for code in codes if (code, d) not in cache]
+        if not missing:
+            continue
         try:
-            bars_by_code = fetch_minute_bars_batch(context, codes, d, "15:00", 600)
-            data["hist_prefetch_ok_by_date"][d] = True
+            bars_by_code = fetch_minute_bars_batch(context, missing, d, "15:00", 600)
         except Exception:
-            bars_by_code = {}
             data["hist_prefetch_ok_by_date"][d] = False
-        data["hist_bars_by_date"][d] = bars_by_code
+            continue
+        for code, bars in bars_by_code.items():
+            if bars:
+                cache[(code, d)] = _sum_continuous_session_volume(bars)
     return data
 
 
+def _load_minute_volume_cache():
+    """Load (code, date) -> full-day volume totals from MINUTE_VOLUME_CACHE_FILE."""
+    cache = {}
+    path = MINUTE_VOLUME_CACHE_FILE
+    if not path or not os.path.exists(path):
+        return cache
+    try:
+        with open(path, "r") as f:
+            raw = json.load(f)
+        for key, total in raw.items():
+            code, _, d = key.partition("|")
+            cache[(code, d)] = float(total)
+    except Exception:
+        _log("minute_volume_cache load failed path={0}".format(path))
+        return {}
+    _log("minute_volume_cache loaded entries={0}".format(len(cache)))
+    return cache
+
+
+def _save_minute_volume_cache():
+    path = MINUTE_VOLUME_CACHE_FILE
+    if not path:
+        return
+    try:
+        raw = {"{0}|{1}".format(code, d): total for (code, d), total in g.minute_volume_cache.items()}
+        with open(path, "w") as f:
+            json.dump(raw, f)
+    except Exception:
+        _log("minute_volume_cache save failed path={0}".format(path))
+
+
+def _prune_minute_volume_cache(keep_dates):
+    """Drop cached totals for dates outside keep_dates (the current lookback)."""
+    keep = set(keep_dates)
+    cache = g.minute_volume_cache
+    for key in [k for k in cache if k[1] not in keep]:
+        del cache[key]
+
+
 def _calc_volume_ratio_prefetched(
     code,
     prev_dates,
@@ -1181,7 +1483,7 @@ def _calc_volume_ratio_prefetched(
     window_start,
     window_end,
     today_bars_by_code,
-    hist_bars_by_date,
+    hist_volume_totals,
     today_prefetch_ok,
     hist_prefetch_ok_by_date,
 ):
@@ -1204,10 +1506,9 @@ def _calc_volume_ratio_prefetched(
     for d in prev_dates[:5]:
         if not hist_prefetch_ok_by_date.get(d, False):
             return False, None
-        d_bars = hist_bars_by_date.get(d, {}).get(code, [])
-        if not d_bars:
+        d_total = hist_volume_totals.get((code, d))
+        if d_total is None:
             continue
-        d_total = _sum_continuous_session_volume(d_bars)
         d_per_min = d_total / TRADING_MINUTES_PER_DAY if TRADING_MINUTES_PER_DAY > 0 else 0.0
         if d_total > 0:
             hist_per_min_list.append(d_per_min)
@@ -1238,41 +1539,79 @@ def is_downtrend(context, code, trade_date, now):
     return current_price < open_price
 
 
-def is_today_down_and_volume_expand(context, code, trade_date, now):
-    t_date = get_trading_calendar_prev_date(context, trade_date)
-    try:
-        daily = fetch_daily_bars(context, code, t_date, 6)
-    except Exception:
-        return False
-
-    if len(daily) < 6:
+def is_today_down_and_volume_expand(context, code, trade_date, now, current_price=None):
+    daily_stats = _get_exit_daily_stats(context, trade_date, [code]).get(code)
+    if daily_stats is None:
         return False
+    prev_close, prev_volume, avg5 = daily_stats
 
-    prev_close = daily[-1]["close"]
-    prev_volume = daily[-1]["volume"]
-    avg5 = sum(b["volume"] for b in daily[-6:-1]) / 5.0
-
-    try:
-        current_price = get_current_price(context, code)
-    except Exception:
+    if current_price is None:
+        try:
+            current_price = get_current_price(context, code)
+        except Exception:
+            return False
+    if current_price is None:
         return False
 
     if current_price >= prev_close:
         return False
 
     # today's cumulative volume
-    try:
-        bars = fetch_minute_bars(context, code, trade_date, now.strftime("%H:%M"), 240)
-    except Exception:
-        return False
+    today_cum = _intraday_cum_volume(code)
+    if today_cum is None:
+        try:
+            bars = fetch_minute_bars(context, code, trade_date, now.strftime("%H:%M"), 240)
+        except Exception:
+            return False
 
-    if not bars:
-        return False
+        if not bars:
+            return False
 
-    today_cum = sum(b["volume"] for b in bars)
+        today_cum = sum(b["volume"] for b in bars)
     return today_cum > prev_volume and today_cum > avg5
 
 
+def _get_exit_daily_stats(context, trade_date, codes):
+    """Return code -> (prev_close, prev_volume, avg5) from T's daily bars.
+
+    Cached per trading day; codes not cached yet are fetched in one batch.
+    Value is None when fewer than 6 daily bars are available.
+    """
+    stats = g.exit_daily_stats
+    if stats is None or stats["date"] != trade_date:
+        stats = {
+            "date": trade_date,
+            "t_date": get_trading_calendar_prev_date(context, trade_date),
+            "by_code": {},
+        }
+        g.exit_daily_stats = stats
+    by_code = stats["by_code"]
+    missing = [c for c in codes if c not in by_code]
+    if not missing:
+        return by_code
+
+    try:
+        batch = fetch_daily_bars_batch(context, missing, stats["t_date"], 6)
+    except Exception:
+        batch = {}
+    for code in missing:
+        daily = batch.get(code)
+        if not daily:
+            try:
+                daily = fetch_daily_bars(context, code, stats["t_date"], 6)
+            except Exception:
+                daily = []
+        if len(daily) < 6:
+            by_code[code] = None
+            continue
+        by_code[code] = (
+            daily[-1]["close"],
+            daily[-1]["volume"],
+            sum(b["volume"] for b in daily[-6:-1]) / 5.0,
+        )
+    return by_code
+
+
 # --- Helpers ---
 
 def _get_current_dt(context):
@@ -1288,42 +1627,7 @@ def _get_current_dt(context):
 
 
 def _parse_timetag(timetag):
-    if not timetag:
-        return None
-
-    # Prefer QMT helper if available.
-    if "timetag_to_datetime" in globals():
-        try:
-            ts = timetag_to_datetime(timetag, "%Y%m%d%H%M%S")
-            return datetime.datetime.strptime(ts, "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    s = str(timetag).strip()
-    digits = "".join(ch for ch in s if ch.isdigit())
-
-    # Common format: YYYYMMDDHHMMSS
-    if len(digits) >= 14:
-        try:
-            return datetime.datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    # Epoch milliseconds
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0)
-        except Exception:
-            pass
-
-    # Epoch seconds
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits))
-        except Exception:
-            pass
-
-    return None
+    return qmt_common.parse_timetag(timetag, globals().get("timetag_to_datetime"))
 
 
 def is_main_board_a_share(stock_code):
@@ -1332,54 +1636,12 @@ def is_main_board_a_share(stock_code):
     """
     if not stock_code:
         return False
-
-    code = stock_code.split(".")[0]
-
-    # Exclude ChiNext (300*) and STAR (688*, 689*)
-    if code.startswith("300") or code.startswith("688") or code.startswith("689"):
-        return False
-
     # Main board prefixes: SH 600/601/603/605, SZ 000/001/002
-    return (
-        code.startswith("600")
-        or code.startswith("601")
-        or code.startswith("603")
-        or code.startswith("605")
-        or code.startswith("000")
-        or code.startswith("001")
-        or code.startswith("002")
-    )
-
-
-def normalize_stock_code(stock_code):
-    """Normalize symbol to 6-digit + .SH/.SZ if possible."""
-    if not stock_code:
-        return ""
-
-    s = str(stock_code).strip().upper()
-    if not s:
-        return ""
-
-    if "." in s:
-        left, right = s.split(".", 1)
-        if len(left) == 6 and right in ("SH", "SZ"):
-            return left + "." + right
-        if len(left) == 6 and right in ("XSHG", "SSE"):
-            return left + ".SH"
-        if len(left) == 6 and right in ("XSHE", "SZSE"):
-            return left + ".SZ"
-        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
-            return right + ".SH"
-        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
-            return right + ".SZ"
-        return s
+    # (ChiNext 300* and STAR 688*/689* are not in the set).
+    return stock_code.split(".")[0][:3] in MAIN_BOARD_PREFIXES
 
-    if len(s) == 6 and s.isdigit():
-        if s.startswith(("600", "601", "603", "605", "688", "689")):
-            return s + ".SH"
-        return s + ".SZ"
 
-    return s
+normalize_stock_code = qmt_common.normalize_stock_code
 
 
 def get_prev_trading_dates(context, date_str, count):
@@ -1387,6 +1649,10 @@ def get_prev_trading_dates(context, date_str, count):
     if not date_str:
         return []
 
+    dates = [trading_calendar_offset(context, date_str, -k) for k in range(count, 0, -1)]
+    if all(dates):
+        return dates
+
     try:
         dates = context.get_trading_dates("SH", "", date_str, count + 1, "1d")
         if len(dates) >= count + 1:
@@ -1465,35 +1731,7 @@ def _extract_yyyymmdd_hhmm(index_value):
     return "", ""
 
 
-def _daily_df_to_bars(df):
-    bars = []
-    try:
-        iterator = df.iterrows()
-    except Exception:
-        return bars
-
-    for idx, row in iterator:
-        date_str = str(idx)
-        digits = "".join(ch for ch in date_str if ch.isdigit())
-        if len(digits) >= 8:
-            date_str = digits[:8]
-        else:
-            date_str = ""
-
-        try:
-            bars.append(
-                {
-                    "date": date_str,
-                    "open": float(row["open"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "close": float(row["close"]),
-                    "volume": float(row["volume"]),
-                }
-            )
-        except Exception:
-            continue
-    return bars
+_daily_df_to_bars = qmt_common.daily_df_to_bars
 
 
 def _minute_df_to_bars(df, trade_date, end_hhmm):
@@ -1525,20 +1763,7 @@ def _minute_df_to_bars(df, trade_date, end_hhmm):
     return bars
 
 
-def _chunked_unique_codes(codes, chunk_size):
-    uniq = []
-    seen = set()
-    for c in codes or []:
-        n = normalize_stock_code(c)
-        if not n or n in seen:
-            continue
-        seen.add(n)
-        uniq.append(n)
-
-    if chunk_size <= 0:
-        chunk_size = len(uniq) or 1
-    for i in range(0, len(uniq), chunk_size):
-        yield uniq[i : i + chunk_size]
+_chunked_unique_codes = qmt_common.chunked_unique_codes
 
 
 def _log_end_of_day_entry_stats(trade_date):
@@ -1560,45 +1785,20 @@ def _log_end_of_day_entry_stats(trade_date):
     )
 
 
-def _normalize_trade_date(value):
-    """Normalize date-like value to YYYYMMDD."""
-    if value is None:
-        return ""
+_normalize_trade_date = qmt_common.normalize_trade_date
 
-    s = str(value).strip()
-    if not s:
-        return ""
 
-    digits = "".join(ch for ch in s if ch.isdigit())
-    if not digits:
-        return ""
+def _hit_rate(hit, total):
+    return round(float(hit) / total, 4) if total else 0.0
 
-    # epoch milliseconds
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
-        except Exception:
-            return ""
-
-    # epoch seconds
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
-        except Exception:
-            return ""
-
-    # datetime-like string
-    if len(digits) >= 8:
-        return digits[:8]
 
-    return ""
+def _log(msg):
+    LOG.info(msg)
 
 
-def _log(msg):
-    try:
-        print("[{0}] {1}".format(STRATEGY_NAME, msg))
-    except Exception:
-        pass
+def _log_debug(msg, *args):
+    """Formatted only when LOG_LEVEL is DEBUG."""
+    LOG.debug(msg, *args)
 
 
 def _log_once(key, msg):
@@ -0,0 +1,57 @@
+"""Parity test: backtest_engine.b2_daily_signals() screens like main.py (xtQMT).
+
+Replays main.build_daily_candidates() day by day against a fake QMT context
+serving a seeded synthetic universe, and compares codes and their order.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from strategies.st_dj20.parity_test import FakeDailyContext
+from tools.backtest_engine.intraday import B2_DAILY_DEFAULTS, b2_daily_signals
+from tools.data_adapter.synthetic import generate_market_data
+
+
+def load_qmt_script():
+    spec = importlib.util.spec_from_file_location("b2_basic_qmt", project_root / "strategies" / "b2_basic" / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.METRICS_FILE = ""
+    module.LOG.set_level("WARNING")
+    return module
+
+
+def test_parity():
+    market_data = generate_market_data(60, 1, seed=3)
+    qmt = load_qmt_script()
+
+    frames = {}
+    for code, df in market_data.items():
+        qmt_code = qmt.normalize_stock_code(code)
+        frames[qmt_code] = df.rename(columns={"vol": "volume"}).set_index("trade_date")
+    context = FakeDailyContext(frames)
+
+    qmt.g.universe = list(frames)
+    qmt.g.daily_fetch_sizer = qmt.qmt_common.ChunkSizer(qmt.BATCH_FETCH_CHUNK_SIZE)
+    qmt.g.trade_date = ""
+
+    signals = b2_daily_signals(market_data)
+    dates = sorted(next(iter(market_data.values()))["trade_date"])
+    total = 0
+    for t_date in dates[B2_DAILY_DEFAULTS["kdj_bars"] - 1:]:
+        expected = [c.split(".")[0] for c in qmt.build_daily_candidates(context, t_date)]
+        got = [c["code"] for c in signals.get(t_date, [])]
+        assert got == expected, f"{t_date}: panel {got} vs qmt {expected}"
+        total += len(expected)
+
+    assert total > 0, "synthetic universe produced no candidates"
+    print(f"PARITY TEST PASSED: {total} candidates across {len(dates)} dates")
+
+
+if __name__ == "__main__":
+    test_parity()
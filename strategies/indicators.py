@@ -0,0 +1,286 @@
+"""Panel indicator kernels shared by the offline strategy modules.
+
+A panel stacks a block of stocks as rows of (stocks x bars) matrices,
+left-aligned by bar index and NaN-padded on the right. TDX recursions
+(SMA, EMA) then take one vector step per bar across all stocks, and windows
+(HHV, LLV, MA) a few shifted passes, instead of Python loops per stock and
+per day. Every kernel repeats the operations of the per-stock loops it
+replaces in the same order, so results match them exactly.
+
+Windowed kernels put NaN where a full window is not available unless
+partial=True (TDX KDJ semantics: the first n-1 bars use what exists).
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BLOCK_SIZE = 512
+
+
+@dataclass
+class Panel:
+    """One block of stocks as aligned matrices."""
+    codes: list[str]
+    lengths: np.ndarray               # bars per stock
+    date_idx: np.ndarray              # (stocks x bars) index into the shared calendar, -1 in padding
+    fields: dict[str, np.ndarray]     # column -> (stocks x bars) float matrix
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.date_idx.shape
+
+    def bar_index(self) -> np.ndarray:
+        """(stocks x bars) bar number within each stock, for min-history masks."""
+        return np.broadcast_to(np.arange(self.shape[1]), self.shape)
+
+    def valid(self) -> np.ndarray:
+        return self.date_idx >= 0
+
+
+def build_calendar(market_data: dict[str, pd.DataFrame]) -> pd.Index:
+    """Sorted union of trade dates; Panel.date_idx positions refer to it."""
+    all_dates: set[str] = set()
+    for df in market_data.values():
+        all_dates.update(str(d) for d in df["trade_date"].values)
+    return pd.Index(sorted(all_dates))
+
+
+def iter_panels(
+    market_data: dict[str, pd.DataFrame],
+    columns: tuple[str, ...],
+    calendar: pd.Index,
+    min_bars: int = 1,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> Iterator[Panel]:
+    """Yield Panels of up to block_size stocks with at least min_bars bars.
+
+    Stocks keep market_data order across and within blocks. A column
+    missing from a frame is NaN for that stock.
+    """
+    items = [(code, df) for code, df in market_data.items() if len(df) >= min_bars]
+    for start in range(0, len(items), block_size):
+        block = items[start:start + block_size]
+        lengths = np.array([len(df) for _, df in block])
+        width = int(lengths.max())
+        date_idx = np.full((len(block), width), -1, dtype=np.int32)
+        fields = {col: np.full((len(block), width), np.nan) for col in columns}
+        for row, (_, df) in enumerate(block):
+            n = len(df)
+            date_idx[row, :n] = calendar.get_indexer(df["trade_date"].astype(str))
+            for col in columns:
+                if col in df.columns:
+                    fields[col][row, :n] = df[col].values.astype(float)
+        yield Panel([code for code, _ in block], lengths, date_idx, fields)
+
+
+def _rolling_extreme(mat: np.ndarray, n: int, partial: bool, func) -> np.ndarray:
+    out = mat.copy()
+    for k in range(1, min(n, mat.shape[1])):
+        func(out[:, k:], mat[:, :-k], out=out[:, k:])
+    if not partial:
+        out[:, :n - 1] = np.nan
+    return out
+
+
+def hhv(mat: np.ndarray, n: int, partial: bool = False) -> np.ndarray:
+    """HHV(X, n) per row; NaN propagates like np.max over the window."""
+    return _rolling_extreme(mat, n, partial, np.maximum)
+
+
+def llv(mat: np.ndarray, n: int, partial: bool = False) -> np.ndarray:
+    """LLV(X, n) per row; NaN propagates like np.min over the window."""
+    return _rolling_extreme(mat, n, partial, np.minimum)
+
+
+def ma(mat: np.ndarray, n: int) -> np.ndarray:
+    """MA(X, n) per row, summed oldest-first like sum(values[-n:]) / n."""
+    out = np.full(mat.shape, np.nan)
+    width = mat.shape[1]
+    if n <= 0 or width < n:
+        return out
+    total = mat[:, :width - n + 1].copy()
+    for k in range(1, n):
+        total += mat[:, k:width - n + 1 + k]
+    out[:, n - 1:] = total / float(n)
+    return out
+
+
+def ema(mat: np.ndarray, n: int) -> np.ndarray:
+    """EMA(X, n) per row, seeded with the first bar: alpha*x + (1-alpha)*prev."""
+    alpha = 2.0 / (n + 1.0)
+    out = np.empty(mat.shape)
+    if mat.shape[1] == 0:
+        return out
+    prev = mat[:, 0].copy()
+    out[:, 0] = prev
+    for t in range(1, mat.shape[1]):
+        prev = alpha * mat[:, t] + (1.0 - alpha) * prev
+        out[:, t] = prev
+    return out
+
+
+def sma(mat: np.ndarray, n: int, m: int, init: float | None = None) -> np.ndarray:
+    """TDX SMA(X, n, m) per row: ((n-m)*prev + m*x) / n.
+
+    Seeded with init, or with the first bar itself when init is None (TDX
+    default, as used by the brick chart).
+    """
+    out = np.empty(mat.shape)
+    if mat.shape[1] == 0:
+        return out
+    keep, weight, div = float(n - m), float(m), float(n)
+    if init is None:
+        prev = mat[:, 0].copy()
+        out[:, 0] = prev
+        start = 1
+    else:
+        prev = np.full(mat.shape[0], float(init))
+        start = 0
+    for t in range(start, mat.shape[1]):
+        prev = (keep * prev + weight * mat[:, t]) / div
+        out[:, t] = prev
+    return out
+
+
+def kdj(
+    close: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    n: int = 9,
+    k_init: float = 50.0,
+    d_init: float = 50.0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Panel KDJ(n, 3, 3) matching the per-stock compute_kdj loops.
+
+    RSV uses partial windows for the first n-1 bars and is 0 when the
+    window's high equals its low.
+    """
+    low_n = llv(low, n, partial=True)
+    high_n = hhv(high, n, partial=True)
+    span = high_n - low_n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(span == 0, 0.0, (close - low_n) / span * 100.0)
+    k = sma(rsv, 3, 1, k_init)
+    d = sma(k, 3, 1, d_init)
+    j = 3.0 * k - 2.0 * d
+    return k, d, j
+
+
+def brick_chart(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    n: int = 4,
+    offset: float = 4.0,
+) -> np.ndarray:
+    """Panel brick chart (ref/cdx.md).
+
+    VAR1A := (HHV(H,n)-C)/(HHV(H,n)-LLV(L,n))*100-90;
+    VAR2A := SMA(VAR1A,4,1)+100;
+    VAR3A := (C-LLV(L,n))/(HHV(H,n)-LLV(L,n))*100;
+    VAR4A := SMA(VAR3A,6,1);
+    VAR5A := SMA(VAR4A,6,1)+100;
+    VAR6A := VAR5A-VAR2A;
+    brick := IF(VAR6A>offset, VAR6A-offset, 0)
+
+    Windows are partial for the first n-1 bars and a flat window counts as
+    0 for both ratios, as in kdj(); the SMAs are seeded with their first bar.
+    """
+    high_n = hhv(high, n, partial=True)
+    low_n = llv(low, n, partial=True)
+    span = high_n - low_n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var1a = np.where(span == 0, 0.0, (high_n - close) / span * 100.0) - 90.0
+        var3a = np.where(span == 0, 0.0, (close - low_n) / span * 100.0)
+    var2a = sma(var1a, 4, 1) + 100.0
+    var4a = sma(var3a, 6, 1)
+    var5a = sma(var4a, 6, 1) + 100.0
+    var6a = var5a - var2a
+    return np.where(var6a > offset, var6a - offset, 0.0)
+
+
+def brick_turns(brick: np.ndarray) -> np.ndarray:
+    """CC := REF(AA,1)=0 && AA=1 with AA := REF(brick,1) < brick.
+
+    True on the first rising brick after a flat or falling one. The first
+    bar has no REF and never rises; the second turns if it rises.
+    """
+    rising = np.zeros(brick.shape, dtype=bool)
+    rising[:, 1:] = brick[:, :-1] < brick[:, 1:]
+    turns = np.zeros(brick.shape, dtype=bool)
+    turns[:, 1:] = ~rising[:, :-1] & rising[:, 1:]
+    return turns
+
+
+class SignalCollector:
+    """Accumulates screening hits from panel blocks and yields them by date.
+
+    add() takes the hit mask of one Panel plus per-bar value matrices; only
+    the hit cells are kept, as flat arrays. iter_dates() then walks the
+    calendar in order and builds candidate dicts one date at a time.
+    """
+
+    def __init__(self, calendar: pd.Index):
+        self.calendar = calendar
+        self.codes: list[str] = []
+        self._code: list[np.ndarray] = []
+        self._date: list[np.ndarray] = []
+        self._values: dict[str, list[np.ndarray]] = {}
+
+    def add(self, panel: Panel, hits: np.ndarray, values: dict[str, np.ndarray]):
+        offset = len(self.codes)
+        self.codes.extend(panel.codes)
+        rows, cols = np.nonzero(hits & panel.valid())
+        if rows.size == 0:
+            return
+        self._code.append(rows + offset)
+        self._date.append(panel.date_idx[rows, cols])
+        for name, mat in values.items():
+            self._values.setdefault(name, []).append(mat[rows, cols])
+
+    def iter_dates(
+        self,
+        make_candidate: Callable[[str, dict[str, float]], dict],
+        sort_by: str | None,
+        descending: bool = True,
+        top_k: int | None = None,
+    ) -> Iterator[tuple[str, list[dict]]]:
+        """Yield (trade_date, candidates) in date order.
+
+        Candidates are ordered by rounded sort_by (ties keep market_data
+        order), or kept in market_data order when sort_by is None, and
+        truncated to top_k when given.
+        """
+        if not self._code:
+            return
+        code = np.concatenate(self._code)
+        date = np.concatenate(self._date)
+        values = {name: np.concatenate(parts) for name, parts in self._values.items()}
+        if sort_by is None:
+            key = np.zeros(len(code))
+        else:
+            key = np.round(values[sort_by], 2)
+        if descending:
+            key = -key
+        # lexsort: last key is primary; np.nonzero order (stock-major) breaks ties
+        order = np.lexsort((code, key, date))
+        code, date = code[order], date[order]
+        values = {name: arr[order] for name, arr in values.items()}
+
+        bounds = np.flatnonzero(date[1:] != date[:-1]) + 1
+        starts = np.r_[0, bounds]
+        ends = np.r_[bounds, len(date)]
+        names = list(values)
+        for start, end in zip(starts, ends):
+            if top_k is not None:
+                end = min(end, start + top_k)
+            yield str(self.calendar[date[start]]), [
+                make_candidate(self.codes[code[i]], {name: values[name][i] for name in names})
+                for i in range(start, end)
+            ]
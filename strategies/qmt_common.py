@@ -0,0 +1,647 @@
+#coding:gbk
+"""
+Shared runtime helpers for the QMT scripts (stdlib only).
+
+The strategy scripts import this module instead of carrying their own copies
+of the fetch / normalize helpers, so a speed-up here reaches every strategy.
+
+Deployment: QMT runs each strategy file on its own, so qmt_common.py must be
+importable there -- copy it into the QMT Python path (e.g. the
+bin.x64/Lib/site-packages folder of the client). Local runs find it next to
+the strategy folders.
+
+Batch fetches size their chunks adaptively (ChunkSizer): codes per call follow
+the observed per-code latency and a rows-per-call cap, and codes a chunk did
+not return are retried once as a smaller batch rather than one by one.
+
+BufferedLogger replaces per-message print: levels are checked before any
+formatting and lines are written in one block per bar.
+
+RunMetrics collects per-stage timers and counters of one screening day and
+writes them as a single JSON line to the log and a rolling local file.
+
+Benchmarks: python tools/benchmarks/bench_qmt_common.py
+"""
+
+import datetime
+import json
+import os
+import re
+import tempfile
+import time
+
+DAILY_FIELDS = ["open", "high", "low", "close", "volume"]
+DEFAULT_CHUNK_SIZE = 200
+
+# Adaptive chunking bounds.
+MIN_CHUNK_SIZE = 20
+MAX_CHUNK_SIZE = 800
+TARGET_CALL_SECONDS = 1.0
+MAX_ROWS_PER_CALL = 120000
+RETRY_CHUNK_DIVISOR = 4
+CALL_LOG_SIZE = 200
+
+# Monotonic timer for per-call timings.
+clock = getattr(time, "perf_counter", time.time)
+
+# Rolling metrics file: <path>, <path>.1 ... <path>.N
+METRICS_FILE_MAX_BYTES = 5 * 1024 * 1024
+METRICS_FILE_BACKUPS = 3
+
+_NON_DIGIT = re.compile(r"\D")
+_SH_PREFIXES = ("600", "601", "603", "605", "688", "689")
+
+# Memo tables: codes and bar timestamps repeat across every fetch of a session.
+_CODE_CACHE = {}
+_DATE_KEY_CACHE = {}
+_TRADE_DATE_CACHE = {}
+_MEMO_MAX = 100000
+
+
+def _digits(value):
+    return _NON_DIGIT.sub("", str(value).strip())
+
+
+def normalize_stock_code(stock_code):
+    """Normalize symbol to 6-digit + .SH/.SZ if possible."""
+    if not stock_code:
+        return ""
+    # Fast path: already "XXXXXX.SH" / "XXXXXX.SZ".
+    if type(stock_code) is str and len(stock_code) == 9 and stock_code[6] == "." and stock_code[7:] in ("SH", "SZ"):
+        return stock_code
+    try:
+        return _CODE_CACHE[stock_code]
+    except (KeyError, TypeError):
+        pass
+
+    n = _normalize_stock_code_slow(stock_code)
+    try:
+        if len(_CODE_CACHE) >= _MEMO_MAX:
+            _CODE_CACHE.clear()
+        _CODE_CACHE[stock_code] = n
+    except TypeError:
+        pass
+    return n
+
+
+def _normalize_stock_code_slow(stock_code):
+    s = str(stock_code).strip().upper()
+    if not s:
+        return ""
+
+    if "." in s:
+        left, right = s.split(".", 1)
+        if len(left) == 6 and right in ("SH", "SZ"):
+            return left + "." + right
+        if len(left) == 6 and right in ("XSHG", "SSE"):
+            return left + ".SH"
+        if len(left) == 6 and right in ("XSHE", "SZSE"):
+            return left + ".SZ"
+        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
+            return right + ".SH"
+        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
+            return right + ".SZ"
+        return s
+
+    if len(s) == 6 and s.isdigit():
+        if s.startswith(_SH_PREFIXES):
+            return s + ".SH"
+        return s + ".SZ"
+    return s
+
+
+def normalize_trade_date(value):
+    """Normalize date-like value (YYYYMMDD*, epoch s/ms) to YYYYMMDD."""
+    if value is None:
+        return ""
+    if type(value) is str and len(value) == 8 and value.isdigit():
+        return value
+    try:
+        return _TRADE_DATE_CACHE[value]
+    except (KeyError, TypeError):
+        pass
+
+    d = _normalize_trade_date_slow(value)
+    try:
+        if len(_TRADE_DATE_CACHE) >= _MEMO_MAX:
+            _TRADE_DATE_CACHE.clear()
+        _TRADE_DATE_CACHE[value] = d
+    except TypeError:
+        pass
+    return d
+
+
+def _normalize_trade_date_slow(value):
+    digits = _digits(value)
+    if not digits:
+        return ""
+
+    # epoch milliseconds
+    if len(digits) == 13:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
+        except Exception:
+            return ""
+
+    # epoch seconds
+    if len(digits) == 10:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
+        except Exception:
+            return ""
+
+    # datetime-like string
+    if len(digits) >= 8:
+        return digits[:8]
+    return ""
+
+
+def parse_timetag(timetag, timetag_to_datetime=None):
+    """Parse a QMT bar timetag to datetime, or None.
+
+    timetag_to_datetime: the QMT builtin of that name, if the caller has it.
+    """
+    if not timetag:
+        return None
+
+    # Prefer QMT helper if available.
+    if timetag_to_datetime is not None:
+        try:
+            ts = timetag_to_datetime(timetag, "%Y%m%d%H%M%S")
+            return datetime.datetime.strptime(ts, "%Y%m%d%H%M%S")
+        except Exception:
+            pass
+
+    digits = _digits(timetag)
+
+    # Common format: YYYYMMDDHHMMSS
+    if len(digits) >= 14:
+        try:
+            return datetime.datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
+        except Exception:
+            pass
+
+    # Epoch milliseconds
+    if len(digits) == 13:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits) / 1000.0)
+        except Exception:
+            pass
+
+    # Epoch seconds
+    if len(digits) == 10:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits))
+        except Exception:
+            pass
+    return None
+
+
+def unique_codes(codes):
+    """Return normalized codes, de-duplicated, in input order."""
+    uniq = []
+    seen = set()
+    for c in codes or []:
+        n = normalize_stock_code(c)
+        if not n or n in seen:
+            continue
+        seen.add(n)
+        uniq.append(n)
+    return uniq
+
+
+def chunked_unique_codes(codes, chunk_size):
+    """Yield normalized, de-duplicated codes in chunks of chunk_size."""
+    uniq = unique_codes(codes)
+    if chunk_size <= 0:
+        chunk_size = len(uniq) or 1
+    for i in range(0, len(uniq), chunk_size):
+        yield uniq[i : i + chunk_size]
+
+
+class ChunkSizer(object):
+    """Adaptive codes-per-call for batched get_market_data_ex requests.
+
+    After each call the size moves halfway towards the count that would take
+    TARGET_CALL_SECONDS at the observed per-code latency; a failed or
+    over-long call halves it and caps later growth below the failing size.
+    max_rows caps codes * bars per call.
+    Recent calls are kept in .calls as dict(codes, hit, ms, ok) for logging.
+    """
+
+    def __init__(
+        self,
+        size=DEFAULT_CHUNK_SIZE,
+        min_size=MIN_CHUNK_SIZE,
+        max_size=MAX_CHUNK_SIZE,
+        target_seconds=TARGET_CALL_SECONDS,
+        max_rows=MAX_ROWS_PER_CALL,
+    ):
+        self.min_size = max(1, int(min_size))
+        self.max_size = max(self.min_size, int(max_size))
+        self.size = min(self.max_size, max(self.min_size, int(size)))
+        self.target_seconds = float(target_seconds)
+        self.max_rows = int(max_rows)
+        self.ceiling = self.max_size
+        self.calls = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.n_calls = 0
+        self.n_codes = 0
+        self.n_hit = 0
+        self.n_retry = 0
+        self.n_failed = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        del self.calls[:]
+
+    def chunk_size(self, bars_per_code=1):
+        """Codes for the next call, given the bars requested per code."""
+        size = self.size
+        if self.max_rows > 0 and bars_per_code > 0:
+            size = min(size, self.max_rows // int(bars_per_code))
+        return max(self.min_size, size)
+
+    def retry_size(self, bars_per_code=1):
+        return max(1, self.chunk_size(bars_per_code) // RETRY_CHUNK_DIVISOR)
+
+    def record(self, n_codes, n_hit, seconds, ok=True):
+        """Record one data call and adapt the chunk size."""
+        self.n_calls += 1
+        self.n_codes += n_codes
+        self.n_hit += n_hit
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if not ok:
+            self.n_failed += 1
+        self.calls.append({"codes": n_codes, "hit": n_hit, "ms": int(seconds * 1000), "ok": ok})
+        if len(self.calls) > CALL_LOG_SIZE:
+            del self.calls[0]
+
+        if not ok or seconds > 2.0 * self.target_seconds:
+            self.ceiling = max(self.min_size, min(self.ceiling, n_codes // 2))
+            self.size = max(self.min_size, min(self.size // 2, self.ceiling))
+        elif n_codes > 0 and seconds > 0:
+            ideal = self.target_seconds * n_codes / seconds
+            self.size = int(min(self.ceiling, max(self.min_size, (self.size + ideal) / 2.0)))
+        elif n_codes >= self.size:
+            self.size = min(self.ceiling, self.size * 2)
+
+    def summary(self):
+        """Call statistics since the last reset_stats(), as a dict."""
+        return {
+            "calls": self.n_calls,
+            "codes": self.n_codes,
+            "hit": self.n_hit,
+            "retry": self.n_retry,
+            "failed": self.n_failed,
+            "avg_ms": int(self.seconds * 1000 / self.n_calls) if self.n_calls else 0,
+            "max_ms": int(self.max_seconds * 1000),
+            "total_ms": int(self.seconds * 1000),
+            "chunk": self.size,
+        }
+
+    def describe(self, reset=False):
+        """One-line timing summary for logs; reset=True starts a new window."""
+        st = self.summary()
+        text = "calls={calls} codes={codes} hit={hit} retry={retry} failed={failed} avg_ms={avg_ms} max_ms={max_ms} total_ms={total_ms} chunk={chunk}".format(
+            **st
+        )
+        if reset:
+            self.reset_stats()
+        return text
+
+
+def iter_adaptive_chunks(codes, sizer, bars_per_code=1, retry=False):
+    """Yield slices of codes, re-reading the sizer before every slice."""
+    i = 0
+    while i < len(codes):
+        n = sizer.retry_size(bars_per_code) if retry else sizer.chunk_size(bars_per_code)
+        yield codes[i : i + n]
+        i += n
+
+
+def _index_date_key(idx):
+    try:
+        return _DATE_KEY_CACHE[idx]
+    except (KeyError, TypeError):
+        pass
+    digits = _digits(idx)
+    key = digits[:8] if len(digits) >= 8 else ""
+    try:
+        if len(_DATE_KEY_CACHE) >= _MEMO_MAX:
+            _DATE_KEY_CACHE.clear()
+        _DATE_KEY_CACHE[idx] = key
+    except TypeError:
+        pass
+    return key
+
+
+def daily_df_to_bars(df):
+    """Convert a daily OHLCV DataFrame to bar dicts, column-wise.
+
+    Each bar: {"date": "YYYYMMDD", "open", "high", "low", "close", "volume"};
+    rows with non-numeric values are skipped.
+    """
+    try:
+        index = list(df.index)
+        columns = [df[field].tolist() for field in DAILY_FIELDS]
+    except Exception:
+        return []
+
+    bars = []
+    for idx, o, h, l, c, v in zip(index, *columns):
+        try:
+            bars.append(
+                {
+                    "date": _index_date_key(idx),
+                    "open": float(o),
+                    "high": float(h),
+                    "low": float(l),
+                    "close": float(c),
+                    "volume": float(v),
+                }
+            )
+        except Exception:
+            continue
+    return bars
+
+
+def _end_time_candidates(end_date):
+    return [end_date, end_date + "150000", end_date + "235959", ""]
+
+
+def fetch_daily_bars(context, code, end_date, count):
+    """Return list of daily bars up to end_date (inclusive), ascending by date."""
+    end_date = normalize_trade_date(end_date)
+
+    df = None
+    for end_ts in _end_time_candidates(end_date):
+        try:
+            data = context.get_market_data_ex(
+                DAILY_FIELDS,
+                [code],
+                period="1d",
+                start_time="",
+                end_time=end_ts,
+                count=count,
+                dividend_type="none",
+                fill_data=True,
+                subscribe=True,
+            )
+            cur = data.get(code)
+            if cur is not None and (not cur.empty):
+                df = cur
+                break
+        except Exception:
+            continue
+    if df is None or df.empty:
+        return []
+    return daily_df_to_bars(df)
+
+
+def _fetch_daily_chunk(context, batch_codes, end_candidates, count, sizer, result):
+    """One chunk through the end_time candidates; fill result, return hit count.
+
+    A variant that raises moves on to the next one, since client builds
+    reject some end_time formats. The sizer sees one call per chunk, a
+    failure only when every variant raised (e.g. a chunk too big for this
+    client, left to the smaller retry).
+    """
+    hit = 0
+    t_start = clock()
+    seconds = None
+    for end_ts in end_candidates:
+        t0 = clock()
+        try:
+            data = context.get_market_data_ex(
+                DAILY_FIELDS,
+                list(batch_codes),
+                period="1d",
+                start_time="",
+                end_time=end_ts,
+                count=count,
+                dividend_type="none",
+                fill_data=True,
+                subscribe=True,
+            )
+        except Exception:
+            continue
+        seconds = clock() - t0
+        if not data:
+            continue
+        for code in batch_codes:
+            try:
+                df = data.get(code)
+                if df is None or df.empty:
+                    continue
+                bars = daily_df_to_bars(df)
+                if bars:
+                    result[code] = bars
+                    hit += 1
+            except Exception:
+                continue
+        break
+    if seconds is None:
+        sizer.record(len(batch_codes), 0, clock() - t_start, ok=False)
+    else:
+        sizer.record(len(batch_codes), hit, seconds)
+    return hit
+
+
+def fetch_daily_bars_batch(context, codes, end_date, count, chunk_size=DEFAULT_CHUNK_SIZE, sizer=None):
+    """Batch fetch daily bars for codes with adaptive chunk sizes.
+
+    sizer: ChunkSizer kept across calls (e.g. on g); a fresh one starting at
+    chunk_size is used when omitted. Codes missing after the first pass are
+    retried once in smaller batches.
+    Return: dict(code -> bars list); codes without data are omitted.
+    """
+    result = {}
+    end_date = normalize_trade_date(end_date)
+    if not codes or not end_date:
+        return result
+    if sizer is None:
+        sizer = ChunkSizer(chunk_size)
+
+    end_candidates = _end_time_candidates(end_date)
+    uniq = unique_codes(codes)
+    failed_before = sizer.n_failed
+    for batch_codes in iter_adaptive_chunks(uniq, sizer, count):
+        _fetch_daily_chunk(context, batch_codes, end_candidates, count, sizer, result)
+
+    # Retry only when the source answered for other codes or a call failed;
+    # a date with no data at all would just repeat the same misses.
+    missing = [c for c in uniq if c not in result]
+    if missing and (result or sizer.n_failed > failed_before):
+        sizer.n_retry += len(missing)
+        for batch_codes in iter_adaptive_chunks(missing, sizer, count, retry=True):
+            _fetch_daily_chunk(context, batch_codes, end_candidates, count, sizer, result)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Run metrics
+# ---------------------------------------------------------------------------
+
+class _StageTimer(object):
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self):
+        self.t0 = clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.add_time(self.name, clock() - self.t0)
+        return False
+
+
+class RunMetrics(object):
+    """Stage timers and counters for one screening day.
+
+    with metrics.stage("fetch"): ...   # accumulates stages_ms["fetch"]
+    metrics.count("bars_short")       # counters["bars_short"] += 1
+    metrics.set("fetch", sizer.summary())
+    metrics.emit(_log, METRICS_FILE)  # one JSON line
+    """
+
+    def __init__(self, strategy, trade_date):
+        self.fields = {"strategy": strategy, "date": trade_date}
+        self.stages_ms = {}
+        self.counters = {}
+        self._t0 = clock()
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def add_time(self, name, seconds):
+        self.stages_ms[name] = self.stages_ms.get(name, 0.0) + seconds * 1000.0
+
+    def count(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def update_counters(self, stats, prefix=""):
+        """Copy the numeric entries of a filter stats dict into counters."""
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.counters[prefix + key] = value
+
+    def set(self, key, value):
+        self.fields[key] = value
+
+    def to_dict(self):
+        out = dict(self.fields)
+        out["stages_ms"] = dict((k, round(v, 1)) for k, v in self.stages_ms.items())
+        out["counters"] = dict(self.counters)
+        out["elapsed_ms"] = round((clock() - self._t0) * 1000.0, 1)
+        return out
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+
+    def emit(self, log=None, path=""):
+        """Send the JSON line to log(msg) and append it to path (rolling)."""
+        line = self.to_json()
+        if log is not None:
+            log("metrics " + line)
+        if path:
+            append_rolling_line(path, line)
+        return line
+
+
+def default_metrics_path(strategy):
+    """<tmp>/qmt_metrics/<strategy>.jsonl"""
+    return os.path.join(tempfile.gettempdir(), "qmt_metrics", strategy + ".jsonl")
+
+
+def append_rolling_line(path, line, max_bytes=METRICS_FILE_MAX_BYTES, backups=METRICS_FILE_BACKUPS):
+    """Append one line to path, rotating to path.1 .. path.N past max_bytes."""
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        if max_bytes > 0 and os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            for i in range(backups - 1, 0, -1):
+                src = "{0}.{1}".format(path, i)
+                if os.path.exists(src):
+                    os.replace(src, "{0}.{1}".format(path, i + 1))
+            if backups > 0:
+                os.replace(path, path + ".1")
+            else:
+                os.remove(path)
+        with open(path, "a") as f:
+            f.write(line + "\n")
+        return True
+    except Exception:
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+_LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING}
+
+
+class BufferedLogger(object):
+    """Leveled "[prefix] msg" logger that prints in batches.
+
+    log.debug(fmt, *args) formats only when DEBUG is enabled; hot loops can
+    test log.debug_enabled to skip building arguments at all. Lines are held
+    until flush() (the scripts call it once per bar) or max_lines.
+    """
+
+    def __init__(self, prefix, level=INFO, max_lines=500, sink=None):
+        self.prefix = "[{0}] ".format(prefix)
+        self.max_lines = max_lines
+        self.sink = sink
+        self.lines = []
+        self.set_level(level)
+
+    def set_level(self, level):
+        if not isinstance(level, int):
+            level = _LEVELS.get(str(level).upper(), INFO)
+        self.level = level
+        self.debug_enabled = level <= DEBUG
+
+    def log(self, level, msg, *args):
+        if level < self.level:
+            return
+        try:
+            if args:
+                msg = msg.format(*args)
+            self.lines.append(self.prefix + str(msg))
+        except Exception:
+            return
+        if len(self.lines) >= self.max_lines:
+            self.flush()
+
+    def debug(self, msg, *args):
+        if self.debug_enabled:
+            self.log(DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(WARNING, msg, *args)
+
+    def flush(self):
+        if not self.lines:
+            return
+        text = "\n".join(self.lines)
+        del self.lines[:]
+        try:
+            if self.sink is not None:
+                self.sink(text)
+            else:
+                print(text)
+        except Exception:
+            pass
@@ -0,0 +1,5 @@
+"""st_b1 strategy package (main.py is the xtQMT script)."""
+
+from .strategy import generate_signals, get_default_config, iter_signals
+
+__all__ = ["generate_signals", "get_default_config", "iter_signals"]
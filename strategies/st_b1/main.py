@@ -26,6 +26,30 @@ try:
 except Exception:
     xtdata = None
 
+try:
+    import qmt_common
+except ImportError:
+    import os
+    import sys
+
+    # Local runs: qmt_common.py lives in strategies/, next to this script's folder.
+    # QMT built-in scripts have no __file__ and need it on QMT's Python path.
+    _script_file = globals().get("__file__")
+    if _script_file:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(_script_file))))
+    try:
+        import qmt_common
+    except ImportError:
+        raise ImportError(
+            "qmt_common.py not found: copy strategies/qmt_common.py into the QMT "
+            "Python path (e.g. bin.x64/Lib/site-packages), see README.md"
+        ) from None
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
 
 class G:
     pass
@@ -34,6 +58,11 @@ class G:
 g = G()
 
 STRATEGY_NAME = "st_b1"
+# One JSON line of stage timings / filter counts per day; "" disables the file.
+METRICS_FILE = qmt_common.default_metrics_path(STRATEGY_NAME)
+# "DEBUG" adds per-code diagnostics; log lines are printed once per bar.
+LOG_LEVEL = "INFO"
+LOG = qmt_common.BufferedLogger(STRATEGY_NAME, LOG_LEVEL)
 ACCOUNT_ID = "testS"
 ACCOUNT_TYPE = "stock"
 
@@ -50,6 +79,7 @@ SHADOW_ABS_DIFF_MAX = 0.1
 FLOAT_MV_MIN_100M = 50.0
 DAILY_BAR_COUNT = 180
 
+# Initial codes per batch call; qmt_common.ChunkSizer adapts it from call timing.
 BATCH_FETCH_CHUNK_SIZE = 200
 MAX_LOG_CODES = 20
 
@@ -59,6 +89,7 @@ UNIVERSE_SECTOR_NAMES = (
     "\u6caa\u6df1A\u80a1",
     "A\u80a1",
 )
+MAIN_BOARD_PREFIXES = frozenset(("600", "601", "603", "605", "000", "001", "002"))
 
 # Try these names for float market value.
 FLOAT_MV_FIELD_CANDIDATES = (
@@ -95,6 +126,7 @@ def init(context):
         except Exception:
             _log("set_account failed; continue")
 
+    g.daily_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
     g.universe = get_universe(context)
     if g.universe and hasattr(context, "set_universe"):
         try:
@@ -106,12 +138,22 @@ def init(context):
     g.latest_candidates = []
     g.float_mv_cache = {}
     g.float_mv_cache_date = ""
+    g.float_mv_source = None
     g.logged_once = set()
 
     _log("init done, universe={0}".format(len(g.universe)))
+    LOG.flush()
 
 
 def handlebar(context):
+    """Called on each minute bar; buffered log lines are flushed after it."""
+    try:
+        _handlebar(context)
+    finally:
+        LOG.flush()
+
+
+def _handlebar(context):
     now = _get_current_dt(context)
     if now is None:
         return
@@ -154,74 +196,89 @@ def build_candidates(context, t_date):
         "float_mv_fail": 0,
     }
 
-    daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_BAR_COUNT)
+    metrics = qmt_common.RunMetrics(STRATEGY_NAME, g.last_run_trade_date)
+    metrics.set("t_date", t_date)
+    with metrics.stage("fetch"):
+        daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_BAR_COUNT)
+    metrics.set("fetch", g.daily_fetch_sizer.summary())
+    metrics.set("batch_hit_rate", _hit_rate(len(daily_batch), len(g.universe)))
+    _log(
+        "daily_batch_fetch date={0} hit={1} {2}".format(
+            t_date, len(daily_batch), g.daily_fetch_sizer.describe(reset=True)
+        )
+    )
     min_bars = max(M4, KDJ_N + 2, EMA_N * 3)
+    mv_pending = []
 
-    for code in g.universe:
-        bars = daily_batch.get(code)
-        if not bars:
-            bars = fetch_daily_bars(context, code, t_date, DAILY_BAR_COUNT)
-        if len(bars) < min_bars:
-            stats["bars_short"] += 1
-            continue
+    with metrics.stage("compute"):
+        bars_by_code = {}
+        for code in g.universe:
+            # Misses were already retried as smaller batches inside the fetch.
+            bars = daily_batch.get(code) or []
+            bars_by_code[code] = bars
 
-        closes = [b["close"] for b in bars]
-        bar_t = bars[-1]
+        line_table = calc_lines_batch(
+            dict((code, [b["close"] for b in bars]) for code, bars in bars_by_code.items() if len(bars) >= min_bars)
+        )
 
-        short_line = calc_double_ema_last(closes, EMA_N)
-        ma1 = calc_ma_last(closes, M1)
-        ma2 = calc_ma_last(closes, M2)
-        ma3 = calc_ma_last(closes, M3)
-        ma4 = calc_ma_last(closes, M4)
-        if (
-            short_line is None
-            or ma1 is None
-            or ma2 is None
-            or ma3 is None
-            or ma4 is None
-        ):
-            stats["bars_short"] += 1
-            continue
-        duokong_line = (ma1 + ma2 + ma3 + ma4) / 4.0
+    with metrics.stage("filter"):
+        for code in g.universe:
+            bars = bars_by_code[code]
+            if len(bars) < min_bars:
+                stats["bars_short"] += 1
+                continue
 
-        _, _, j_list = compute_kdj(bars, KDJ_N, KDJ_INIT, KDJ_INIT)
-        if not j_list or j_list[-1] >= 20.0:
-            stats["kdj_fail"] += 1
-            continue
+            bar_t = bars[-1]
+            lines = line_table.get(code)
+            if lines is None:
+                stats["bars_short"] += 1
+                continue
+            short_line, duokong_line = lines
 
-        c = bar_t["close"]
-        o = bar_t["open"]
-        h = bar_t["high"]
-        l = bar_t["low"]
+            _, _, j_list = compute_kdj(bars, KDJ_N, KDJ_INIT, KDJ_INIT)
+            if not j_list or j_list[-1] >= 20.0:
+                stats["kdj_fail"] += 1
+                continue
 
-        if c <= duokong_line:
-            stats["price_duokong_fail"] += 1
-            continue
-        if c >= short_line:
-            stats["price_short_fail"] += 1
-            continue
-        if short_line <= duokong_line:
-            stats["line_order_fail"] += 1
-            continue
+            c = bar_t["close"]
+            o = bar_t["open"]
+            h = bar_t["high"]
+            l = bar_t["low"]
 
-        lower_shadow = min(c, o) - l
-        upper_shadow = h - max(c, o)
-        shadow_ok = (lower_shadow > upper_shadow) or (
-            abs(lower_shadow - upper_shadow) < SHADOW_ABS_DIFF_MAX
-        )
-        if not shadow_ok:
-            stats["shadow_fail"] += 1
-            continue
+            if c <= duokong_line:
+                stats["price_duokong_fail"] += 1
+                continue
+            if c >= short_line:
+                stats["price_short_fail"] += 1
+                continue
+            if short_line <= duokong_line:
+                stats["line_order_fail"] += 1
+                continue
 
-        float_mv_100m = get_float_mv_100m(context, code, t_date, c)
-        if float_mv_100m is None:
-            stats["float_mv_missing"] += 1
-            continue
-        if float_mv_100m <= FLOAT_MV_MIN_100M:
-            stats["float_mv_fail"] += 1
-            continue
+            lower_shadow = min(c, o) - l
+            upper_shadow = h - max(c, o)
+            shadow_ok = (lower_shadow > upper_shadow) or (
+                abs(lower_shadow - upper_shadow) < SHADOW_ABS_DIFF_MAX
+            )
+            if not shadow_ok:
+                stats["shadow_fail"] += 1
+                continue
 
-        candidates.append(code)
+            mv_pending.append((code, c))
+
+    # Float MV is the last filter: resolve it in bulk for the survivors.
+    with metrics.stage("float_mv"):
+        mv_table = load_float_mv_table(context, [code for code, _ in mv_pending], t_date, dict(mv_pending))
+        for code, _ in mv_pending:
+            float_mv_100m = mv_table.get(code)
+            if float_mv_100m is None:
+                stats["float_mv_missing"] += 1
+                continue
+            if float_mv_100m <= FLOAT_MV_MIN_100M:
+                stats["float_mv_fail"] += 1
+                continue
+
+            candidates.append(code)
 
     _log(
         "filter_stats total={0} bars_short={1} kdj_fail={2} price_duokong_fail={3} "
@@ -239,39 +296,91 @@ def build_candidates(context, t_date):
             len(candidates),
         )
     )
+    metrics.update_counters(stats)
+    metrics.count("pass", len(candidates))
+    metrics.emit(_log, METRICS_FILE)
     return candidates
 
 
 def get_float_mv_100m(context, code, trade_date, close_price):
-    key = "{0}|{1}".format(code, trade_date)
-    if key in g.float_mv_cache:
-        return g.float_mv_cache[key]
-
-    # 1) Try market-data extended fields.
-    value = _try_float_mv_from_market_data(context, code, trade_date)
-    if value is not None:
-        g.float_mv_cache[key] = value
-        return value
+    return load_float_mv_table(context, [code], trade_date, {code: close_price}).get(code)
+
+
+def load_float_mv_table(context, codes, trade_date, close_by_code):
+    """Return code -> float market value (100m RMB) for codes, in bulk.
+
+    Results are cached per trading date in g.float_mv_cache. Whichever source
+    worked first (a market-data field + end-time variant, or instrument
+    detail) is remembered in g.float_mv_source so later days skip probing.
+    """
+    table = {}
+    pending = []
+    for code in codes:
+        key = "{0}|{1}".format(code, trade_date)
+        if key in g.float_mv_cache:
+            table[code] = g.float_mv_cache[key]
+        else:
+            pending.append(code)
+    if not pending:
+        return table
+
+    found = {}
+    source = g.float_mv_source
+    market_data_answered = False
+    if source is None or source[0] == "market_data":
+        # 1) Try market-data extended fields.
+        market_data_answered = _float_mv_from_market_data_batch(context, pending, trade_date, found)
+    remaining = [code for code in pending if code not in found]
+    if remaining:
+        # 2) Try instrument detail. Only settle on it when market data
+        # answered without the field; if every call raised, probe again later.
+        detail_values = _float_mv_from_detail_batch(remaining, close_by_code)
+        if (
+            g.float_mv_source is None
+            and market_data_answered
+            and any(v is not None for v in detail_values.values())
+        ):
+            g.float_mv_source = ("detail",)
+            _log("float_mv_source=instrument_detail")
+        found.update(detail_values)
+
+    for code in pending:
+        value = found.get(code)
+        g.float_mv_cache["{0}|{1}".format(code, trade_date)] = value
+        table[code] = value
+    return table
 
-    # 2) Try instrument detail.
-    value = _try_float_mv_from_detail(code, close_price)
-    g.float_mv_cache[key] = value
-    return value
 
+def _float_mv_from_market_data_batch(context, codes, trade_date, found):
+    """Fill found from market-data float-MV fields, one call per chunk.
 
-def _try_float_mv_from_market_data(context, code, trade_date):
+    Walks FLOAT_MV_FIELD_CANDIDATES x end-time variants for codes still
+    missing, unless g.float_mv_source already names the combination to use;
+    the first combination that returns values is remembered there. Returns
+    True if any call answered (even without values), False if all raised.
+    """
     end_date = _normalize_trade_date(trade_date)
     end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-
-    for field in FLOAT_MV_FIELD_CANDIDATES:
-        for end_ts in end_candidates:
+    source = g.float_mv_source
+    if source is not None:
+        plan = [(source[1], source[2])]
+    else:
+        plan = [(field, i) for field in FLOAT_MV_FIELD_CANDIDATES for i in range(len(end_candidates))]
+
+    answered = False
+    for field, end_idx in plan:
+        pending = [code for code in codes if code not in found]
+        if not pending:
+            break
+        hit = False
+        for batch_codes in _chunked_unique_codes(pending, BATCH_FETCH_CHUNK_SIZE):
             try:
                 data = context.get_market_data_ex(
                     [field],
-                    [code],
+                    list(batch_codes),
                     period="1d",
                     start_time="",
-                    end_time=end_ts,
+                    end_time=end_candidates[end_idx],
                     count=1,
                     dividend_type="none",
                     fill_data=True,
@@ -279,35 +388,73 @@ def _try_float_mv_from_market_data(context, code, trade_date):
                 )
             except Exception:
                 continue
-
-            try:
-                df = data.get(code)
-            except Exception:
-                df = None
-            if df is None or df.empty:
+            answered = True
+            if not data:
                 continue
+            for code in batch_codes:
+                value = _float_mv_from_df(data.get(code), field)
+                if value is not None:
+                    found[code] = value
+                    hit = True
+        if hit and g.float_mv_source is None:
+            g.float_mv_source = ("market_data", field, end_idx)
+            _log("float_mv_source=market_data field={0} end_variant={1}".format(field, end_idx))
+    return answered
+
+
+def _float_mv_from_df(df, field):
+    if df is None:
+        return None
+    try:
+        if df.empty:
+            return None
+    except Exception:
+        return None
+
+    value = None
+    try:
+        if field in df.columns:
+            value = _to_float(df[field].iloc[-1])
+    except Exception:
+        value = None
 
+    if value is None:
+        try:
+            row = df.iloc[-1]
+            value = _to_float(row.get(field))
+        except Exception:
             value = None
-            try:
-                if field in df.columns:
-                    value = _to_float(df[field].iloc[-1])
-            except Exception:
-                value = None
+    return normalize_mv_to_100m(value)
 
-            if value is None:
-                try:
-                    row = df.iloc[-1]
-                    value = _to_float(row.get(field))
-                except Exception:
-                    value = None
 
-            value = normalize_mv_to_100m(value)
-            if value is not None:
-                return value
-    return None
+def _float_mv_from_detail_batch(codes, close_by_code):
+    """Float MV from instrument detail: direct MV keys, else float shares x close."""
+    result = {}
+    shares_by_code = {}
+    for code in codes:
+        mv_val, shares = _instrument_float_fields(code)
+        if mv_val is not None:
+            result[code] = mv_val
+        elif shares is not None:
+            shares_by_code[code] = shares
+
+    # Codes that only expose float shares: MV = shares x T close, None without a close.
+    for code, shares in shares_by_code.items():
+        close_price = close_by_code.get(code) or 0.0
+        result[code] = normalize_mv_to_100m(shares * close_price) if close_price > 0 else None
+
+    for code in codes:
+        if result.get(code) is None:
+            result[code] = None
+            _log_once(
+                "float_mv_missing_path",
+                "float market value unavailable via market_data and instrument_detail",
+            )
+    return result
 
 
-def _try_float_mv_from_detail(code, close_price):
+def _instrument_float_fields(code):
+    """Return (float_mv_100m, float_shares) from instrument detail, either may be None."""
     detail = None
     if xtdata is not None and hasattr(xtdata, "get_instrument_detail"):
         try:
@@ -324,33 +471,20 @@ def _try_float_mv_from_detail(code, close_price):
                 detail = None
 
     if not isinstance(detail, dict):
-        return None
+        return None, None
 
     mv_val = extract_number_by_keys(detail, FLOAT_MV_KEY_CANDIDATES)
     mv_val = normalize_mv_to_100m(mv_val)
     if mv_val is not None:
-        return mv_val
+        return mv_val, None
 
     shares = extract_number_by_keys(detail, FLOAT_SHARES_KEY_CANDIDATES)
-    if shares is None or close_price <= 0:
-        _log_once(
-            "float_mv_missing_path",
-            "float market value unavailable via market_data and instrument_detail",
-        )
-        return None
-
+    if shares is None:
+        return None, None
     # Heuristic: some APIs store float shares in 10k-share units.
     if shares < 1e7:
         shares = shares * 10000.0
-
-    mv = shares * close_price
-    value = normalize_mv_to_100m(mv)
-    if value is None:
-        _log_once(
-            "float_mv_missing_path",
-            "float market value unavailable via market_data and instrument_detail",
-        )
-    return value
+    return None, shares
 
 
 def normalize_mv_to_100m(value):
@@ -411,6 +545,70 @@ def _to_float(value):
         return None
 
 
+def calc_lines_batch(closes_by_code):
+    """Return code -> (short_line, duokong_line), or None if history is short.
+
+    Codes are grouped by history length into (stocks x bars) close matrices so
+    the double EMA runs as one vector recurrence per group and each M1-M4 MA
+    as one pass over columns. Falls back to per-code helpers without numpy.
+    """
+    result = {}
+    if np is None:
+        for code, closes in closes_by_code.items():
+            result[code] = _calc_lines_last(closes)
+        return result
+
+    groups = {}
+    for code, closes in closes_by_code.items():
+        groups.setdefault(len(closes), []).append(code)
+    for length, codes in groups.items():
+        if length == 0:
+            for code in codes:
+                result[code] = None
+            continue
+        mat = np.array([closes_by_code[code] for code in codes], dtype=float)
+        short = double_ema_last_matrix(mat, EMA_N)
+        mas = [ma_last_matrix(mat, window) for window in (M1, M2, M3, M4)]
+        if any(ma is None for ma in mas):
+            for code in codes:
+                result[code] = None
+            continue
+        duokong = (mas[0] + mas[1] + mas[2] + mas[3]) / 4.0
+        for i, code in enumerate(codes):
+            result[code] = (float(short[i]), float(duokong[i]))
+    return result
+
+
+def _calc_lines_last(closes):
+    short_line = calc_double_ema_last(closes, EMA_N)
+    mas = [calc_ma_last(closes, window) for window in (M1, M2, M3, M4)]
+    if short_line is None or any(ma is None for ma in mas):
+        return None
+    return short_line, (mas[0] + mas[1] + mas[2] + mas[3]) / 4.0
+
+
+def double_ema_last_matrix(mat, n):
+    """Last EMA(EMA(row, n), n) for every row of a (stocks x bars) matrix."""
+    alpha = 2.0 / (n + 1.0)
+    ema1 = mat[:, 0].copy()
+    ema2 = ema1.copy()
+    for t in range(1, mat.shape[1]):
+        ema1 = alpha * mat[:, t] + (1.0 - alpha) * ema1
+        ema2 = alpha * ema1 + (1.0 - alpha) * ema2
+    return ema2
+
+
+def ma_last_matrix(mat, window):
+    """Last MA(row, window) for every row; None if rows are shorter than window."""
+    if window <= 0 or mat.shape[1] < window:
+        return None
+    # Accumulate oldest-first like sum() so results match calc_ma_last exactly.
+    total = mat[:, -window].copy()
+    for t in range(mat.shape[1] - window + 1, mat.shape[1]):
+        total += mat[:, t]
+    return total / float(window)
+
+
 def calc_ma_last(values, window):
     if len(values) < window or window <= 0:
         return None
@@ -479,6 +677,25 @@ def compute_kdj(bars, n, k_init, d_init):
 
 
 def get_universe(context):
+    """Return the main-board universe, cached per trading date.
+
+    Only non-empty results are cached, so callers that retry on an empty
+    universe still re-query the sector APIs.
+    """
+    now = _get_current_dt(context)
+    date_key = now.strftime("%Y%m%d") if now is not None else ""
+    cache = getattr(g, "universe_cache", None)
+    if cache and cache["date"] == date_key and cache["codes"]:
+        _log("universe_source=cache date={0} size={1}".format(date_key, len(cache["codes"])))
+        return list(cache["codes"])
+
+    codes = _resolve_universe(context)
+    if codes:
+        g.universe_cache = {"date": date_key, "codes": list(codes)}
+    return codes
+
+
+def _resolve_universe(context):
     sector_codes = _get_main_board_universe_from_sector(context)
 
     ctx_codes = []
@@ -518,37 +735,31 @@ def get_universe(context):
 
 
 def _get_main_board_universe_from_sector(context):
-    all_codes = []
+    """Load A-share list from sector APIs (context/global/xtdata).
 
+    Sources are tried in that order per sector name and the first one that
+    returns codes wins, since they expose the same sector lists.
+    """
+    getters = []
     if hasattr(context, "get_stock_list_in_sector"):
-        for name in UNIVERSE_SECTOR_NAMES:
-            try:
-                codes = context.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
-            except Exception:
-                pass
+        getters.append(context.get_stock_list_in_sector)
+    func = globals().get("get_stock_list_in_sector")
+    if callable(func):
+        getters.append(func)
+    xt_func = getattr(xtdata, "get_stock_list_in_sector", None) if xtdata is not None else None
+    if callable(xt_func):
+        getters.append(xt_func)
 
-    if "get_stock_list_in_sector" in globals():
-        func = globals().get("get_stock_list_in_sector")
-        if callable(func):
-            for name in UNIVERSE_SECTOR_NAMES:
-                try:
-                    codes = func(name)
-                    if codes:
-                        all_codes.extend(list(codes))
-                except Exception:
-                    pass
-
-    if xtdata is not None:
-        for name in UNIVERSE_SECTOR_NAMES:
+    all_codes = []
+    for name in UNIVERSE_SECTOR_NAMES:
+        for getter in getters:
             try:
-                codes = xtdata.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
+                codes = getter(name)
             except Exception:
-                pass
-
+                continue
+            if codes:
+                all_codes.extend(list(codes))
+                break
     return all_codes
 
 
@@ -556,7 +767,11 @@ def _normalize_main_board_codes(codes):
     normalized = []
     seen = set()
     for c in codes or []:
-        n = normalize_stock_code(c)
+        # Fast path: already "XXXXXX.SH" / "XXXXXX.SZ".
+        if type(c) is str and len(c) == 9 and c[6] == "." and c[7:] in ("SH", "SZ"):
+            n = c
+        else:
+            n = normalize_stock_code(c)
         if not n or (n in seen):
             continue
         if not is_main_board_a_share(n):
@@ -567,73 +782,16 @@ def _normalize_main_board_codes(codes):
 
 
 def fetch_daily_bars_batch(context, codes, end_date, count):
-    result = {}
-    end_date = _normalize_trade_date(end_date)
-    if not end_date:
-        return result
-
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-    for batch_codes in _chunked_unique_codes(codes, BATCH_FETCH_CHUNK_SIZE):
-        data = {}
-        for end_ts in end_candidates:
-            try:
-                data = context.get_market_data_ex(
-                    ["open", "high", "low", "close", "volume"],
-                    list(batch_codes),
-                    period="1d",
-                    start_time="",
-                    end_time=end_ts,
-                    count=count,
-                    dividend_type="none",
-                    fill_data=True,
-                    subscribe=True,
-                )
-                if data:
-                    break
-            except Exception:
-                data = {}
-        if not data:
-            continue
-        for code in batch_codes:
-            try:
-                df = data.get(code)
-                if df is None or df.empty:
-                    continue
-                bars = _daily_df_to_bars(df)
-                if bars:
-                    result[code] = bars
-            except Exception:
-                continue
-    return result
+    """Batch fetch daily bars for codes; chunks adapt to observed latency.
 
+    Return: dict(code -> bars list)
+    """
+    return qmt_common.fetch_daily_bars_batch(
+        context, codes, end_date, count, BATCH_FETCH_CHUNK_SIZE, getattr(g, "daily_fetch_sizer", None)
+    )
 
-def fetch_daily_bars(context, code, end_date, count):
-    end_date = _normalize_trade_date(end_date)
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
 
-    df = None
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                [code],
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            cur = data.get(code)
-            if cur is not None and (not cur.empty):
-                df = cur
-                break
-        except Exception:
-            continue
-    if df is None or df.empty:
-        return []
-    return _daily_df_to_bars(df)
+fetch_daily_bars = qmt_common.fetch_daily_bars
 
 
 def get_trading_calendar_prev_date(context, date_str):
@@ -668,151 +826,38 @@ def _get_current_dt(context):
 
 
 def _parse_timetag(timetag):
-    if not timetag:
-        return None
-
-    if "timetag_to_datetime" in globals():
-        try:
-            ts = timetag_to_datetime(timetag, "%Y%m%d%H%M%S")
-            return datetime.datetime.strptime(ts, "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    digits = "".join(ch for ch in str(timetag).strip() if ch.isdigit())
-    if len(digits) >= 14:
-        try:
-            return datetime.datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0)
-        except Exception:
-            pass
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits))
-        except Exception:
-            pass
-    return None
+    return qmt_common.parse_timetag(timetag, globals().get("timetag_to_datetime"))
 
 
 def is_main_board_a_share(stock_code):
     if not stock_code:
         return False
-    code = stock_code.split(".")[0]
-    if code.startswith("300") or code.startswith("688") or code.startswith("689"):
-        return False
-    return (
-        code.startswith("600")
-        or code.startswith("601")
-        or code.startswith("603")
-        or code.startswith("605")
-        or code.startswith("000")
-        or code.startswith("001")
-        or code.startswith("002")
-    )
+    return stock_code.split(".")[0][:3] in MAIN_BOARD_PREFIXES
 
 
-def normalize_stock_code(stock_code):
-    if not stock_code:
-        return ""
-    s = str(stock_code).strip().upper()
-    if not s:
-        return ""
-
-    if "." in s:
-        left, right = s.split(".", 1)
-        if len(left) == 6 and right in ("SH", "SZ"):
-            return left + "." + right
-        if len(left) == 6 and right in ("XSHG", "SSE"):
-            return left + ".SH"
-        if len(left) == 6 and right in ("XSHE", "SZSE"):
-            return left + ".SZ"
-        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
-            return right + ".SH"
-        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
-            return right + ".SZ"
-        return s
-
-    if len(s) == 6 and s.isdigit():
-        if s.startswith(("600", "601", "603", "605", "688", "689")):
-            return s + ".SH"
-        return s + ".SZ"
-    return s
-
-
-def _chunked_unique_codes(codes, chunk_size):
-    uniq = []
-    seen = set()
-    for c in codes or []:
-        n = normalize_stock_code(c)
-        if not n or n in seen:
-            continue
-        seen.add(n)
-        uniq.append(n)
+normalize_stock_code = qmt_common.normalize_stock_code
 
-    if chunk_size <= 0:
-        chunk_size = len(uniq) or 1
-    for i in range(0, len(uniq), chunk_size):
-        yield uniq[i : i + chunk_size]
 
+_chunked_unique_codes = qmt_common.chunked_unique_codes
 
-def _daily_df_to_bars(df):
-    bars = []
-    try:
-        iterator = df.iterrows()
-    except Exception:
-        return bars
 
-    for idx, row in iterator:
-        date_str = str(idx)
-        digits = "".join(ch for ch in date_str if ch.isdigit())
-        if len(digits) >= 8:
-            date_str = digits[:8]
-        else:
-            date_str = ""
-        try:
-            bars.append(
-                {
-                    "date": date_str,
-                    "open": float(row["open"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "close": float(row["close"]),
-                    "volume": float(row["volume"]),
-                }
-            )
-        except Exception:
-            continue
-    return bars
+_daily_df_to_bars = qmt_common.daily_df_to_bars
 
 
-def _normalize_trade_date(value):
-    if value is None:
-        return ""
-    s = str(value).strip()
-    digits = "".join(ch for ch in s if ch.isdigit())
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
-        except Exception:
-            return ""
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
-        except Exception:
-            return ""
-    if len(digits) >= 8:
-        return digits[:8]
-    return ""
+_normalize_trade_date = qmt_common.normalize_trade_date
+
+
+def _hit_rate(hit, total):
+    return round(float(hit) / total, 4) if total else 0.0
 
 
 def _log(msg):
-    try:
-        print("[{0}] {1}".format(STRATEGY_NAME, msg))
-    except Exception:
-        pass
+    LOG.info(msg)
+
+
+def _log_debug(msg, *args):
+    """Formatted only when LOG_LEVEL is DEBUG."""
+    LOG.debug(msg, *args)
 
 
 def _log_once(key, msg):
@@ -0,0 +1,134 @@
+"""st_b1 Trend Pullback Strategy Module
+
+Standalone, panel-vectorized port of the xtQMT picker in main.py, with zero
+environment dependencies (numpy + pandas only).
+
+Formula:
+  short_line   := EMA(EMA(C,10),10);
+  duokong_line := (MA(C,14)+MA(C,28)+MA(C,57)+MA(C,114))/4;
+  J            := KDJ(9,3,3) J line;
+  XG: J < 20 AND C > duokong_line AND C < short_line
+      AND short_line > duokong_line
+      AND (MIN(C,O)-L > H-MAX(C,O) OR ABS(diff) < 0.1)
+      AND float_mv > 50 (100 million RMB)
+
+Float market value is read from an optional "float_mv" column (100 million
+RMB). If no frame carries it the filter is skipped; otherwise stocks with a
+missing value fail it, like main.py's strict mode.
+
+main.py fetches the last 180 bars, so its EMA and KDJ recursions start at
+the window's first bar instead of the first bar of history. Both seeds decay
+by (9/11)^n and (2/3)^n respectively, far below float precision after 180
+bars, so screening matches in practice.
+
+Public API:
+  - generate_signals(market_data, params) -> {trade_date: [candidates]}
+  - iter_signals(market_data, params) -> iterator of (trade_date, candidates)
+  - get_default_config() -> dict
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import SignalCollector, build_calendar, ema, iter_panels, kdj, ma
+
+FLOAT_MV_COLUMN = "float_mv"
+
+
+def get_default_config() -> dict:
+    """Return default strategy parameters (main.py constants)."""
+    return {
+        "m1": 14,
+        "m2": 28,
+        "m3": 57,
+        "m4": 114,
+        "ema_n": 10,
+        "kdj_n": 9,
+        "kdj_init": 50.0,
+        "j_max": 20.0,
+        "shadow_abs_diff_max": 0.1,
+        "float_mv_min": 50.0,
+    }
+
+
+def generate_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> dict[str, list[dict]]:
+    """Run st_b1 screening on all stocks.
+
+    Args:
+        market_data: {stock_code: DataFrame} with columns:
+                     trade_date, open, high, low, close, vol [, float_mv]
+        params: Strategy parameters dict (uses defaults if None).
+                Optional "top_k" keeps only the first top_k per date.
+
+    Returns:
+        {trade_date: [{code, close, j_now, short_line, duokong_line[, float_mv]}, ...]}
+        Candidates sorted by j_now ascending per date.
+    """
+    return dict(iter_signals(market_data, params))
+
+
+def iter_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> Iterator[tuple[str, list[dict]]]:
+    """Yield (trade_date, candidates) in chronological order; see generate_signals()."""
+    if params is None:
+        params = get_default_config()
+
+    windows = [params.get(key, default) for key, default in (("m1", 14), ("m2", 28), ("m3", 57), ("m4", 114))]
+    ema_n = params.get("ema_n", 10)
+    kdj_n = params.get("kdj_n", 9)
+    kdj_init = params.get("kdj_init", 50.0)
+    j_max = params.get("j_max", 20.0)
+    shadow_abs_diff_max = params.get("shadow_abs_diff_max", 0.1)
+    float_mv_min = params.get("float_mv_min", 50.0)
+
+    min_bars = max(max(windows), kdj_n + 2, ema_n * 3)
+    use_float_mv = any(FLOAT_MV_COLUMN in df.columns for df in market_data.values())
+    columns = ("open", "high", "low", "close") + ((FLOAT_MV_COLUMN,) if use_float_mv else ())
+
+    calendar = build_calendar(market_data)
+    collector = SignalCollector(calendar)
+    for panel in iter_panels(market_data, columns, calendar, min_bars=min_bars):
+        c, o, h, l = panel["close"], panel["open"], panel["high"], panel["low"]
+        short_line = ema(ema(c, ema_n), ema_n)
+        mas = [ma(c, window) for window in windows]
+        duokong_line = (mas[0] + mas[1] + mas[2] + mas[3]) / 4.0
+        _, _, j = kdj(c, h, l, kdj_n, kdj_init, kdj_init)
+
+        # main.py skips codes with fewer than min_bars bars, then each failed check
+        hits = panel.bar_index() >= min_bars - 1
+        hits &= ~(j >= j_max)
+        hits &= ~(c <= duokong_line)
+        hits &= ~(c >= short_line)
+        hits &= ~(short_line <= duokong_line)
+        lower_shadow = np.minimum(c, o) - l
+        upper_shadow = h - np.maximum(c, o)
+        hits &= (lower_shadow > upper_shadow) | (np.abs(lower_shadow - upper_shadow) < shadow_abs_diff_max)
+
+        values = {"close": c, "j_now": j, "short_line": short_line, "duokong_line": duokong_line}
+        if use_float_mv:
+            float_mv = panel[FLOAT_MV_COLUMN]
+            hits &= ~np.isnan(float_mv) & ~(float_mv <= float_mv_min)
+            values["float_mv"] = float_mv
+        collector.add(panel, hits, values)
+
+    yield from collector.iter_dates(_candidate, "j_now", descending=False, top_k=params.get("top_k"))
+
+
+def _candidate(code: str, values: dict[str, float]) -> dict:
+    cand = {
+        "code": code,
+        "close": float(values["close"]),
+        "j_now": round(float(values["j_now"]), 2),
+        "short_line": round(float(values["short_line"]), 4),
+        "duokong_line": round(float(values["duokong_line"]), 4),
+    }
+    if "float_mv" in values:
+        cand["float_mv"] = round(float(values["float_mv"]), 2)
+    return cand
@@ -12,9 +12,10 @@ from pathlib import Path
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from strategies.st_b2.strategy import generate_signals, get_default_config
+from strategies.st_b2.strategy import generate_signals, get_default_config, top_k_for
 from tools.data_adapter.local_csv import load_market_data
 from tools.backtest_engine import run_backtest
+from tools.signal_cache import SignalCache
 
 
 def load_config():
@@ -23,51 +24,62 @@ def load_config():
         return json.load(f)
 
 
-def run_sweep():
-    cfg = load_config()
-    start_date = cfg.get("start_date", "20240101")
-    end_date = cfg.get("end_date", "20251231")
-    data_dir = cfg.get("data_dir", "")
-
-    print("Loading market data...", flush=True)
-    daily_data = load_market_data(data_dir, start_date, end_date)
-    print(f"Loaded {len(daily_data)} stocks", flush=True)
-
-    # Parameter grid — reduced to practical size for faster sweep
-    param_grid = {
-        "j_pre_max": [15.0, 20.0, 30.0],
-        "j_now_max": [55.0, 65.0, 80.0],
-        "daily_return_min_pct": [2.0, 4.0, 6.0],
-        "vol_ratio_min": [0.8, 1.0, 1.5],
-        "max_positions": [3, 5, 10],
-    }
-
-    bt_config = {
-        "initial_capital": cfg.get("initial_capital", 1000000),
-        "slippage_pct": cfg.get("slippage_pct", 0.1),
-        "commission_pct": cfg.get("commission_pct", 0.025),
-        "stamp_tax_pct": cfg.get("stamp_tax_pct", 0.05),
-        "transfer_fee_pct": cfg.get("transfer_fee_pct", 0.001),
-    }
-
+# Parameter grid — reduced to practical size for faster sweep
+DEFAULT_PARAM_GRID = {
+    "j_pre_max": [15.0, 20.0, 30.0],
+    "j_now_max": [55.0, 65.0, 80.0],
+    "daily_return_min_pct": [2.0, 4.0, 6.0],
+    "vol_ratio_min": [0.8, 1.0, 1.5],
+    "max_positions": [3, 5, 10],
+}
+
+
+def sweep(
+    daily_data: dict,
+    param_grid: dict,
+    bt_config: dict,
+    progress: bool = True,
+    cache: SignalCache | None = None,
+    top_k: bool = True,
+) -> list[dict]:
+    """Backtest every combination of param_grid on daily_data.
+
+    With a SignalCache, combinations that differ only in max_positions (or
+    repeat an earlier sweep) reuse stored signals instead of re-screening.
+    With top_k, screening keeps only top_k_for(largest max_positions in the
+    grid) candidates per date, and signal_count counts those.
+
+    Returns one result dict per combination that produced signals,
+    sorted by total_return_pct descending.
+    """
+    strategy_keys = list(get_default_config())
+    max_slots = max(param_grid.get("max_positions", [bt_config.get("max_positions", 3)]))
+    truncate = {"top_k": top_k_for(max_slots)} if top_k else {}
     # Generate all combinations
     keys = list(param_grid.keys())
     values = list(param_grid.values())
     total = 1
     for v in values:
         total *= len(v)
-    print(f"Grid: {total} combinations", flush=True)
+    if progress:
+        print(f"Grid: {total} combinations", flush=True)
 
     results = []
     for i, combo in enumerate(product(*values)):
         params = get_default_config()
         for k, v in zip(keys, combo):
             params[k] = v
+        params.update(truncate)
 
         bt_cfg = dict(bt_config)
         bt_cfg["max_positions"] = params["max_positions"]
 
-        signals = generate_signals(daily_data, params)
+        if cache is not None:
+            strategy_params = {k: params[k] for k in strategy_keys}
+            strategy_params.update(truncate)
+            signals = cache.get_or_generate(daily_data, "st_b2", strategy_params, generate_signals)
+        else:
+            signals = generate_signals(daily_data, params)
         total_candidates = sum(len(v) for v in signals.values())
 
         if total_candidates == 0:
@@ -91,11 +103,36 @@ def run_sweep():
             "signal_count": total_candidates,
         })
 
-        if (i + 1) % 20 == 0:
+        if progress and (i + 1) % 20 == 0:
             print(f"  [{i + 1}/{total}] ...", flush=True)
 
     # Sort by total_return_pct descending
     results.sort(key=lambda x: x["total_return_pct"], reverse=True)
+    return results
+
+
+def run_sweep(use_cache: bool = True):
+    cfg = load_config()
+    start_date = cfg.get("start_date", "20240101")
+    end_date = cfg.get("end_date", "20251231")
+    data_dir = cfg.get("data_dir", "")
+
+    print("Loading market data...", flush=True)
+    daily_data = load_market_data(data_dir, start_date, end_date)
+    print(f"Loaded {len(daily_data)} stocks", flush=True)
+
+    bt_config = {
+        "initial_capital": cfg.get("initial_capital", 1000000),
+        "slippage_pct": cfg.get("slippage_pct", 0.1),
+        "commission_pct": cfg.get("commission_pct", 0.025),
+        "stamp_tax_pct": cfg.get("stamp_tax_pct", 0.05),
+        "transfer_fee_pct": cfg.get("transfer_fee_pct", 0.001),
+    }
+
+    cache = SignalCache() if use_cache else None
+    results = sweep(daily_data, DEFAULT_PARAM_GRID, bt_config, cache=cache)
+    if cache is not None:
+        print(f"Signal cache: {cache.describe()}", flush=True)
 
     # Print top 20
     print(f"\n{'Rank':<5} {'Return%':<10} {'MDD%':<10} {'WinRate%':<10} {'Trades':<8} {'AvgRet%':<10} {'Jpre':<8} {'Jnow':<8} {'dRet%':<8} {'VR':<6} {'Pos':<5} {'Signals':<10}")
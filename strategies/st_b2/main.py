@@ -21,6 +21,25 @@ try:
 except Exception:
     xtdata = None
 
+try:
+    import qmt_common
+except ImportError:
+    import os
+    import sys
+
+    # Local runs: qmt_common.py lives in strategies/, next to this script's folder.
+    # QMT built-in scripts have no __file__ and need it on QMT's Python path.
+    _script_file = globals().get("__file__")
+    if _script_file:
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(_script_file))))
+    try:
+        import qmt_common
+    except ImportError:
+        raise ImportError(
+            "qmt_common.py not found: copy strategies/qmt_common.py into the QMT "
+            "Python path (e.g. bin.x64/Lib/site-packages), see README.md"
+        ) from None
+
 
 class G:
     pass
@@ -29,6 +48,11 @@ class G:
 g = G()
 
 STRATEGY_NAME = "st_b2"
+# One JSON line of stage timings / filter counts per day; "" disables the file.
+METRICS_FILE = qmt_common.default_metrics_path(STRATEGY_NAME)
+# "DEBUG" adds per-code diagnostics; log lines are printed once per bar.
+LOG_LEVEL = "INFO"
+LOG = qmt_common.BufferedLogger(STRATEGY_NAME, LOG_LEVEL)
 ACCOUNT_ID = "testS"
 ACCOUNT_TYPE = "stock"
 
@@ -41,6 +65,7 @@ DAILY_VOL_RATIO_MIN = 1.1
 J_NOW_MAX = 65.0
 J_PRE_MAX = 20.0
 
+# Initial codes per batch call; qmt_common.ChunkSizer adapts it from call timing.
 BATCH_FETCH_CHUNK_SIZE = 200
 MAX_LOG_CODES = 20
 
@@ -50,6 +75,7 @@ UNIVERSE_SECTOR_NAMES = (
     "\u6caa\u6df1A\u80a1",
     "A\u80a1",
 )
+MAIN_BOARD_PREFIXES = frozenset(("600", "601", "603", "605", "000", "001", "002"))
 
 
 def init(context):
@@ -60,6 +86,7 @@ def init(context):
         except Exception:
             _log("set_account failed; continue")
 
+    g.daily_fetch_sizer = qmt_common.ChunkSizer(BATCH_FETCH_CHUNK_SIZE)
     g.universe = get_universe(context)
     if g.universe and hasattr(context, "set_universe"):
         try:
@@ -71,9 +98,18 @@ def init(context):
     g.latest_candidates = []
 
     _log("init done, universe={0}".format(len(g.universe)))
+    LOG.flush()
 
 
 def handlebar(context):
+    """Called on each minute bar; buffered log lines are flushed after it."""
+    try:
+        _handlebar(context)
+    finally:
+        LOG.flush()
+
+
+def _handlebar(context):
     now = _get_current_dt(context)
     if now is None:
         return
@@ -110,42 +146,52 @@ def build_candidates(context, t_date):
         "j_pre_fail": 0,
     }
 
-    daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_BAR_COUNT)
-    for code in g.universe:
-        bars = daily_batch.get(code)
-        if not bars:
-            bars = fetch_daily_bars(context, code, t_date, DAILY_BAR_COUNT)
-        if len(bars) < KDJ_N + 2:
-            stats["bars_short"] += 1
-            continue
+    metrics = qmt_common.RunMetrics(STRATEGY_NAME, g.last_run_trade_date)
+    metrics.set("t_date", t_date)
+    with metrics.stage("fetch"):
+        daily_batch = fetch_daily_bars_batch(context, g.universe, t_date, DAILY_BAR_COUNT)
+    metrics.set("fetch", g.daily_fetch_sizer.summary())
+    metrics.set("batch_hit_rate", _hit_rate(len(daily_batch), len(g.universe)))
+    _log(
+        "daily_batch_fetch date={0} hit={1} {2}".format(
+            t_date, len(daily_batch), g.daily_fetch_sizer.describe(reset=True)
+        )
+    )
+    with metrics.stage("filter"):
+        for code in g.universe:
+            # Misses were already retried as smaller batches inside the fetch.
+            bars = daily_batch.get(code) or []
+            if len(bars) < KDJ_N + 2:
+                stats["bars_short"] += 1
+                continue
 
-        bar_prev = bars[-2]
-        bar_t = bars[-1]
-        _, _, j_list = compute_kdj(bars, KDJ_N, KDJ_INIT, KDJ_INIT)
-        if len(j_list) < 2:
-            stats["bars_short"] += 1
-            continue
+            bar_prev = bars[-2]
+            bar_t = bars[-1]
+            _, _, j_list = compute_kdj(bars, KDJ_N, KDJ_INIT, KDJ_INIT)
+            if len(j_list) < 2:
+                stats["bars_short"] += 1
+                continue
 
-        zf_ok = False
-        if bar_prev["close"] > 0:
-            zf_ok = (bar_t["close"] / bar_prev["close"] - 1.0) * 100.0 > DAILY_RETURN_MIN_PCT
-        if not zf_ok:
-            stats["zf_fail"] += 1
-            continue
+            zf_ok = False
+            if bar_prev["close"] > 0:
+                zf_ok = (bar_t["close"] / bar_prev["close"] - 1.0) * 100.0 > DAILY_RETURN_MIN_PCT
+            if not zf_ok:
+                stats["zf_fail"] += 1
+                continue
 
-        if bar_prev["volume"] <= 0 or bar_t["volume"] < bar_prev["volume"] * DAILY_VOL_RATIO_MIN:
-            stats["vol_fail"] += 1
-            continue
+            if bar_prev["volume"] <= 0 or bar_t["volume"] < bar_prev["volume"] * DAILY_VOL_RATIO_MIN:
+                stats["vol_fail"] += 1
+                continue
 
-        if j_list[-1] > J_NOW_MAX:
-            stats["j_now_fail"] += 1
-            continue
+            if j_list[-1] > J_NOW_MAX:
+                stats["j_now_fail"] += 1
+                continue
 
-        if j_list[-2] >= J_PRE_MAX:
-            stats["j_pre_fail"] += 1
-            continue
+            if j_list[-2] >= J_PRE_MAX:
+                stats["j_pre_fail"] += 1
+                continue
 
-        candidates.append(code)
+            candidates.append(code)
 
     _log(
         "filter_stats total={0} bars_short={1} zf_fail={2} vol_fail={3} "
@@ -159,10 +205,32 @@ def build_candidates(context, t_date):
             len(candidates),
         )
     )
+    metrics.update_counters(stats)
+    metrics.count("pass", len(candidates))
+    metrics.emit(_log, METRICS_FILE)
     return candidates
 
 
 def get_universe(context):
+    """Return the main-board universe, cached per trading date.
+
+    Only non-empty results are cached, so callers that retry on an empty
+    universe still re-query the sector APIs.
+    """
+    now = _get_current_dt(context)
+    date_key = now.strftime("%Y%m%d") if now is not None else ""
+    cache = getattr(g, "universe_cache", None)
+    if cache and cache["date"] == date_key and cache["codes"]:
+        _log("universe_source=cache date={0} size={1}".format(date_key, len(cache["codes"])))
+        return list(cache["codes"])
+
+    codes = _resolve_universe(context)
+    if codes:
+        g.universe_cache = {"date": date_key, "codes": list(codes)}
+    return codes
+
+
+def _resolve_universe(context):
     sector_codes = _get_main_board_universe_from_sector(context)
 
     ctx_codes = []
@@ -202,37 +270,31 @@ def get_universe(context):
 
 
 def _get_main_board_universe_from_sector(context):
-    all_codes = []
+    """Load A-share list from sector APIs (context/global/xtdata).
 
+    Sources are tried in that order per sector name and the first one that
+    returns codes wins, since they expose the same sector lists.
+    """
+    getters = []
     if hasattr(context, "get_stock_list_in_sector"):
-        for name in UNIVERSE_SECTOR_NAMES:
-            try:
-                codes = context.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
-            except Exception:
-                pass
-
-    if "get_stock_list_in_sector" in globals():
-        func = globals().get("get_stock_list_in_sector")
-        if callable(func):
-            for name in UNIVERSE_SECTOR_NAMES:
-                try:
-                    codes = func(name)
-                    if codes:
-                        all_codes.extend(list(codes))
-                except Exception:
-                    pass
-
-    if xtdata is not None:
-        for name in UNIVERSE_SECTOR_NAMES:
+        getters.append(context.get_stock_list_in_sector)
+    func = globals().get("get_stock_list_in_sector")
+    if callable(func):
+        getters.append(func)
+    xt_func = getattr(xtdata, "get_stock_list_in_sector", None) if xtdata is not None else None
+    if callable(xt_func):
+        getters.append(xt_func)
+
+    all_codes = []
+    for name in UNIVERSE_SECTOR_NAMES:
+        for getter in getters:
             try:
-                codes = xtdata.get_stock_list_in_sector(name)
-                if codes:
-                    all_codes.extend(list(codes))
+                codes = getter(name)
             except Exception:
-                pass
-
+                continue
+            if codes:
+                all_codes.extend(list(codes))
+                break
     return all_codes
 
 
@@ -240,7 +302,11 @@ def _normalize_main_board_codes(codes):
     normalized = []
     seen = set()
     for c in codes or []:
-        n = normalize_stock_code(c)
+        # Fast path: already "XXXXXX.SH" / "XXXXXX.SZ".
+        if type(c) is str and len(c) == 9 and c[6] == "." and c[7:] in ("SH", "SZ"):
+            n = c
+        else:
+            n = normalize_stock_code(c)
         if not n or (n in seen):
             continue
         if not is_main_board_a_share(n):
@@ -251,73 +317,16 @@ def _normalize_main_board_codes(codes):
 
 
 def fetch_daily_bars_batch(context, codes, end_date, count):
-    result = {}
-    end_date = _normalize_trade_date(end_date)
-    if not end_date:
-        return result
-
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
-    for batch_codes in _chunked_unique_codes(codes, BATCH_FETCH_CHUNK_SIZE):
-        data = {}
-        for end_ts in end_candidates:
-            try:
-                data = context.get_market_data_ex(
-                    ["open", "high", "low", "close", "volume"],
-                    list(batch_codes),
-                    period="1d",
-                    start_time="",
-                    end_time=end_ts,
-                    count=count,
-                    dividend_type="none",
-                    fill_data=True,
-                    subscribe=True,
-                )
-                if data:
-                    break
-            except Exception:
-                data = {}
-        if not data:
-            continue
-        for code in batch_codes:
-            try:
-                df = data.get(code)
-                if df is None or df.empty:
-                    continue
-                bars = _daily_df_to_bars(df)
-                if bars:
-                    result[code] = bars
-            except Exception:
-                continue
-    return result
+    """Batch fetch daily bars for codes; chunks adapt to observed latency.
 
+    Return: dict(code -> bars list)
+    """
+    return qmt_common.fetch_daily_bars_batch(
+        context, codes, end_date, count, BATCH_FETCH_CHUNK_SIZE, getattr(g, "daily_fetch_sizer", None)
+    )
 
-def fetch_daily_bars(context, code, end_date, count):
-    end_date = _normalize_trade_date(end_date)
-    end_candidates = [end_date, end_date + "150000", end_date + "235959", ""]
 
-    df = None
-    for end_ts in end_candidates:
-        try:
-            data = context.get_market_data_ex(
-                ["open", "high", "low", "close", "volume"],
-                [code],
-                period="1d",
-                start_time="",
-                end_time=end_ts,
-                count=count,
-                dividend_type="none",
-                fill_data=True,
-                subscribe=True,
-            )
-            cur = data.get(code)
-            if cur is not None and (not cur.empty):
-                df = cur
-                break
-        except Exception:
-            continue
-    if df is None or df.empty:
-        return []
-    return _daily_df_to_bars(df)
+fetch_daily_bars = qmt_common.fetch_daily_bars
 
 
 def compute_kdj(bars, n, k_init, d_init):
@@ -384,148 +393,37 @@ def _get_current_dt(context):
 
 
 def _parse_timetag(timetag):
-    if not timetag:
-        return None
-
-    if "timetag_to_datetime" in globals():
-        try:
-            ts = timetag_to_datetime(timetag, "%Y%m%d%H%M%S")
-            return datetime.datetime.strptime(ts, "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-
-    digits = "".join(ch for ch in str(timetag).strip() if ch.isdigit())
-    if len(digits) >= 14:
-        try:
-            return datetime.datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
-        except Exception:
-            pass
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0)
-        except Exception:
-            pass
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits))
-        except Exception:
-            pass
-    return None
+    return qmt_common.parse_timetag(timetag, globals().get("timetag_to_datetime"))
 
 
 def is_main_board_a_share(stock_code):
     if not stock_code:
         return False
-    code = stock_code.split(".")[0]
-    if code.startswith("300") or code.startswith("688") or code.startswith("689"):
-        return False
-    return (
-        code.startswith("600")
-        or code.startswith("601")
-        or code.startswith("603")
-        or code.startswith("605")
-        or code.startswith("000")
-        or code.startswith("001")
-        or code.startswith("002")
-    )
+    return stock_code.split(".")[0][:3] in MAIN_BOARD_PREFIXES
 
 
-def normalize_stock_code(stock_code):
-    if not stock_code:
-        return ""
-    s = str(stock_code).strip().upper()
-    if not s:
-        return ""
-
-    if "." in s:
-        left, right = s.split(".", 1)
-        if len(left) == 6 and right in ("SH", "SZ"):
-            return left + "." + right
-        if len(left) == 6 and right in ("XSHG", "SSE"):
-            return left + ".SH"
-        if len(left) == 6 and right in ("XSHE", "SZSE"):
-            return left + ".SZ"
-        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
-            return right + ".SH"
-        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
-            return right + ".SZ"
-        return s
-
-    if len(s) == 6 and s.isdigit():
-        if s.startswith(("600", "601", "603", "605", "688", "689")):
-            return s + ".SH"
-        return s + ".SZ"
-    return s
-
-
-def _chunked_unique_codes(codes, chunk_size):
-    uniq = []
-    seen = set()
-    for c in codes or []:
-        n = normalize_stock_code(c)
-        if not n or n in seen:
-            continue
-        seen.add(n)
-        uniq.append(n)
+normalize_stock_code = qmt_common.normalize_stock_code
 
-    if chunk_size <= 0:
-        chunk_size = len(uniq) or 1
-    for i in range(0, len(uniq), chunk_size):
-        yield uniq[i : i + chunk_size]
 
+_chunked_unique_codes = qmt_common.chunked_unique_codes
 
-def _daily_df_to_bars(df):
-    bars = []
-    try:
-        iterator = df.iterrows()
-    except Exception:
-        return bars
 
-    for idx, row in iterator:
-        date_str = str(idx)
-        digits = "".join(ch for ch in date_str if ch.isdigit())
-        if len(digits) >= 8:
-            date_str = digits[:8]
-        else:
-            date_str = ""
-        try:
-            bars.append(
-                {
-                    "date": date_str,
-                    "open": float(row["open"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "close": float(row["close"]),
-                    "volume": float(row["volume"]),
-                }
-            )
-        except Exception:
-            continue
-    return bars
+_daily_df_to_bars = qmt_common.daily_df_to_bars
 
 
-def _normalize_trade_date(value):
-    if value is None:
-        return ""
-    s = str(value).strip()
-    digits = "".join(ch for ch in s if ch.isdigit())
-    if len(digits) == 13:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
-        except Exception:
-            return ""
-    if len(digits) == 10:
-        try:
-            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
-        except Exception:
-            return ""
-    if len(digits) >= 8:
-        return digits[:8]
-    return ""
+_normalize_trade_date = qmt_common.normalize_trade_date
+
+
+def _hit_rate(hit, total):
+    return round(float(hit) / total, 4) if total else 0.0
 
 
 def _log(msg):
-    try:
-        print("[{0}] {1}".format(STRATEGY_NAME, msg))
-    except Exception:
-        pass
+    LOG.info(msg)
+
+
+def _log_debug(msg, *args):
+    """Formatted only when LOG_LEVEL is DEBUG."""
+    LOG.debug(msg, *args)
+
+
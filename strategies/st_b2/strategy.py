@@ -6,12 +6,19 @@ No imports of tushare, xtdata, or any platform-specific module.
 Public API:
   - compute_kdj(closes, highs, lows, ...) -> (K, D, J)
   - generate_signals(market_data, params) -> {trade_date: [candidates]}
+  - iter_signals(market_data, params) -> iterator of (trade_date, candidates)
+  - reversal_mask(closes, vols, j, params) -> screening mask, also on panels
   - get_default_config() -> dict
+  - top_k_for(max_positions) -> params["top_k"] for backtest-only screening
 """
 
+from typing import Iterator
+
 import numpy as np
 import pandas as pd
 
+TOP_K_MARGIN = 5  # extra candidates kept per date beyond the slot count, see top_k_for()
+
 
 def get_default_config() -> dict:
     """Return default strategy parameters."""
@@ -25,6 +32,31 @@ def get_default_config() -> dict:
     }
 
 
+def top_k_for(max_positions: int, margin: int = TOP_K_MARGIN) -> int:
+    """Candidates per date worth keeping for a backtest with max_positions slots.
+
+    run_backtest buys at most max_positions names a day, skipping candidates
+    with no open price on the T+1 date and those where not even one 100-share
+    lot fits the available cash (the shares <= 0 skip); margin covers those
+    skips. If more than margin of a day's leading candidates are skipped, the
+    truncated list can buy less than the full one would.
+    """
+    return max_positions + margin
+
+
+def _top_k_stable(keys: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest keys in stable-sort order (ties keep position order).
+
+    argpartition finds the boundary key in O(n); keys tied with it are taken
+    in position order, as list.sort would, and only the k picks are sorted.
+    """
+    boundary = keys[np.argpartition(keys, k - 1)[:k]].max()
+    below = np.flatnonzero(keys < boundary)
+    tied = np.flatnonzero(keys == boundary)[:k - len(below)]
+    picks = np.sort(np.concatenate([below, tied]))
+    return picks[np.argsort(keys[picks], kind="stable")]
+
+
 def compute_kdj(
     closes: np.ndarray,
     highs: np.ndarray,
@@ -74,6 +106,41 @@ def compute_kdj(
     return k_arr, d_arr, j_arr
 
 
+def reversal_mask(
+    closes: np.ndarray,
+    vols: np.ndarray,
+    j_arr: np.ndarray,
+    params: dict,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """st_b2 screening conditions over arrays of bars (last axis).
+
+    Works on one stock's 1-D arrays or on (stocks x bars) panels. Element
+    i-1 of each returned array describes bar i against bar i-1:
+    (keep mask, daily_return_pct, vol_ratio).
+    """
+    j_pre_max = params.get("j_pre_max", 20.0)
+    j_now_max = params.get("j_now_max", 65.0)
+    daily_return_min_pct = params.get("daily_return_min_pct", 4.0)
+    vol_ratio_min = params.get("vol_ratio_min", 1.1)
+    min_bars = params.get("kdj_n", 9) + 2
+
+    prev_close = closes[..., :-1]
+    prev_vol = vols[..., :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_ret = (closes[..., 1:] / prev_close - 1.0) * 100.0
+        vol_ratio = np.where(prev_vol > 0, vols[..., 1:] / prev_vol, 0.0)
+
+    # Screening conditions, written as "not skipped" to keep the NaN
+    # behaviour of the original per-row checks
+    keep = ~(prev_close <= 0)
+    keep &= ~(j_arr[..., :-1] >= j_pre_max)
+    keep &= ~(j_arr[..., 1:] > j_now_max)
+    keep &= ~(daily_ret <= daily_return_min_pct)
+    keep &= ~(vol_ratio < vol_ratio_min)
+    keep[..., : min_bars - 2] = False  # only rows with enough history
+    return keep, daily_ret, vol_ratio
+
+
 def generate_signals(
     market_data: dict[str, pd.DataFrame],
     params: dict | None = None,
@@ -83,26 +150,44 @@ def generate_signals(
     Args:
         market_data: {stock_code: DataFrame} with columns:
                      trade_date, open, high, low, close, vol
-        params: Strategy parameters dict (uses defaults if None)
+        params: Strategy parameters dict (uses defaults if None).
+                Optional "top_k" truncates each date to its best top_k
+                candidates (np.argpartition), sorting and building only those.
 
     Returns:
         {trade_date: [{code, close, daily_return_pct, vol_ratio, j_now, j_prev}, ...]}
         Candidates sorted by daily_return_pct descending per date.
     """
+    return dict(iter_signals(market_data, params))
+
+
+def iter_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> Iterator[tuple[str, list[dict]]]:
+    """Yield (trade_date, candidates) in chronological order.
+
+    Same screening and ordering as generate_signals(), but only the matching
+    rows are kept (as flat arrays) and candidate dicts are built one date at
+    a time, so run_backtest() can consume the stream without the whole
+    {date: [candidates]} dict ever existing.
+
+    With params["top_k"] set, each date keeps only its first top_k
+    candidates in that order; see top_k_for().
+    """
     if params is None:
         params = get_default_config()
 
     kdj_n = params.get("kdj_n", 9)
     kdj_init = params.get("kdj_init", 50.0)
-    j_pre_max = params.get("j_pre_max", 20.0)
-    j_now_max = params.get("j_now_max", 65.0)
-    daily_return_min_pct = params.get("daily_return_min_pct", 4.0)
-    vol_ratio_min = params.get("vol_ratio_min", 1.1)
+    top_k = params.get("top_k")
 
     min_bars = kdj_n + 2  # Need at least N+2 bars for KDJ + previous J
 
-    # Pre-compute per-stock data: index by trade_date for fast lookup
-    stock_data: dict[str, list[dict]] = {}
+    codes: list[str] = []
+    hit_code: list[np.ndarray] = []
+    hit_date: list[np.ndarray] = []
+    hit_values: list[np.ndarray] = []  # rows: close, daily_ret, vol_ratio, j_now, j_prev
     for code, df in market_data.items():
         if len(df) < min_bars:
             continue
@@ -111,44 +196,54 @@ def generate_signals(
         highs = df["high"].values.astype(float)
         lows = df["low"].values.astype(float)
         vols = df["vol"].values.astype(float)
-        dates = df["trade_date"].values
 
         k_arr, d_arr, j_arr = compute_kdj(closes, highs, lows, kdj_n, kdj_init)
 
-        # Build per-date lookup: only store where we have enough history
-        for i in range(min_bars - 1, len(df)):
-            date = dates[i]
-            prev_close = closes[i - 1]
-            if prev_close <= 0:
-                continue
-            daily_ret = (closes[i] / prev_close - 1.0) * 100.0
-            vol_ratio = vols[i] / vols[i - 1] if vols[i - 1] > 0 else 0.0
-
-            # Apply screening conditions
-            if j_arr[i - 1] >= j_pre_max:
-                continue
-            if j_arr[i] > j_now_max:
-                continue
-            if daily_ret <= daily_return_min_pct:
-                continue
-            if vol_ratio < vol_ratio_min:
-                continue
-
-            if date not in stock_data:
-                stock_data[date] = []
-            stock_data[date].append({
-                "code": code,
-                "close": float(closes[i]),
-                "daily_return_pct": round(daily_ret, 2),
-                "vol_ratio": round(vol_ratio, 2),
-                "j_now": round(float(j_arr[i]), 2),
-                "j_prev": round(float(j_arr[i - 1]), 2),
-            })
-
-    # Sort candidates by daily return (descending) per date
-    result: dict[str, list[dict]] = {}
-    for date in sorted(stock_data.keys()):
-        candidates = sorted(stock_data[date], key=lambda x: x["daily_return_pct"], reverse=True)
-        result[date] = candidates
-
-    return result
\ No newline at end of file
+        # Element i-1 of these arrays describes bar i (vs bar i-1)
+        keep, daily_ret, vol_ratio = reversal_mask(closes, vols, j_arr, params)
+        idx = np.flatnonzero(keep)
+        if idx.size == 0:
+            continue
+
+        rows = idx + 1
+        hit_code.append(np.full(idx.size, len(codes)))
+        hit_date.append(np.asarray(df["trade_date"].values[rows], dtype=str))
+        hit_values.append(np.vstack([closes[rows], daily_ret[idx], vol_ratio[idx], j_arr[rows], j_arr[idx]]))
+        codes.append(code)
+
+    if not codes:
+        return
+
+    all_code = np.concatenate(hit_code)
+    all_date = np.concatenate(hit_date)
+    all_values = np.hstack(hit_values)
+    order = np.argsort(all_date, kind="stable")  # stable: keeps market_data order within a date
+    all_code = all_code[order]
+    all_date = all_date[order]
+    all_values = all_values[:, order]
+
+    bounds = np.flatnonzero(all_date[1:] != all_date[:-1]) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, len(all_date)]
+    close_col, ret_col, vr_col, jn_col, jp_col = all_values
+    neg_ret = -np.round(ret_col, 2)  # sort key: rounded daily_return_pct, descending
+
+    def candidate(i):
+        return {
+            "code": codes[all_code[i]],
+            "close": float(close_col[i]),
+            "daily_return_pct": round(ret_col[i], 2),
+            "vol_ratio": round(vr_col[i], 2),
+            "j_now": round(float(jn_col[i]), 2),
+            "j_prev": round(float(jp_col[i]), 2),
+        }
+
+    for start, end in zip(starts, ends):
+        if top_k is not None and end - start > top_k and not np.isnan(neg_ret[start:end]).any():
+            picks = start + _top_k_stable(neg_ret[start:end], top_k)
+            candidates = [candidate(i) for i in picks]
+        else:
+            candidates = [candidate(i) for i in range(start, end)]
+            # Sort candidates by daily return (descending)
+            candidates.sort(key=lambda x: x["daily_return_pct"], reverse=True)
+        yield str(all_date[start]), candidates
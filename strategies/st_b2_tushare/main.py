@@ -14,6 +14,7 @@ Usage:
   python main.py                       # use config.json defaults
   python main.py --start 20240101 --end 20251231
   python main.py --config my_config.json
+  python main.py --no-signal-cache      # re-run screening even if cached
 """
 
 import argparse
@@ -35,6 +36,8 @@ except ImportError:
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 from strategies.st_b2.strategy import generate_signals, get_default_config as get_strategy_config
 from tools.data_adapter.local_csv import load_market_data, get_stock_list as get_local_stock_list
+from tools.backtest_engine import TradingCalendar
+from tools.signal_cache import SignalCache
 
 # ---------------------------------------------------------------------------
 # Config
@@ -279,11 +282,10 @@ class BacktestEngine:
             print("No trading dates found in data.")
             return
 
-        sorted_trade_dates = sorted(all_trade_dates)
+        calendar = TradingCalendar(all_trade_dates)
+        sorted_trade_dates = calendar.dates
         # Build mapping: date -> next trading date for T+1 execution
-        next_date_map = {}
-        for i in range(len(sorted_trade_dates) - 1):
-            next_date_map[sorted_trade_dates[i]] = sorted_trade_dates[i + 1]
+        next_date_map = calendar.next_date_map()
 
         if self.variant == "biased":
             # Original biased behavior: buy at signal-day close, sell at close
@@ -605,6 +607,8 @@ def parse_args():
     parser.add_argument("--variant", type=str, default="t1_cost",
                         choices=["biased", "t1_only", "t1_cost", "ab"],
                         help="Backtest variant: biased, t1_only, t1_cost, or ab (A/B comparison)")
+    parser.add_argument("--no-signal-cache", action="store_true",
+                        help="Always re-run screening instead of reusing cached signals")
     return parser.parse_args()
 
 
@@ -658,7 +662,12 @@ def main():
         if key in cfg:
             strategy_params[key] = cfg[key]
 
-    screen_raw = generate_signals(daily_data, strategy_params)
+    if args.no_signal_cache:
+        screen_raw = generate_signals(daily_data, strategy_params)
+    else:
+        cache = SignalCache()
+        screen_raw = cache.get_or_generate(daily_data, "st_b2", strategy_params, generate_signals)
+        print(f"  Signal cache: {'hit' if cache.hits else 'miss'}")
     # Map "code" field to "ts_code" for BacktestEngine compatibility
     screening_results = {}
     for date, candidates in screen_raw.items():
@@ -0,0 +1,5 @@
+"""st_cdx brick-chart turn strategy package (see ref/cdx.md)."""
+
+from .strategy import generate_signals, get_default_config, iter_signals
+
+__all__ = ["generate_signals", "get_default_config", "iter_signals"]
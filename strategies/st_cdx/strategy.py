@@ -0,0 +1,133 @@
+"""st_cdx Brick-Chart Turn Strategy Module
+
+Panel-vectorized screening for the brick chart in ref/cdx.md, with zero
+environment dependencies (numpy + pandas only). The chart and its turn
+signal come from strategies.indicators (brick_chart, brick_turns), which
+share the HHV/LLV and SMA kernels with KDJ.
+
+Formula:
+  brick := IF(VAR6A>4, VAR6A-4, 0)   (VAR1A..VAR6A, see indicators.brick_chart)
+  AA    := REF(brick,1) < brick;
+  XG    := REF(AA,1)=0 AND AA=1;
+
+With params["kdj_filter"] the st_b2 KDJ reversal conditions
+(st_b2.strategy.reversal_mask) must hold on the same bar as well.
+
+Public API:
+  - generate_signals(market_data, params) -> {trade_date: [candidates]}
+  - iter_signals(market_data, params) -> iterator of (trade_date, candidates)
+  - get_default_config() -> dict
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import SignalCollector, brick_chart, brick_turns, build_calendar, iter_panels, kdj
+from strategies.st_b2.strategy import get_default_config as get_kdj_config
+from strategies.st_b2.strategy import reversal_mask
+
+
+def get_default_config() -> dict:
+    """Return default strategy parameters (KDJ keys apply with kdj_filter only)."""
+    return {
+        "brick_n": 4,
+        "brick_offset": 4.0,
+        "min_bars": 30,  # SMA(.,6,1) seeds weigh (5/6)^30 < 0.5% by then
+        "kdj_filter": False,
+        **get_kdj_config(),
+    }
+
+
+def generate_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> dict[str, list[dict]]:
+    """Run st_cdx screening on all stocks.
+
+    Args:
+        market_data: {stock_code: DataFrame} with columns:
+                     trade_date, open, high, low, close, vol
+        params: Strategy parameters dict (uses defaults if None).
+                Optional "top_k" keeps only the first top_k per date.
+
+    Returns:
+        {trade_date: [{code, close, brick, brick_prev, brick_rise
+                       [, daily_return_pct, vol_ratio, j_now, j_prev]}, ...]}
+        Candidates sorted by brick_rise (brick - brick_prev) descending per date.
+    """
+    return dict(iter_signals(market_data, params))
+
+
+def iter_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> Iterator[tuple[str, list[dict]]]:
+    """Yield (trade_date, candidates) in chronological order; see generate_signals()."""
+    if params is None:
+        params = get_default_config()
+
+    brick_n = params.get("brick_n", 4)
+    brick_offset = params.get("brick_offset", 4.0)
+    kdj_filter = params.get("kdj_filter", False)
+    kdj_n = params.get("kdj_n", 9)
+    kdj_init = params.get("kdj_init", 50.0)
+    min_bars = max(params.get("min_bars", 30), 3)  # a turn compares two REFs
+    if kdj_filter:
+        min_bars = max(min_bars, kdj_n + 2)
+
+    columns = ("high", "low", "close") + (("vol",) if kdj_filter else ())
+    calendar = build_calendar(market_data)
+    collector = SignalCollector(calendar)
+    for panel in iter_panels(market_data, columns, calendar, min_bars=min_bars):
+        close = panel["close"]
+        brick = brick_chart(panel["high"], panel["low"], close, brick_n, brick_offset)
+        brick_prev = _ref(brick)
+
+        hits = brick_turns(brick)
+        hits &= panel.bar_index() >= min_bars - 1
+        values = {"close": close, "brick": brick, "brick_prev": brick_prev, "brick_rise": brick - brick_prev}
+
+        if kdj_filter:
+            _, _, j = kdj(close, panel["high"], panel["low"], kdj_n, kdj_init, kdj_init)
+            keep, daily_ret, vol_ratio = reversal_mask(close, panel["vol"], j, params)
+            # reversal_mask describes bars 1.. ; bar 0 never passes
+            hits[:, 0] = False
+            hits[:, 1:] &= keep
+            values["daily_return_pct"] = _align(daily_ret)
+            values["vol_ratio"] = _align(vol_ratio)
+            values["j_now"] = j
+            values["j_prev"] = _ref(j)
+
+        collector.add(panel, hits, values)
+
+    yield from collector.iter_dates(_candidate, "brick_rise", descending=True, top_k=params.get("top_k"))
+
+
+def _align(mat: np.ndarray) -> np.ndarray:
+    """Place a (stocks x bars-1) "bar i vs bar i-1" matrix at bars 1.., NaN at bar 0."""
+    out = np.full((mat.shape[0], mat.shape[1] + 1), np.nan)
+    out[:, 1:] = mat
+    return out
+
+
+def _ref(mat: np.ndarray) -> np.ndarray:
+    """REF(X, 1) per row; NaN at the first bar."""
+    return _align(mat[:, :-1])
+
+
+def _candidate(code: str, values: dict[str, float]) -> dict:
+    cand = {
+        "code": code,
+        "close": float(values["close"]),
+        "brick": round(float(values["brick"]), 2),
+        "brick_prev": round(float(values["brick_prev"]), 2),
+        "brick_rise": round(float(values["brick_rise"]), 2),
+    }
+    if "j_now" in values:
+        cand["daily_return_pct"] = round(float(values["daily_return_pct"]), 2)
+        cand["vol_ratio"] = round(float(values["vol_ratio"]), 2)
+        cand["j_now"] = round(float(values["j_now"]), 2)
+        cand["j_prev"] = round(float(values["j_prev"]), 2)
+    return cand
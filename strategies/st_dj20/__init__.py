@@ -0,0 +1,5 @@
+"""st_dj20 strategy package (main.py is the xtQMT script)."""
+
+from .strategy import calc_tdx_value, generate_signals, get_default_config, iter_signals
+
+__all__ = ["calc_tdx_value", "generate_signals", "get_default_config", "iter_signals"]
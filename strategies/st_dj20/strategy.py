@@ -0,0 +1,102 @@
+"""st_dj20 Short/Long Stochastic Spread Strategy Module
+
+Standalone, panel-vectorized port of the xtQMT picker in main.py, with zero
+environment dependencies (numpy + pandas only).
+
+Formula:
+  short := 100*(C-LLV(L,3))/(HHV(C,3)-LLV(L,3));
+  long  := 100*(C-LLV(L,21))/(HHV(C,21)-LLV(L,21));
+  XG: long >= 70 AND long - short >= 20
+  (ChiNext/STAR exclusion is left to the data universe, as in local_csv.)
+A zero or negative denominator counts as 0, as in main.calc_tdx_value.
+
+Public API:
+  - calc_tdx_value(close, low, window) -> (stocks x bars) matrix
+  - generate_signals(market_data, params) -> {trade_date: [candidates]}
+  - iter_signals(market_data, params) -> iterator of (trade_date, candidates)
+  - get_default_config() -> dict
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import SignalCollector, build_calendar, hhv, iter_panels, llv
+
+
+def get_default_config() -> dict:
+    """Return default strategy parameters (main.py constants)."""
+    return {
+        "short_window": 3,
+        "long_window": 21,
+        "long_min": 70.0,
+        "delta_min": 20.0,
+    }
+
+
+def calc_tdx_value(close: np.ndarray, low: np.ndarray, window: int) -> np.ndarray:
+    """100*(C-LLV(L,window))/(HHV(C,window)-LLV(L,window)) per bar; NaN before a full window."""
+    llv_low = llv(low, window)
+    den = hhv(close, window) - llv_low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den <= 0, 0.0, 100.0 * (close - llv_low) / den)
+
+
+def generate_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> dict[str, list[dict]]:
+    """Run st_dj20 screening on all stocks.
+
+    Args:
+        market_data: {stock_code: DataFrame} with columns:
+                     trade_date, open, high, low, close, vol
+        params: Strategy parameters dict (uses defaults if None).
+                Optional "top_k" keeps only the first top_k per date.
+
+    Returns:
+        {trade_date: [{code, close, long, short, delta}, ...]}
+        Candidates sorted by delta (long - short) descending per date.
+    """
+    return dict(iter_signals(market_data, params))
+
+
+def iter_signals(
+    market_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> Iterator[tuple[str, list[dict]]]:
+    """Yield (trade_date, candidates) in chronological order; see generate_signals()."""
+    if params is None:
+        params = get_default_config()
+
+    short_window = params.get("short_window", 3)
+    long_window = params.get("long_window", 21)
+    long_min = params.get("long_min", 70.0)
+    delta_min = params.get("delta_min", 20.0)
+
+    calendar = build_calendar(market_data)
+    collector = SignalCollector(calendar)
+    for panel in iter_panels(market_data, ("low", "close"), calendar, min_bars=long_window):
+        close = panel["close"]
+        short_val = calc_tdx_value(close, panel["low"], short_window)
+        long_val = calc_tdx_value(close, panel["low"], long_window)
+        delta = long_val - short_val
+
+        # main.py skips codes with fewer than long_window bars, then each failed check
+        hits = panel.bar_index() >= long_window - 1
+        hits &= ~(long_val < long_min)
+        hits &= ~(delta < delta_min)
+        collector.add(panel, hits, {"close": close, "long": long_val, "short": short_val, "delta": delta})
+
+    yield from collector.iter_dates(_candidate, "delta", descending=True, top_k=params.get("top_k"))
+
+
+def _candidate(code: str, values: dict[str, float]) -> dict:
+    return {
+        "code": code,
+        "close": float(values["close"]),
+        "long": round(float(values["long"]), 2),
+        "short": round(float(values["short"]), 2),
+        "delta": round(float(values["delta"]), 2),
+    }
@@ -2,10 +2,26 @@
 
 Public API:
   - run_backtest: Main entry point — runs full date-loop backtest
+  - run_intraday_backtest: Minute-bar replay of the b2_basic / b2_a intraday rules
+  - b2_daily_signals: The b2 scripts' daily screen, as run_intraday_backtest input
   - BacktestResult, Position, Trade, EquitySnapshot: Data models
+  - BacktestState: End-of-run state for resuming with run_backtest(state=...)
+  - TradingCalendar: Sorted trading days with O(1) prev/next/offset lookups
 """
 
 from .engine import run_backtest
-from .models import BacktestResult, EquitySnapshot, Position, Trade
+from .intraday import b2_daily_signals, run_intraday_backtest
+from .models import BacktestResult, BacktestState, EquitySnapshot, Position, Trade
+from .trading_calendar import TradingCalendar
 
-__all__ = ["run_backtest", "BacktestResult", "Position", "Trade", "EquitySnapshot"]
\ No newline at end of file
+__all__ = [
+    "run_backtest",
+    "run_intraday_backtest",
+    "b2_daily_signals",
+    "BacktestResult",
+    "BacktestState",
+    "Position",
+    "Trade",
+    "EquitySnapshot",
+    "TradingCalendar",
+]
\ No newline at end of file
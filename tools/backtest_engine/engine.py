@@ -1,8 +1,9 @@
 """Independent backtest engine with T+1 execution and A-share cost model.
 
-Pipeline: signals -> pending queue -> date loop (sell -> buy -> snapshot) -> BacktestResult
+Pipeline: signals -> date loop (sell -> buy T+1 fills -> snapshot) -> BacktestResult
 
-Signal interface: {trade_date: [{code, ...}]} — any strategy producing this format works.
+Signal interface: {trade_date: [{code, ...}]} — any strategy producing this format works —
+or a chronological iterator of (trade_date, [{code, ...}]) pulled lazily by the date loop.
 Market data interface: {code: DataFrame(trade_date, open, high, low, close, vol)}
 
 Cost model (A-share):
@@ -10,22 +11,34 @@ Cost model (A-share):
   Sell side: price * (1 - slippage), deduct commission + stamp_tax + transfer_fee
 """
 
+from dataclasses import replace
+from typing import Callable, Iterable
+
 import pandas as pd
 
-from .models import BacktestResult, EquitySnapshot, Position, Trade
-from .stats import calc_avg_return, calc_max_drawdown, calc_median_return, calc_total_return, calc_win_rate
+from .models import BacktestResult, BacktestState, EquitySnapshot, Position, Trade
+from .stats import calc_return_stats, calc_total_return, update_drawdown
+from .trading_calendar import TradingCalendar
 
 
 def run_backtest(
-    signals: dict[str, list[dict]],
+    signals: dict[str, list[dict]] | Iterable[tuple[str, list[dict]]],
     market_data: dict[str, pd.DataFrame],
     config: dict,
-    trading_dates: list[str] | None = None,
+    trading_dates: list[str] | TradingCalendar | None = None,
+    *,
+    state: BacktestState | None = None,
+    on_sell: Callable[[str, Trade, float], None] | None = None,
+    on_buy: Callable[[str, Position, float], None] | None = None,
+    on_day_end: Callable[[EquitySnapshot, list[Position]], None] | None = None,
 ) -> BacktestResult:
     """Run backtest with T+1 execution and A-share cost model.
 
     Args:
-        signals: {trade_date: [{code, ...}]} from any strategy.
+        signals: {trade_date: [{code, ...}]} from any strategy, or an iterator
+            of (trade_date, [{code, ...}]) in ascending date order (e.g.
+            st_b2 iter_signals). Each batch is pulled on its T+1 execution
+            date, so a stream is never materialized.
         market_data: {code: DataFrame(trade_date, open, high, low, close, vol)}.
         config: Backtest configuration with keys:
             initial_capital (default 1000000)
@@ -34,14 +47,32 @@ def run_backtest(
             commission_pct (default 0.025)
             stamp_tax_pct (default 0.05)
             transfer_fee_pct (default 0.001)
-        trading_dates: Optional sorted list of trading dates.
+        trading_dates: Optional sorted list of trading dates or a TradingCalendar.
             If None, extracted from market_data.
+        state: Optional end_state of an earlier run. The run continues after
+            state.last_date: only later dates and signals are processed,
+            signals pending from the earlier run fill on the first new date,
+            and initial_capital comes from the state. Pass just the new bars
+            (plus any days needed for held positions' prices).
+        on_sell: Optional observer called as on_sell(date, trade, cash) after
+            each closed trade, including the final liquidation.
+        on_buy: Optional observer called as on_buy(date, position, cash) after
+            each fill, with cash already net of the outlay.
+        on_day_end: Optional observer called as on_day_end(snapshot, positions)
+            after each day's equity snapshot.
+        Observers must not mutate the objects they receive. Unset observers
+        cost one None check per event.
 
     Returns:
         BacktestResult with trades, equity_curve, and computed statistics.
+        end_state holds the state before the final liquidation. On a resumed
+        run, trades and equity_curve cover only the new dates while the
+        statistics (including trade_count) cover the whole history.
     """
     # Config
     initial_capital = float(config.get("initial_capital", 1000000))
+    if state is not None:
+        initial_capital = state.initial_capital
     max_positions = config.get("max_positions", 3)
     slippage = config.get("slippage_pct", 0.1) / 100.0
     commission = config.get("commission_pct", 0.025) / 100.0
@@ -58,6 +89,8 @@ def run_backtest(
         all_dates.update(df["trade_date"].values)
 
     if not all_dates:
+        if state is not None:
+            return _result_from_state(state)
         return BacktestResult(
             initial_capital=initial_capital, final_equity=initial_capital,
             total_return_pct=0.0, max_drawdown_pct=0.0, win_rate=0.0,
@@ -66,24 +99,37 @@ def run_backtest(
 
     # Build sorted trading dates and next-date map
     if trading_dates is None:
-        trading_dates = sorted(all_dates)
-    next_date_map = {}
-    for i in range(len(trading_dates) - 1):
-        next_date_map[trading_dates[i]] = trading_dates[i + 1]
-
-    # Build pending signal queue: execution_date -> [candidates]
-    pending_signals: dict[str, list[dict]] = {}
-    for signal_date in sorted(signals.keys()):
-        exec_date = next_date_map.get(signal_date)
-        if exec_date is None:
-            continue  # No T+1 date available
-        if exec_date not in pending_signals:
-            pending_signals[exec_date] = []
-        pending_signals[exec_date].extend(signals[signal_date])
+        calendar = TradingCalendar(all_dates)
+    elif isinstance(trading_dates, TradingCalendar):
+        calendar = trading_dates
+    else:
+        calendar = TradingCalendar(trading_dates)
+    if state is not None:
+        calendar = TradingCalendar(d for d in calendar.dates if d > state.last_date)
+        if not len(calendar):
+            return _result_from_state(state)
+    trading_dates = calendar.dates
+    next_date_map = calendar.next_date_map()
+
+    # Signal stream in date order; batches are pulled as the loop reaches
+    # their T+1 execution date. Signals carried in state fill on the first date.
+    if isinstance(signals, dict):
+        signal_iter = iter(sorted(signals.items()))
+    else:
+        signal_iter = iter(signals)
+    next_signal = next(signal_iter, None)
+    carried: list[dict] = []
+    if state is not None and state.pending_signals:
+        carried = [
+            cand for signal_date in sorted(state.pending_signals) for cand in state.pending_signals[signal_date]
+        ]
 
     # Initialize state
     cash = initial_capital
     positions: list[Position] = []
+    if state is not None:
+        cash = state.cash
+        positions = [replace(pos) for pos in state.positions]
     closed_trades: list[Trade] = []
     equity_curve: list[EquitySnapshot] = []
 
@@ -110,7 +156,7 @@ def run_backtest(
             net_ret = (actual_sell_price / pos.buy_price - 1.0) * 100.0
             cost_pct = ((commission + stamp_tax + transfer_fee) + slippage * 2) * 100.0
 
-            closed_trades.append(Trade(
+            trade = Trade(
                 code=pos.code,
                 buy_date=pos.buy_date,
                 buy_price=pos.buy_price,
@@ -120,12 +166,21 @@ def run_backtest(
                 gross_return_pct=round(gross_ret, 2),
                 net_return_pct=round(net_ret, 2),
                 cost_pct=round(cost_pct, 2),
-            ))
+            )
+            closed_trades.append(trade)
+            if on_sell is not None:
+                on_sell(date, trade, cash)
         positions = still_holding
 
-        # Step 2: Buy from pending signals at today's open price
-        if date in pending_signals:
-            candidates = pending_signals[date]
+        # Step 2: Buy from signals whose T+1 date is today, at today's open price
+        candidates = carried
+        carried = []
+        while next_signal is not None and next_signal[0] < date:
+            signal_date, batch = next_signal
+            if next_date_map.get(signal_date) == date:  # None: no T+1 date in this calendar
+                candidates = candidates + batch if candidates else batch
+            next_signal = next(signal_iter, None)
+        if candidates:
             for cand in candidates:
                 code = cand.get("ts_code") or cand.get("code")
                 raw_open_price = open_table.get(code, {}).get(date)
@@ -156,13 +211,16 @@ def run_backtest(
 
                 cash -= total_outlay
 
-                positions.append(Position(
+                position = Position(
                     code=code,
                     buy_date=date,
                     buy_price=actual_buy_price,
                     shares=shares,
                     cost=cost,
-                ))
+                )
+                positions.append(position)
+                if on_buy is not None:
+                    on_buy(date, position, cash)
 
         # Step 3: Snapshot equity
         total_equity = cash
@@ -170,16 +228,45 @@ def run_backtest(
             close_price = price_table.get(pos.code, {}).get(date, pos.buy_price)
             total_equity += pos.shares * close_price
 
-        equity_curve.append(EquitySnapshot(
+        snapshot = EquitySnapshot(
             trade_date=date,
             equity=round(total_equity, 2),
             cash=round(cash, 2),
             positions=len(positions),
-        ))
+        )
+        equity_curve.append(snapshot)
+        if on_day_end is not None:
+            on_day_end(snapshot, positions)
+
+    # Capture resumable state before liquidating
+    last_date = trading_dates[-1]
+    last_signals: list[dict] = []
+    while next_signal is not None and next_signal[0] <= last_date:
+        if next_signal[0] == last_date:
+            last_signals.extend(next_signal[1])
+        next_signal = next(signal_iter, None)
+    peak_equity, max_dd = update_drawdown(
+        equity_curve,
+        state.peak_equity if state is not None else None,
+        state.max_drawdown_pct if state is not None else 0.0,
+    )
+    trade_returns = (state.trade_returns if state is not None else []) + [t.net_return_pct for t in closed_trades]
+    end_state = BacktestState(
+        last_date=last_date,
+        initial_capital=initial_capital,
+        cash=cash,
+        positions=[replace(pos) for pos in positions],
+        pending_signals={last_date: last_signals} if last_signals else {},
+        peak_equity=peak_equity,
+        max_drawdown_pct=max_dd,
+        last_equity=equity_curve[-1].equity,
+        trade_count=len(trade_returns),
+        trade_returns=trade_returns,
+    )
 
     # Final liquidation at last trading date's close
+    n_before_liquidation = len(closed_trades)
     if positions and equity_curve:
-        last_date = trading_dates[-1]
         for pos in positions:
             raw_close = price_table.get(pos.code, {}).get(last_date, pos.buy_price)
             if raw_close is not None:
@@ -194,7 +281,7 @@ def run_backtest(
                     net_ret = (actual_sell_price / pos.buy_price - 1.0) * 100.0
                     cost_pct = ((commission + stamp_tax + transfer_fee) + slippage * 2) * 100.0
 
-                    closed_trades.append(Trade(
+                    trade = Trade(
                         code=pos.code,
                         buy_date=pos.buy_date,
                         buy_price=pos.buy_price,
@@ -204,7 +291,10 @@ def run_backtest(
                         gross_return_pct=round(gross_ret, 2),
                         net_return_pct=round(net_ret, 2),
                         cost_pct=round(cost_pct, 2),
-                    ))
+                    )
+                    closed_trades.append(trade)
+                    if on_sell is not None:
+                        on_sell(last_date, trade, cash)
 
     # Compute final equity
     final_equity = equity_curve[-1].equity if equity_curve else cash
@@ -212,15 +302,35 @@ def run_backtest(
     if positions and equity_curve:
         final_equity = round(cash, 2)
 
+    all_returns = trade_returns + [t.net_return_pct for t in closed_trades[n_before_liquidation:]]
+    win_rate, avg_return_pct, median_return_pct = calc_return_stats(all_returns)
+
     return BacktestResult(
         initial_capital=initial_capital,
         final_equity=final_equity,
         total_return_pct=calc_total_return(initial_capital, final_equity),
-        max_drawdown_pct=calc_max_drawdown(equity_curve),
-        win_rate=calc_win_rate(closed_trades),
-        trade_count=len(closed_trades),
-        avg_return_pct=calc_avg_return(closed_trades),
-        median_return_pct=calc_median_return(closed_trades),
+        max_drawdown_pct=round(max_dd, 2),
+        win_rate=win_rate,
+        trade_count=len(all_returns),
+        avg_return_pct=avg_return_pct,
+        median_return_pct=median_return_pct,
         trades=closed_trades,
         equity_curve=equity_curve,
-    )
\ No newline at end of file
+        end_state=end_state,
+    )
+
+
+def _result_from_state(state: BacktestState) -> BacktestResult:
+    """Result for a resumed run with no new trading dates: state unchanged."""
+    win_rate, avg_return_pct, median_return_pct = calc_return_stats(state.trade_returns)
+    return BacktestResult(
+        initial_capital=state.initial_capital,
+        final_equity=state.last_equity,
+        total_return_pct=calc_total_return(state.initial_capital, state.last_equity),
+        max_drawdown_pct=round(state.max_drawdown_pct, 2),
+        win_rate=win_rate,
+        trade_count=state.trade_count,
+        avg_return_pct=avg_return_pct,
+        median_return_pct=median_return_pct,
+        end_state=state,
+    )
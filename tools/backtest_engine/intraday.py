@@ -0,0 +1,735 @@
+"""Minute-resolution backtest for the b2_basic / b2_a intraday rule sets.
+
+Offline counterpart of what strategies/b2_basic/main.py and b2_a/main.py do
+in QMT's handlebar, one trading day at a time instead of one minute at a time:
+
+  T daily screen (b2_daily_signals) -> T+1 watchlist at 09:35 ->
+  entries, take-profit and 14:45 exits on a (codes x minutes) panel
+
+Each day only the candidates and held codes are loaded, through a
+minute_loader(trade_date, codes) -> {code: DataFrame(time, open, high, low,
+close, volume)} callable (tools.data_adapter.local_minute.minute_loader or
+synthetic.synthetic_minute_loader). Entry and exit triggers are found with
+array scans over the day's panel; only the resulting orders, which share
+cash, are applied one by one in time order.
+
+Rule sets (config["rule_set"]):
+  b2_basic: watchlist = top 3 candidates by 09:30-09:35 volume ratio (> 5)
+            against the past 5 sessions' per-minute volume; buy on a
+            3-tick rebound from the running low since 09:35, retrying on
+            later rebounds while cash is short.
+  b2_a:     watchlist = top 3 candidates by daily volume ratio
+            T / avg(T-5..T-1); buy once at 09:35. b2_a's graphic-pattern
+            filter runs on daily bars and is expected in the signals.
+  Both:     sell 1/3 at +3% and another 1/3 at +10% over the first entry
+            price, rounded down to 100-share lots; at 14:45 sell all
+            below the stop anchor (b2_basic: the buy day's low since
+            09:35, b2_a: the entry price), or when the
+            price is below T's close and volume so far exceeds T's and the
+            5-day average.
+
+Prices are minute closes, forward-filled within the day like QMT's
+fill_data. Shares bought today cannot be sold today (T+1). Per-code exit
+state is dropped once a position is fully sold, while the QMT scripts keep
+it for the whole session.
+
+Cost model (A-share, per order):
+  Buy side:  price * (1 + slippage), commission (min min_commission) + transfer_fee
+  Sell side: price * (1 - slippage), commission (min min_commission) + stamp_tax + transfer_fee
+"""
+
+import heapq
+from dataclasses import dataclass, replace
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from strategies.indicators import SignalCollector, build_calendar, hhv, iter_panels, llv
+
+from .models import BacktestResult, EquitySnapshot, Position, Trade
+from .stats import calc_return_stats, calc_total_return, update_drawdown
+from .trading_calendar import TradingCalendar
+
+MinuteLoader = Callable[[str, list[str]], dict[str, pd.DataFrame]]
+
+MINUTE_FIELDS = ("open", "high", "low", "close", "volume")
+LOT_SIZE = 100
+CONTINUOUS_SESSIONS = (("09:30", "11:30"), ("13:00", "15:00"))
+
+# main.py constants of the b2 scripts
+DEFAULT_INTRADAY_CONFIG = {
+    "rule_set": "b2_basic",
+    "initial_capital": 1000000,
+    "order_cash": 20000.0,
+    "watchlist_size": 3,
+    "watchlist_time": "09:35",
+    "volume_ratio_window": ("09:30", "09:35"),
+    "volume_ratio_min": 5.0,
+    "volume_ratio_days": 5,
+    "trading_minutes_per_day": 240.0,
+    "entry_tick_min": 3,
+    "tick_size": 0.01,
+    "take_profit_1": 0.03,
+    "take_profit_2": 0.10,
+    "take_profit_sell_ratio": 1.0 / 3.0,
+    "stop_check_time": "14:45",
+    "slippage_pct": 0.1,
+    "commission_pct": 0.025,
+    "min_commission": 5.0,
+    "stamp_tax_pct": 0.05,
+    "transfer_fee_pct": 0.001,
+}
+
+B2_DAILY_DEFAULTS = {
+    "kdj_n": 9,
+    "kdj_init": 50.0,
+    "kdj_bars": 11,  # DAILY_KDJ_N + 2: the scripts fetch only this many bars
+    "j_prev_max": 20.0,
+    "j_now_max": 65.0,
+    "daily_return_min": 0.04,
+    "volume_ratio_min": 1.5,
+    "upper_shadow_max_ratio": 0.20,
+}
+
+
+# ---------------------------------------------------------------------------
+# Daily screen (build_daily_candidates of both scripts)
+# ---------------------------------------------------------------------------
+
+def b2_daily_signals(
+    daily_data: dict[str, pd.DataFrame],
+    params: dict | None = None,
+) -> dict[str, list[dict]]:
+    """Run the b2_basic / b2_a daily screen on all stocks.
+
+    Args:
+        daily_data: {stock_code: DataFrame} with columns:
+                    trade_date, open, high, low, close, vol
+        params: Overrides for B2_DAILY_DEFAULTS.
+
+    Returns:
+        {trade_date: [{code, close, daily_return_pct, vol_ratio, j_now, j_prev}, ...]}
+        Candidates in daily_data order per date, as the scripts keep universe order.
+    """
+    params = {**B2_DAILY_DEFAULTS, **(params or {})}
+    kdj_bars = params["kdj_bars"]
+
+    calendar = build_calendar(daily_data)
+    collector = SignalCollector(calendar)
+    for panel in iter_panels(daily_data, ("open", "high", "low", "close", "vol"), calendar, min_bars=kdj_bars):
+        c, o, h, l, v = panel["close"], panel["open"], panel["high"], panel["low"], panel["vol"]
+        j_prev, j_now = _window_kdj_j(c, h, l, params["kdj_n"], params["kdj_init"], kdj_bars)
+        prev_close = _shift(c, 1)
+        prev_vol = _shift(v, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            daily_ret = c / prev_close - 1.0
+            vol_ratio = v / prev_vol
+            span = h - l
+            shadow = np.where(span <= 0, 0.0, (h - np.maximum(o, c)) / span)
+
+        hits = panel.bar_index() >= kdj_bars - 1
+        hits &= ~(j_prev >= params["j_prev_max"])
+        hits &= ~(j_now >= params["j_now_max"])
+        hits &= (prev_close > 0) & (daily_ret > params["daily_return_min"])
+        hits &= ~(prev_vol <= 0) & ~(v < prev_vol * params["volume_ratio_min"])
+        hits &= ~(shadow >= params["upper_shadow_max_ratio"])
+        collector.add(panel, hits, {
+            "close": c, "daily_return_pct": daily_ret * 100.0, "vol_ratio": vol_ratio, "j_now": j_now, "j_prev": j_prev,
+        })
+
+    return dict(collector.iter_dates(_daily_candidate, None))
+
+
+def _daily_candidate(code: str, values: dict[str, float]) -> dict:
+    return {
+        "code": code,
+        "close": float(values["close"]),
+        "daily_return_pct": round(float(values["daily_return_pct"]), 2),
+        "vol_ratio": round(float(values["vol_ratio"]), 2),
+        "j_now": round(float(values["j_now"]), 2),
+        "j_prev": round(float(values["j_prev"]), 2),
+    }
+
+
+def _shift(mat: np.ndarray, k: int) -> np.ndarray:
+    """Column t holds column t-k of mat (REF(X, k)); NaN in the first k columns."""
+    out = np.full(mat.shape, np.nan)
+    if k < mat.shape[1]:
+        out[:, k:] = mat[:, :mat.shape[1] - k]
+    return out
+
+
+def _window_kdj_j(
+    close: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    n: int,
+    init: float,
+    window: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(J of the previous bar, J of the bar) as the scripts' compute_kdj sees them.
+
+    The scripts fetch only `window` bars, so KDJ restarts from init at the
+    first of them and its RSV windows are partial there. Column t holds the
+    J values of the window ending at bar t, computed with the scripts'
+    (2/3)*prev + (1/3)*x steps.
+    """
+    rsv_by_len = []
+    for m in range(1, n + 1):
+        low_m = llv(low, m)
+        high_m = hhv(high, m)
+        span = high_m - low_m
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsv_by_len.append(np.where(span == 0, 0.0, (close - low_m) / span * 100.0))
+
+    k = np.full(close.shape, float(init))
+    d = np.full(close.shape, float(init))
+    j_prev = j = np.full(close.shape, np.nan)
+    for p in range(window):
+        # Bar p of the window ending at t is bar t-(window-1-p), with p+1 bars before it in the window
+        rsv = _shift(rsv_by_len[min(p + 1, n) - 1], window - 1 - p)
+        k = (2.0 / 3.0) * k + (1.0 / 3.0) * rsv
+        d = (2.0 / 3.0) * d + (1.0 / 3.0) * k
+        j_prev, j = j, 3.0 * k - 2.0 * d
+    return j_prev, j
+
+
+# ---------------------------------------------------------------------------
+# Minute panels
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MinutePanel:
+    """One session of minute bars for a set of codes on a shared time grid."""
+    codes: list[str]
+    times: np.ndarray                 # "HH:MM", ascending
+    fields: dict[str, np.ndarray]     # MINUTE_FIELDS -> (codes x minutes), NaN where a bar is missing
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.fields[name]
+
+    def index_at(self, hhmm: str) -> int:
+        """First minute at or after hhmm; len(times) if none."""
+        return int(np.searchsorted(self.times, hhmm, side="left"))
+
+
+def build_minute_panel(frames: dict[str, pd.DataFrame], codes: list[str]) -> MinutePanel:
+    """Stack minute frames of codes (rows in codes order; absent codes stay NaN)."""
+    present = [frames[code] for code in codes if code in frames and not frames[code].empty]
+    if present:
+        times = np.unique(np.concatenate([df["time"].values.astype(str) for df in present]))
+    else:
+        times = np.array([], dtype=str)
+    fields = {col: np.full((len(codes), len(times)), np.nan) for col in MINUTE_FIELDS}
+    for row, code in enumerate(codes):
+        df = frames.get(code)
+        if df is None or df.empty:
+            continue
+        idx = np.searchsorted(times, df["time"].values.astype(str))
+        for col in MINUTE_FIELDS:
+            fields[col][row, idx] = df[col].values.astype(float)
+    return MinutePanel(list(codes), times, fields)
+
+
+def forward_fill(mat: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value of each row forward; NaN before the first."""
+    if mat.size == 0:
+        return mat.copy()
+    idx = np.where(np.isnan(mat), 0, np.arange(mat.shape[1]))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    return mat[np.arange(mat.shape[0])[:, None], idx]
+
+
+def continuous_session_mask(times: np.ndarray) -> np.ndarray:
+    mask = np.zeros(len(times), dtype=bool)
+    for start, end in CONTINUOUS_SESSIONS:
+        mask |= (times >= start) & (times <= end)
+    return mask
+
+
+# ---------------------------------------------------------------------------
+# Portfolio book
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _ExitState:
+    """Per-code state the scripts key by code: first entry price, stop anchor, take-profit stage."""
+    entry_price: float
+    buy_date: str
+    stop_low: float
+    stage: int = 0
+
+
+class _Book:
+    """Cash, FIFO lots per code and closed trades, with the cost model applied per order."""
+
+    def __init__(self, cash: float, cfg: dict, on_buy=None, on_sell=None):
+        self.cash = cash
+        self.slippage = cfg["slippage_pct"] / 100.0
+        self.commission = cfg["commission_pct"] / 100.0
+        self.min_commission = float(cfg["min_commission"])
+        self.stamp_tax = cfg["stamp_tax_pct"] / 100.0
+        self.transfer_fee = cfg["transfer_fee_pct"] / 100.0
+        self.order_cash = float(cfg["order_cash"])
+        self.lots: dict[str, list[Position]] = {}
+        self.exit_state: dict[str, _ExitState] = {}
+        self.trades: list[Trade] = []
+        self.on_buy = on_buy
+        self.on_sell = on_sell
+
+    def positions(self) -> list[Position]:
+        return [lot for lots in self.lots.values() for lot in lots]
+
+    def sellable(self, code: str, date: str) -> int:
+        return sum(lot.shares for lot in self.lots.get(code, ()) if lot.buy_date != date)
+
+    def _fee(self, amount: float, rate: float) -> float:
+        return max(amount * self.commission, self.min_commission) + amount * rate
+
+    def buy(self, code: str, price: float, date: str) -> bool:
+        """Buy min(cash, order_cash) worth in 100-share lots; False if nothing fills."""
+        if self.cash <= 0:
+            return False
+        actual_price = price * (1.0 + self.slippage)
+        shares = int(min(self.cash, self.order_cash) / actual_price / LOT_SIZE) * LOT_SIZE
+        while shares > 0 and shares * actual_price + self._fee(shares * actual_price, self.transfer_fee) > self.cash:
+            shares -= LOT_SIZE
+        if shares <= 0:
+            return False
+        cost = shares * actual_price
+        self.cash -= cost + self._fee(cost, self.transfer_fee)
+        position = Position(code=code, buy_date=date, buy_price=actual_price, shares=shares, cost=cost)
+        self.lots.setdefault(code, []).append(position)
+        if self.on_buy is not None:
+            self.on_buy(date, position, self.cash)
+        return True
+
+    def sell(self, code: str, shares: int, price: float, date: str, liquidate: bool = False):
+        """Sell up to shares of code's lots bought before date, oldest first.
+
+        Orders are rounded down to LOT_SIZE unless they clear the whole
+        holding, the only case where A-shares accept an odd lot. liquidate
+        also sells lots bought on date (end of run), without recording them
+        as trades, like run_backtest's final liquidation.
+        """
+        if shares < sum(lot.shares for lot in self.lots.get(code, ())):
+            shares = shares // LOT_SIZE * LOT_SIZE
+        actual_price = price * (1.0 - self.slippage)
+        sold = 0
+        remaining = []
+        records = []
+        for lot in self.lots.get(code, []):
+            take = min(lot.shares, shares - sold) if (liquidate or lot.buy_date != date) else 0
+            if take > 0:
+                sold += take
+                if lot.buy_date != date:
+                    records.append((lot, take))
+            if lot.shares > take:
+                left = lot.shares - take
+                remaining.append(replace(lot, shares=left, cost=lot.cost * left / lot.shares))
+        if sold <= 0:
+            return
+        proceeds = sold * actual_price
+        self.cash += proceeds - self._fee(proceeds, self.stamp_tax + self.transfer_fee)
+        if remaining:
+            self.lots[code] = remaining
+        else:
+            del self.lots[code]
+            self.exit_state.pop(code, None)
+
+        cost_pct = ((self.commission + self.stamp_tax + self.transfer_fee) + self.slippage * 2) * 100.0
+        for lot, take in records:
+            trade = Trade(
+                code=code,
+                buy_date=lot.buy_date,
+                buy_price=lot.buy_price,
+                sell_date=date,
+                sell_price=actual_price,
+                shares=take,
+                gross_return_pct=round((price / lot.buy_price - 1.0) * 100.0, 2),
+                net_return_pct=round((actual_price / lot.buy_price - 1.0) * 100.0, 2),
+                cost_pct=round(cost_pct, 2),
+            )
+            self.trades.append(trade)
+            if self.on_sell is not None:
+                self.on_sell(date, trade, self.cash)
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+def run_intraday_backtest(
+    signals: dict[str, list[dict]] | Iterable[tuple[str, list[dict]]],
+    daily_data: dict[str, pd.DataFrame],
+    minute_loader: MinuteLoader,
+    config: dict | None = None,
+    trading_dates: list[str] | TradingCalendar | None = None,
+    *,
+    on_sell: Callable[[str, Trade, float], None] | None = None,
+    on_buy: Callable[[str, Position, float], None] | None = None,
+    on_day_end: Callable[[EquitySnapshot, list[Position]], None] | None = None,
+) -> BacktestResult:
+    """Run the b2 intraday rules minute by minute over trading_dates.
+
+    Args:
+        signals: {T: [{code, ...}]} daily candidates (e.g. b2_daily_signals),
+            or an iterator of (T, [{code, ...}]) in ascending date order.
+            Candidates of T are traded on the next trading date.
+        daily_data: {code: DataFrame(trade_date, open, high, low, close, vol)}
+            for T-day exit statistics and end-of-day valuation.
+        minute_loader: minute_loader(trade_date, codes) -> {code: DataFrame(
+            time "HH:MM", open, high, low, close, volume)}.
+        config: Overrides for DEFAULT_INTRADAY_CONFIG (percentages as in
+            run_backtest, e.g. slippage_pct 0.1 means 0.1%).
+        trading_dates: Optional sorted list of trading dates or a TradingCalendar.
+            If None, extracted from daily_data.
+        on_sell / on_buy / on_day_end: Observers as in run_backtest.
+
+    Returns:
+        BacktestResult with trades, equity_curve and statistics; positions
+        left at the end are liquidated at the last close like run_backtest.
+    """
+    cfg = {**DEFAULT_INTRADAY_CONFIG, **(config or {})}
+    if cfg["rule_set"] not in ("b2_basic", "b2_a"):
+        raise ValueError(f"Unknown rule_set: {cfg['rule_set']}")
+    initial_capital = float(cfg["initial_capital"])
+
+    daily = {
+        code: (
+            df["trade_date"].values.astype(str),
+            df["close"].values.astype(float),
+            df["vol"].values.astype(float),
+        )
+        for code, df in daily_data.items()
+    }
+    if trading_dates is None:
+        calendar = TradingCalendar.from_market_data(daily_data)
+    elif isinstance(trading_dates, TradingCalendar):
+        calendar = trading_dates
+    else:
+        calendar = TradingCalendar(trading_dates)
+    if not len(calendar):
+        return BacktestResult(
+            initial_capital=initial_capital, final_equity=initial_capital,
+            total_return_pct=0.0, max_drawdown_pct=0.0, win_rate=0.0,
+            trade_count=0, avg_return_pct=0.0, median_return_pct=0.0,
+        )
+    next_date_map = calendar.next_date_map()
+
+    if isinstance(signals, dict):
+        signal_iter = iter(sorted(signals.items()))
+    else:
+        signal_iter = iter(signals)
+    next_signal = next(signal_iter, None)
+
+    book = _Book(initial_capital, cfg, on_buy=on_buy, on_sell=on_sell)
+    session_volume: dict[tuple[str, str], float | None] = {}
+    equity_curve: list[EquitySnapshot] = []
+
+    for date in calendar.dates:
+        candidates: list[dict] = []
+        while next_signal is not None and next_signal[0] < date:
+            signal_date, batch = next_signal
+            if next_date_map.get(signal_date) == date:
+                candidates = candidates + batch if candidates else batch
+            next_signal = next(signal_iter, None)
+        t_date = calendar.prev(date)
+        cand_codes = list(dict.fromkeys(c.get("ts_code") or c.get("code") for c in candidates))
+        held = list(book.lots)
+
+        frames: dict[str, pd.DataFrame] = {}
+        if cfg["rule_set"] == "b2_basic":
+            if cand_codes:
+                frames = minute_loader(date, cand_codes + [c for c in held if c not in cand_codes])
+            watchlist = _volume_ratio_watchlist(
+                cand_codes, frames, calendar, date, minute_loader, session_volume, cfg
+            )
+        else:
+            watchlist = _daily_ratio_watchlist(cand_codes, daily, t_date, cfg)
+        codes = watchlist + [c for c in held if c not in watchlist]
+        missing = [c for c in codes if c not in frames]
+        if missing:
+            frames.update(minute_loader(date, missing))
+        if codes:
+            _run_session(build_minute_panel(frames, codes), watchlist, daily, t_date, date, book, cfg)
+
+        total_equity = book.cash
+        for pos in book.positions():
+            total_equity += pos.shares * _daily_close(daily, pos.code, date, pos.buy_price)
+        snapshot = EquitySnapshot(
+            trade_date=date,
+            equity=round(total_equity, 2),
+            cash=round(book.cash, 2),
+            positions=len(book.lots),
+        )
+        equity_curve.append(snapshot)
+        if on_day_end is not None:
+            on_day_end(snapshot, book.positions())
+
+    _, max_dd = update_drawdown(equity_curve)
+
+    # Final liquidation at the last trading date's close
+    last_date = calendar.dates[-1]
+    final_equity = equity_curve[-1].equity
+    if book.lots:
+        for code in list(book.lots):
+            price = _daily_close(daily, code, last_date, book.lots[code][0].buy_price)
+            book.sell(code, sum(lot.shares for lot in book.lots[code]), price, last_date, liquidate=True)
+        final_equity = round(book.cash, 2)
+
+    returns = [t.net_return_pct for t in book.trades]
+    win_rate, avg_return_pct, median_return_pct = calc_return_stats(returns)
+    return BacktestResult(
+        initial_capital=initial_capital,
+        final_equity=final_equity,
+        total_return_pct=calc_total_return(initial_capital, final_equity),
+        max_drawdown_pct=round(max_dd, 2),
+        win_rate=win_rate,
+        trade_count=len(returns),
+        avg_return_pct=avg_return_pct,
+        median_return_pct=median_return_pct,
+        trades=book.trades,
+        equity_curve=equity_curve,
+    )
+
+
+def _daily_close(daily: dict, code: str, date: str, default: float) -> float:
+    dates, closes, _ = daily.get(code, ((), (), ()))
+    i = int(np.searchsorted(dates, date)) if len(dates) else 0
+    if i < len(dates) and dates[i] == date:
+        return float(closes[i])
+    return default
+
+
+def _daily_window(daily: dict, code: str, end_date: str, count: int) -> tuple[np.ndarray, np.ndarray] | None:
+    """(closes, vols) of the last count bars on or before end_date; None if fewer exist."""
+    if code not in daily:
+        return None
+    dates, closes, vols = daily[code]
+    end = int(np.searchsorted(dates, end_date, side="right"))
+    if end < count:
+        return None
+    return closes[end - count:end], vols[end - count:end]
+
+
+def _session_volume_totals(frames: dict[str, pd.DataFrame]) -> dict[str, float]:
+    """Continuous-session volume per code (09:30-11:30, 13:00-15:00)."""
+    totals = {}
+    for code, df in frames.items():
+        if df.empty:
+            continue
+        times = df["time"].values.astype(str)
+        totals[code] = float(df["volume"].values[continuous_session_mask(times)].astype(float).sum())
+    return totals
+
+
+def _volume_ratio_watchlist(
+    cand_codes: list[str],
+    frames: dict[str, pd.DataFrame],
+    calendar: TradingCalendar,
+    date: str,
+    minute_loader: MinuteLoader,
+    session_volume: dict[tuple[str, str], float | None],
+    cfg: dict,
+) -> list[str]:
+    """b2_basic build_watchlist: top candidates by opening volume ratio.
+
+    ratio = (volume in the 09:30-09:35 window / 5) / (mean of the past
+    sessions' continuous volume / 240). session_volume caches past totals
+    by (code, date) across days, None for sessions without bars.
+    """
+    n_days = cfg["volume_ratio_days"]
+    prev_dates = [calendar.prev(date, k) for k in range(n_days, 0, -1)]
+    if not cand_codes or any(d is None for d in prev_dates):
+        return []
+    window_start, window_end = cfg["volume_ratio_window"]
+    elapsed = float((int(window_end[:2]) * 60 + int(window_end[3:])) - (int(window_start[:2]) * 60 + int(window_start[3:])))
+    minutes_per_day = float(cfg["trading_minutes_per_day"])
+
+    prev_dates = prev_dates[::-1]  # newest first, like get_prev_trading_dates
+    for d in prev_dates:
+        missing = [code for code in cand_codes if (code, d) not in session_volume]
+        if missing:
+            totals = _session_volume_totals(minute_loader(d, missing))
+            for code in missing:
+                session_volume[(code, d)] = totals.get(code)
+    keep = set(prev_dates)
+    for key in [k for k in session_volume if k[1] not in keep]:
+        del session_volume[key]
+
+    ranked = []
+    for code in cand_codes:
+        df = frames.get(code)
+        if df is None or df.empty:
+            continue
+        times = df["time"].values.astype(str)
+        in_window = (times >= window_start) & (times <= window_end)
+        today_cum = float(df["volume"].values[in_window].astype(float).sum())
+        if today_cum <= 0:
+            continue
+        hist_per_min = []
+        for d in prev_dates:
+            total = session_volume.get((code, d))
+            if total is not None and total > 0:
+                hist_per_min.append(total / minutes_per_day)
+        if len(hist_per_min) < n_days:
+            continue
+        avg_prev_per_min = sum(hist_per_min) / float(n_days)
+        if avg_prev_per_min <= 0:
+            continue
+        ratio = (today_cum / elapsed) / avg_prev_per_min
+        if ratio > cfg["volume_ratio_min"]:
+            ranked.append((code, ratio))
+
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return [code for code, _ in ranked[:cfg["watchlist_size"]]]
+
+
+def _daily_ratio_watchlist(cand_codes: list[str], daily: dict, t_date: str, cfg: dict) -> list[str]:
+    """b2_a build_watchlist ranking: vol(T) / avg vol(T-5..T-1)."""
+    ranked = []
+    for code in cand_codes:
+        window = _daily_window(daily, code, t_date, 6)
+        if window is None:
+            continue
+        vols = window[1]
+        t_vol = float(vols[-1])
+        avg5 = sum(float(v) for v in vols[-6:-1]) / 5.0
+        if t_vol <= 0 or avg5 <= 0:
+            continue
+        ranked.append((code, t_vol / avg5))
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    return [code for code, _ in ranked[:cfg["watchlist_size"]]]
+
+
+def _first_at_or_after(mask: np.ndarray, start: int) -> int | None:
+    idx = np.flatnonzero(mask[start:])
+    return int(idx[0]) + start if idx.size else None
+
+
+def _run_session(
+    panel: MinutePanel,
+    watchlist: list[str],
+    daily: dict,
+    t_date: str,
+    date: str,
+    book: _Book,
+    cfg: dict,
+):
+    """Replay one session's entries and exits on the (codes x minutes) panel.
+
+    Trigger bars come from array scans; orders go through a heap keyed by
+    (bar, phase, order) so that, within a bar, entries run before
+    take-profit and take-profit before the 14:45 stop, as in handlebar.
+    """
+    basic = cfg["rule_set"] == "b2_basic"
+    prices = forward_fill(panel["close"])
+    rows = {code: row for row, code in enumerate(panel.codes)}
+    n_bars = len(panel.times)
+    start = panel.index_at(cfg["watchlist_time"])
+    stop_at = panel.index_at(cfg["stop_check_time"])
+    tp_levels = (cfg["take_profit_1"], cfg["take_profit_2"])
+    events: list[tuple] = []
+
+    # Entries: b2_basic on each rebound of entry_tick_min ticks off the running
+    # low since the watchlist time, until one fills; b2_a once at that time.
+    running_low: dict[str, np.ndarray] = {}
+    buy_bars: dict[str, np.ndarray] = {}
+    if start < n_bars:
+        for k, code in enumerate(watchlist):
+            p = prices[rows[code], start:]
+            if basic:
+                low = np.fmin.accumulate(np.where(np.isnan(p), np.inf, p))
+                running_low[code] = low
+                bars = np.flatnonzero(p >= low + cfg["entry_tick_min"] * cfg["tick_size"]) + start
+            else:
+                bars = np.flatnonzero(~np.isnan(p))[:1] + start
+            if bars.size:
+                buy_bars[code] = bars
+                heapq.heappush(events, (int(bars[0]), 0, k, 0, code))
+
+    # Take-profit stages of positions sellable today, over the first entry price
+    held = [code for code in book.lots if book.sellable(code, date) > 0 and code in book.exit_state]
+    returns: dict[str, np.ndarray] = {}
+    for k, code in enumerate(held):
+        state = book.exit_state[code]
+        with np.errstate(invalid="ignore"):
+            returns[code] = prices[rows[code]] / state.entry_price - 1.0
+        if state.stage < 2:
+            bar = _first_at_or_after(returns[code] >= tp_levels[state.stage], 0)
+            if bar is not None:
+                heapq.heappush(events, (bar, 1, k, 0, code))
+
+    if stop_at < n_bars:
+        heapq.heappush(events, (stop_at, 2, 0, 0, ""))
+
+    while events:
+        bar, phase, order, attempt, code = heapq.heappop(events)
+        if phase == 0:
+            price = float(prices[rows[code], bar])
+            if book.buy(code, price, date):
+                if code not in book.exit_state:
+                    stop_low = float(running_low[code][bar - start]) if basic else price
+                    book.exit_state[code] = _ExitState(entry_price=price, buy_date=date, stop_low=stop_low)
+            elif basic and attempt + 1 < len(buy_bars[code]):
+                heapq.heappush(events, (int(buy_bars[code][attempt + 1]), 0, order, attempt + 1, code))
+        elif phase == 1:
+            state = book.exit_state.get(code)
+            qty = book.sellable(code, date)
+            if state is None or qty <= 0:
+                continue
+            # _sell_ratio's tranche in whole lots; the stage advances even when it rounds to 0
+            tranche = int(qty * cfg["take_profit_sell_ratio"]) // LOT_SIZE * LOT_SIZE
+            if tranche > 0:
+                book.sell(code, tranche, float(prices[rows[code], bar]), date)
+            state.stage += 1
+            if state.stage < 2:
+                next_bar = _first_at_or_after(returns[code] >= tp_levels[state.stage], bar + 1)
+                if next_bar is not None:
+                    heapq.heappush(events, (next_bar, 1, order, 0, code))
+        else:
+            _check_stops(panel, prices, rows, bar, daily, t_date, date, book)
+
+    # b2_basic keeps lowering the stop anchor of today's buys until the close
+    if basic:
+        for code, low in running_low.items():
+            state = book.exit_state.get(code)
+            if state is not None and state.buy_date == date and code in book.lots:
+                state.stop_low = min(state.stop_low, float(low[-1]))
+
+
+def _check_stops(
+    panel: MinutePanel,
+    prices: np.ndarray,
+    rows: dict[str, int],
+    bar: int,
+    daily: dict,
+    t_date: str,
+    date: str,
+    book: _Book,
+):
+    """14:45 exits: below the stop anchor, or down on expanding volume."""
+    for code in list(book.lots):
+        qty = book.sellable(code, date)
+        if qty <= 0 or code not in rows:
+            continue
+        price = float(prices[rows[code], bar])
+        if np.isnan(price):
+            continue
+        state = book.exit_state.get(code)
+        if state is not None and price < state.stop_low:
+            book.sell(code, qty, price, date)
+            continue
+        window = _daily_window(daily, code, t_date, 6)
+        if window is None:
+            continue
+        closes, vols = window
+        prev_close, prev_vol = float(closes[-1]), float(vols[-1])
+        avg5 = sum(float(v) for v in vols[-6:-1]) / 5.0
+        if price >= prev_close:
+            continue
+        today_cum = float(np.nansum(panel["volume"][rows[code], :bar + 1]))
+        if today_cum > prev_vol and today_cum > avg5:
+            book.sell(code, qty, price, date)
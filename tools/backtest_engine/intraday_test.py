@@ -0,0 +1,96 @@
+"""Scenario test: run_intraday_backtest on hand-made minute sessions.
+
+Two codes pass the T daily screen and are bought on T+1 on a b2_basic
+rebound. The next session walks one of them through both take-profit
+tranches and the 14:45 stop, and the other through the volume-expansion
+exit; the buy day checks that T+1 blocks same-day sells.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from tools.backtest_engine.intraday import run_intraday_backtest
+from tools.data_adapter.synthetic import synthetic_minute_times
+
+DATES = [f"202503{d:02d}" for d in range(3, 15)]
+SIGNAL_DATE, BUY_DATE, EXIT_DATE = DATES[5], DATES[6], DATES[7]
+TIMES = synthetic_minute_times()
+BAR_0935 = TIMES.index("09:35")
+BAR_1445 = TIMES.index("14:45")
+SLIPPAGE = 0.001
+
+
+def _daily_data() -> dict[str, pd.DataFrame]:
+    return {
+        code: pd.DataFrame({
+            "trade_date": DATES, "open": 10.0, "high": 10.0, "low": 10.0, "close": 10.0, "vol": 2400.0,
+        })
+        for code in ("600000", "600001")
+    }
+
+
+def _session(code: str, date: str) -> pd.DataFrame:
+    price = np.full(len(TIMES), 10.0)
+    volume = np.full(len(TIMES), 10.0)
+    if date == BUY_DATE:
+        volume[:BAR_0935 + 1] = 1000.0  # opening volume ratio 100
+        if code == "600000":
+            # Low 9.85, +2 ticks at 9.87, +3 ticks at 9.88 -> entry on that bar
+            price[BAR_0935:] = [9.90, 9.85, 9.87, 9.88] + [10.0] * (len(TIMES) - BAR_0935 - 4)
+            price[100] = 10.50  # +6%, but bought today
+        else:
+            price[BAR_0935:] = 9.80
+            price[BAR_0935 + 5:] = 9.83
+    elif date == EXIT_DATE:
+        if code == "600000":
+            price[10:] = 10.20   # +3.2% -> first tranche
+            price[50:] = 10.90   # +10.3% -> second tranche
+            price[BAR_1445:] = 9.80  # below the buy day's low 9.85
+        else:
+            price[:] = 9.90      # below T's close 10.0, above the stop anchor 9.80
+            volume[:] = 100.0    # 22,500 by 14:45 > T's 2,400 and its 5-day average
+    return pd.DataFrame({"time": TIMES, "open": price, "high": price, "low": price, "close": price, "volume": volume})
+
+
+def _loader(trade_date: str, codes: list[str]) -> dict[str, pd.DataFrame]:
+    return {code: _session(code, trade_date) for code in codes}
+
+
+def test_intraday_scenario():
+    buys = []
+    signals = {SIGNAL_DATE: [{"code": "600000"}, {"code": "600001"}]}
+    result = run_intraday_backtest(
+        signals, _daily_data(), _loader, {"rule_set": "b2_basic"},
+        on_buy=lambda date, pos, cash: buys.append((date, pos.code, pos.shares, pos.buy_price)),
+    )
+
+    # Rebound entries: 3 ticks off the running low, not the 2-tick bar before it
+    assert [(d, c, s) for d, c, s, _ in buys] == [(BUY_DATE, "600000", 2000), (BUY_DATE, "600001", 2000)]
+    assert np.isclose(buys[0][3], 9.88 * (1 + SLIPPAGE))
+    assert np.isclose(buys[1][3], 9.83 * (1 + SLIPPAGE))
+
+    # T+1: the +6% bar on the buy day sells nothing
+    assert all(t.sell_date != BUY_DATE for t in result.trades)
+    assert result.equity_curve[DATES.index(BUY_DATE)].positions == 2
+
+    sells = [(t.code, t.sell_date, t.shares, round(t.sell_price / (1 - SLIPPAGE), 2)) for t in result.trades]
+    assert sells == [
+        ("600000", EXIT_DATE, 600, 10.20),   # int(2000 / 3) -> 600
+        ("600000", EXIT_DATE, 400, 10.90),   # int(1400 / 3) -> 400
+        ("600000", EXIT_DATE, 1000, 9.80),   # 14:45 stop below the buy day's low
+        ("600001", EXIT_DATE, 2000, 9.90),   # 14:45 down on expanding volume
+    ]
+    assert all(t.shares % 100 == 0 for t in result.trades)
+    assert result.equity_curve[DATES.index(EXIT_DATE)].positions == 0
+    print(f"INTRADAY SCENARIO PASSED: {len(buys)} buys, {len(result.trades)} sells")
+
+
+if __name__ == "__main__":
+    test_intraday_scenario()
@@ -1,6 +1,7 @@
 """Backtest engine data models."""
 
-from dataclasses import dataclass, field
+import json
+from dataclasses import asdict, dataclass, field
 
 
 @dataclass
@@ -36,6 +37,50 @@ class EquitySnapshot:
     positions: int
 
 
+@dataclass
+class BacktestState:
+    """Engine state at the end of a run, taken before the final liquidation.
+
+    Passing it back to run_backtest(state=...) continues from the next
+    trading date as if the run had never stopped.
+    """
+    last_date: str
+    initial_capital: float
+    cash: float
+    positions: list[Position]
+    pending_signals: dict[str, list[dict]]  # signal_date -> candidates awaiting a T+1 date
+    peak_equity: float | None
+    max_drawdown_pct: float                 # unrounded, for continuing the running max
+    last_equity: float
+    trade_count: int                        # trades closed so far = offset of the next segment's trades
+    trade_returns: list[float] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BacktestState":
+        data = dict(data)
+        data["positions"] = [Position(**p) for p in data.get("positions", [])]
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, default=_json_scalar)
+
+    @classmethod
+    def load(cls, path: str) -> "BacktestState":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _json_scalar(value):
+    """json default for numpy scalars carried in candidate dicts."""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 @dataclass
 class BacktestResult:
     """Complete backtest result."""
@@ -49,6 +94,7 @@ class BacktestResult:
     median_return_pct: float
     trades: list[Trade] = field(default_factory=list)
     equity_curve: list[EquitySnapshot] = field(default_factory=list)
+    end_state: BacktestState | None = None
 
     def __post_init__(self):
         assert self.initial_capital > 0, "initial_capital must be positive"
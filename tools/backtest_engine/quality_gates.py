@@ -4,10 +4,21 @@ GATE-BE-001: Determinism — same inputs produce same outputs
 GATE-BE-002: Equity conservation — cash never goes negative
 GATE-BE-003: Lot-size compliance — all positions in 100-share lots
 GATE-BE-004: T+1 compliance — no same-day sell after buy
+
+All gates share one GateSession: data is loaded and signals generated once,
+and one backtest result serves gates 002-004. Only GATE-BE-001 runs a second
+backtest to compare against.
+
+Usage:
+  python tools/backtest_engine/quality_gates.py
+  python tools/backtest_engine/quality_gates.py --data-dir D:/bench/synth_3000x5 --workers 4
 """
 
+import argparse
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 project_root = Path(__file__).resolve().parent.parent.parent
@@ -16,6 +27,7 @@ sys.path.insert(0, str(project_root))
 from strategies.st_b2.strategy import generate_signals, get_default_config
 from tools.data_adapter.local_csv import load_market_data
 from tools.backtest_engine import run_backtest
+from tools.signal_cache import SignalCache
 
 
 def load_config():
@@ -25,44 +37,88 @@ def load_config():
     return cfg
 
 
-def run_full_backtest():
-    """Run a full backtest with real data and return the result."""
-    cfg = load_config()
-    start_date = cfg.get("start_date", "20240101")
-    end_date = cfg.get("end_date", "20251231")
-    data_dir = cfg.get("data_dir", "")
-
-    print("Loading market data...")
-    daily_data = load_market_data(data_dir, start_date, end_date)
-
-    print("Generating signals...")
-    params = get_default_config()
-    for key in params:
-        if key in cfg:
-            params[key] = cfg[key]
-    signals = generate_signals(daily_data, params)
-
-    print(f"Signals: {len(signals)} dates, {sum(len(v) for v in signals.values())} candidates")
-
-    bt_config = {
-        "initial_capital": cfg.get("initial_capital", 1000000),
-        "max_positions": cfg.get("max_positions", 3),
-        "slippage_pct": cfg.get("slippage_pct", 0.1),
-        "commission_pct": cfg.get("commission_pct", 0.025),
-        "stamp_tax_pct": cfg.get("stamp_tax_pct", 0.05),
-        "transfer_fee_pct": cfg.get("transfer_fee_pct", 0.001),
-    }
-
-    print("Running backtest...")
-    result = run_backtest(signals, daily_data, bt_config)
-    return result
-
-
-def gate_be_001_determinism():
+class GateSession:
+    """Market data, signals and one backtest result shared by every gate.
+
+    Data is loaded and signals generated once. The shared backtest runs
+    lazily on first access to result, with a cash observer attached so
+    GATE-BE-002 needs no run of its own.
+    """
+
+    def __init__(self, cfg: dict | None = None, cache: SignalCache | None = None):
+        cfg = cfg if cfg is not None else load_config()
+        start_date = cfg.get("start_date", "20240101")
+        end_date = cfg.get("end_date", "20251231")
+        data_dir = cfg.get("data_dir", "")
+
+        print("Loading market data...")
+        self.daily_data = load_market_data(data_dir, start_date, end_date)
+
+        print("Generating signals...")
+        params = get_default_config()
+        for key in params:
+            if key in cfg:
+                params[key] = cfg[key]
+        if cache is not None:
+            self.signals = cache.get_or_generate(self.daily_data, "st_b2", params, generate_signals)
+        else:
+            self.signals = generate_signals(self.daily_data, params)
+
+        print(f"Signals: {len(self.signals)} dates, {sum(len(v) for v in self.signals.values())} candidates")
+
+        self.bt_config = {
+            "initial_capital": cfg.get("initial_capital", 1000000),
+            "max_positions": cfg.get("max_positions", 3),
+            "slippage_pct": cfg.get("slippage_pct", 0.1),
+            "commission_pct": cfg.get("commission_pct", 0.025),
+            "stamp_tax_pct": cfg.get("stamp_tax_pct", 0.05),
+            "transfer_fee_pct": cfg.get("transfer_fee_pct", 0.001),
+        }
+        self.min_cash_after_buy: float | None = None
+        self.negative_cash: list[str] = []
+        self._result = None
+        self._lock = threading.Lock()
+
+    def run_backtest(self, **observers):
+        """Run a fresh backtest on the shared data and signals.
+
+        observers are passed through to run_backtest (on_sell / on_buy / on_day_end).
+        """
+        print("Running backtest...")
+        return run_backtest(self.signals, self.daily_data, self.bt_config, **observers)
+
+    def _record_cash(self, date, position, cash):
+        if self.min_cash_after_buy is None or cash < self.min_cash_after_buy:
+            self.min_cash_after_buy = cash
+        if cash < -0.01:
+            self.negative_cash.append(f"{date} after buying {position.code}: {cash:.2f}")
+
+    @property
+    def result(self):
+        """The shared backtest result, computed once."""
+        with self._lock:
+            if self._result is None:
+                self._result = self.run_backtest(on_buy=self._record_cash)
+            return self._result
+
+
+_session: GateSession | None = None
+
+
+def get_session() -> GateSession:
+    """Return the module-wide GateSession, creating it on first use."""
+    global _session
+    if _session is None:
+        _session = GateSession()
+    return _session
+
+
+def gate_be_001_determinism(session: GateSession | None = None):
     """GATE-BE-001: Same inputs -> same outputs."""
+    session = session or get_session()
+    result1 = session.result
+    result2 = session.run_backtest()
     print("\n=== GATE-BE-001: Determinism ===")
-    result1 = run_full_backtest()
-    result2 = run_full_backtest()
 
     assert result1.final_equity == result2.final_equity, \
         f"Final equity mismatch: {result1.final_equity} vs {result2.final_equity}"
@@ -78,123 +134,24 @@ def gate_be_001_determinism():
     print(f"PASS — {result1.trade_count} trades, final equity {result1.final_equity}")
 
 
-def gate_be_002_equity_conservation():
+def gate_be_002_equity_conservation(session: GateSession | None = None):
     """GATE-BE-002: Cash never goes negative."""
+    session = session or get_session()
+    session.result
     print("\n=== GATE-BE-002: Equity Conservation ===")
-    cfg = load_config()
-    start_date = cfg.get("start_date", "20240101")
-    end_date = cfg.get("end_date", "20251231")
-    data_dir = cfg.get("data_dir", "")
-
-    daily_data = load_market_data(data_dir, start_date, end_date)
-    params = get_default_config()
-    for key in params:
-        if key in cfg:
-            params[key] = cfg[key]
-    signals = generate_signals(daily_data, params)
-
-    bt_config = {
-        "initial_capital": cfg.get("initial_capital", 1000000),
-        "max_positions": cfg.get("max_positions", 3),
-        "slippage_pct": cfg.get("slippage_pct", 0.1),
-        "commission_pct": cfg.get("commission_pct", 0.025),
-        "stamp_tax_pct": cfg.get("stamp_tax_pct", 0.05),
-        "transfer_fee_pct": cfg.get("transfer_fee_pct", 0.001),
-    }
-
-    # We need to re-implement the date loop with explicit cash checking
-    initial_capital = float(bt_config.get("initial_capital", 1000000))
-    slippage = bt_config.get("slippage_pct", 0.1) / 100.0
-    commission = bt_config.get("commission_pct", 0.025) / 100.0
-    stamp_tax = bt_config.get("stamp_tax_pct", 0.05) / 100.0
-    transfer_fee = bt_config.get("transfer_fee_pct", 0.001) / 100.0
-    max_positions = bt_config.get("max_positions", 3)
-
-    from tools.backtest_engine.models import Position
-
-    # Build price tables
-    price_table = {}
-    open_table = {}
-    all_dates = set()
-    for code, df in daily_data.items():
-        price_table[code] = dict(zip(df["trade_date"].values, df["close"].values.astype(float)))
-        open_table[code] = dict(zip(df["trade_date"].values, df["open"].values.astype(float)))
-        all_dates.update(df["trade_date"].values)
-
-    trading_dates = sorted(all_dates)
-    next_date_map = {}
-    for i in range(len(trading_dates) - 1):
-        next_date_map[trading_dates[i]] = trading_dates[i + 1]
-
-    pending_signals = {}
-    for signal_date in sorted(signals.keys()):
-        exec_date = next_date_map.get(signal_date)
-        if exec_date is None:
-            continue
-        if exec_date not in pending_signals:
-            pending_signals[exec_date] = []
-        pending_signals[exec_date].extend(signals[signal_date])
-
-    cash = initial_capital
-    positions = []
-
-    for date in trading_dates:
-        # Sell
-        still_holding = []
-        for pos in positions:
-            if pos.buy_date == date:
-                still_holding.append(pos)
-                continue
-            raw_sell_price = open_table.get(pos.code, {}).get(date)
-            if raw_sell_price is None:
-                still_holding.append(pos)
-                continue
-            actual_sell_price = raw_sell_price * (1.0 - slippage)
-            proceeds = pos.shares * actual_sell_price
-            cash += proceeds
-            cash -= proceeds * (commission + stamp_tax + transfer_fee)
-        positions = still_holding
-
-        # Buy
-        if date in pending_signals:
-            for cand in pending_signals[date]:
-                code = cand.get("ts_code") or cand.get("code")
-                raw_open_price = open_table.get(code, {}).get(date)
-                if raw_open_price is None:
-                    continue
-                available_slots = max_positions - len(positions)
-                if available_slots <= 0:
-                    break
-
-                actual_buy_price = raw_open_price * (1.0 + slippage)
-                buy_fee_rate = commission + transfer_fee
-                alloc_per_slot = cash / available_slots
-                shares = int(alloc_per_slot / actual_buy_price / 100) * 100
-                if shares <= 0:
-                    shares = int(cash / actual_buy_price / 100) * 100
-                    if shares <= 0:
-                        continue
-
-                cost = shares * actual_buy_price
-                total_outlay = cost * (1.0 + buy_fee_rate)
-                if total_outlay > cash:
-                    shares = int(cash / (actual_buy_price * (1.0 + buy_fee_rate)) / 100) * 100
-                    if shares <= 0:
-                        continue
-                    cost = shares * actual_buy_price
-                    total_outlay = cost * (1.0 + buy_fee_rate)
-
-                cash -= total_outlay
-                assert cash >= -0.01, f"Negative cash on {date}: {cash:.2f}"
-                positions.append(Position(code=code, buy_date=date, buy_price=actual_buy_price, shares=shares, cost=cost))
-
-    print(f"PASS — Cash never went negative (min observed: {initial_capital} -> final with positions)")
-
-
-def gate_be_003_lot_size():
+
+    assert not session.negative_cash, "Negative cash on " + "; ".join(session.negative_cash[:5])
+
+    if session.min_cash_after_buy is not None:
+        print(f"PASS — Cash never went negative (min after buy: {session.min_cash_after_buy:.2f})")
+    else:
+        print("PASS — Cash never went negative (no buys)")
+
+
+def gate_be_003_lot_size(session: GateSession | None = None):
     """GATE-BE-003: All positions have share counts in multiples of 100."""
+    result = (session or get_session()).result
     print("\n=== GATE-BE-003: Lot-Size Compliance ===")
-    result = run_full_backtest()
 
     for trade in result.trades:
         assert trade.shares % 100 == 0, \
@@ -203,10 +160,10 @@ def gate_be_003_lot_size():
     print(f"PASS — All {result.trade_count} trades have lot-size in multiples of 100")
 
 
-def gate_be_004_t_plus_1():
+def gate_be_004_t_plus_1(session: GateSession | None = None):
     """GATE-BE-004: No same-day sell after buy (T+1 compliance)."""
+    result = (session or get_session()).result
     print("\n=== GATE-BE-004: T+1 Compliance ===")
-    result = run_full_backtest()
 
     for trade in result.trades:
         assert trade.buy_date != trade.sell_date, \
@@ -215,9 +172,40 @@ def gate_be_004_t_plus_1():
     print(f"PASS — All {result.trade_count} trades satisfy T+1 constraint")
 
 
+GATES = [
+    gate_be_001_determinism,
+    gate_be_002_equity_conservation,
+    gate_be_003_lot_size,
+    gate_be_004_t_plus_1,
+]
+
+
+def run_gates(session: GateSession, workers: int = 1):
+    """Run every gate against one session; workers > 1 runs them on a thread pool.
+
+    The shared backtest is computed before dispatch, so only GATE-BE-001's
+    second run overlaps with the structural checks.
+    """
+    session.result
+    if workers <= 1:
+        for gate in GATES:
+            gate(session)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(gate, session) for gate in GATES]
+        for future in futures:
+            future.result()
+
+
 if __name__ == "__main__":
-    gate_be_001_determinism()
-    gate_be_002_equity_conservation()
-    gate_be_003_lot_size()
-    gate_be_004_t_plus_1()
-    print("\n=== ALL GATES PASSED ===")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Backtest engine quality gates")
+    parser.add_argument("--data-dir", help="Override data_dir from config.json")
+    parser.add_argument("--workers", type=int, default=1, help="Run gates on N threads")
+    parser.add_argument("--signal-cache", action="store_true", help="Reuse cached signals for this data/params")
+    args = parser.parse_args()
+
+    cfg = load_config()
+    if args.data_dir:
+        cfg["data_dir"] = args.data_dir
+    run_gates(GateSession(cfg, SignalCache() if args.signal_cache else None), args.workers)
+    print("\n=== ALL GATES PASSED ===")
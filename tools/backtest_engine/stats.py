@@ -21,15 +21,22 @@ def calc_max_drawdown(equity_curve: list) -> float:
     """
     if not equity_curve:
         return 0.0
-    peak = equity_curve[0].equity
-    max_dd = 0.0
+    _, max_dd = update_drawdown(equity_curve)
+    return round(max_dd, 2)
+
+
+def update_drawdown(equity_curve: list, peak: float | None = None, max_dd: float = 0.0) -> tuple[float | None, float]:
+    """Extend a running (peak, unrounded max drawdown %) over equity_curve.
+
+    peak=None starts from the first snapshot, as calc_max_drawdown does.
+    """
     for snap in equity_curve:
-        if snap.equity > peak:
+        if peak is None or snap.equity > peak:
             peak = snap.equity
         dd = (peak - snap.equity) / peak * 100.0
         if dd > max_dd:
             max_dd = dd
-    return round(max_dd, 2)
+    return peak, max_dd
 
 
 def calc_win_rate(trades: list) -> float:
@@ -53,4 +60,20 @@ def calc_median_return(trades: list) -> float:
     if not trades:
         return 0.0
     returns = [t.net_return_pct for t in trades]
-    return round(float(np.median(returns)), 2)
\ No newline at end of file
+    return round(float(np.median(returns)), 2)
+
+
+def calc_return_stats(returns: list[float]) -> tuple[float, float, float]:
+    """(win_rate, avg_return_pct, median_return_pct) from net returns.
+
+    Same rounding as calc_win_rate / calc_avg_return / calc_median_return,
+    for callers that keep returns without the Trade objects.
+    """
+    if not returns:
+        return 0.0, 0.0, 0.0
+    wins = sum(1 for r in returns if r > 0)
+    return (
+        round(wins / len(returns) * 100.0, 2),
+        round(float(np.mean(returns)), 2),
+        round(float(np.median(returns)), 2),
+    )
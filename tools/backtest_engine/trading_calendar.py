@@ -0,0 +1,68 @@
+"""Trading calendar with O(1) prev/next/offset lookups by date.
+
+Offline counterpart of the session calendar the QMT scripts load in init():
+one sorted trading-day list plus a date -> index map, so T-1 / T+1 resolution
+never rescans dates and respects holidays present in the source data.
+"""
+
+from bisect import bisect_left
+from typing import Iterable
+
+import pandas as pd
+
+
+class TradingCalendar:
+    """Sorted list of YYYYMMDD trading dates with index lookups.
+
+    A non-trading date counts as lying between its neighbouring trading days,
+    so prev() / next() still resolve. Lookups outside the calendar return None.
+    """
+
+    def __init__(self, dates: Iterable[str]):
+        self._dates: list[str] = sorted({str(d) for d in dates})
+        self._index: dict[str, int] = {d: i for i, d in enumerate(self._dates)}
+
+    @classmethod
+    def from_market_data(cls, market_data: dict[str, pd.DataFrame]) -> "TradingCalendar":
+        """Build from {code: DataFrame(trade_date, ...)} — union of all trade dates."""
+        all_dates: set[str] = set()
+        for df in market_data.values():
+            all_dates.update(df["trade_date"].values)
+        return cls(all_dates)
+
+    @property
+    def dates(self) -> list[str]:
+        return self._dates
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __iter__(self):
+        return iter(self._dates)
+
+    def __contains__(self, date: str) -> bool:
+        return date in self._index
+
+    def offset(self, date: str, n: int) -> str | None:
+        """Return the trading date n trading days from date (negative = earlier)."""
+        idx = self._index.get(date)
+        if idx is not None:
+            idx += n
+        elif n == 0:
+            return None
+        else:
+            pos = bisect_left(self._dates, date)
+            idx = pos + n if n < 0 else pos + n - 1
+        if idx < 0 or idx >= len(self._dates):
+            return None
+        return self._dates[idx]
+
+    def prev(self, date: str, n: int = 1) -> str | None:
+        return self.offset(date, -n)
+
+    def next(self, date: str, n: int = 1) -> str | None:
+        return self.offset(date, n)
+
+    def next_date_map(self) -> dict[str, str]:
+        """Return {date: next trading date} for T+1 execution scheduling."""
+        return dict(zip(self._dates[:-1], self._dates[1:]))
@@ -0,0 +1 @@
+"""Micro-benchmark scripts (run directly, not collected by pytest)."""
@@ -0,0 +1,225 @@
+"""Scalable benchmark suite for the offline backtest stack.
+
+Generates (or reuses) a seeded synthetic universe in the local_csv schema and
+times each stage on it: load_market_data, compute_kdj, generate_signals,
+run_backtest and a small run_sweep grid. Results, including the signal /
+trade counts as a correctness fingerprint, are saved as JSON so two commits
+can be compared.
+
+Usage:
+  python tools/benchmarks/bench_backtest.py                       # 500 stocks x 1 year
+  python tools/benchmarks/bench_backtest.py --scale medium        # 3000 x 5
+  python tools/benchmarks/bench_backtest.py --stocks 10000 --years 20 --repeat 1
+  python tools/benchmarks/bench_backtest.py --compare output/benchmarks/<earlier>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from strategies.st_b2.grid_sweep import sweep  # noqa: E402
+from strategies.st_b2.strategy import compute_kdj, generate_signals, get_default_config  # noqa: E402
+from tools.backtest_engine import run_backtest  # noqa: E402
+from tools.data_adapter.local_csv import load_market_data  # noqa: E402
+from tools.data_adapter.synthetic import synthetic_codes, write_synthetic_universe  # noqa: E402
+
+SCALES = {
+    "small": (500, 1),
+    "medium": (3000, 5),
+    "large": (10000, 20),
+}
+
+# 8 combinations: enough to time the sweep loop without a full grid.
+BENCH_PARAM_GRID = {
+    "j_pre_max": [15.0, 20.0],
+    "j_now_max": [65.0, 80.0],
+    "daily_return_min_pct": [4.0],
+    "vol_ratio_min": [1.1],
+    "max_positions": [3, 5],
+}
+
+BT_CONFIG = {
+    "initial_capital": 1000000,
+    "max_positions": 3,
+    "slippage_pct": 0.1,
+    "commission_pct": 0.025,
+    "stamp_tax_pct": 0.05,
+    "transfer_fee_pct": 0.001,
+}
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root, capture_output=True, text=True, timeout=10,
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def timed(label: str, func, repeat: int, timings: dict):
+    """Run func repeat times, record the best wall time, return the last result."""
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    timings[label] = round(best, 4)
+    print(f"  {label:<24s} {best:10.3f} s", flush=True)
+    return result
+
+
+def quiet(func):
+    """Wrap func so its stdout (load progress lines) is discarded."""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def compute_kdj_all(market_data: dict[str, pd.DataFrame], n: int, init: float) -> int:
+    count = 0
+    for df in market_data.values():
+        compute_kdj(
+            df["close"].values.astype(float),
+            df["high"].values.astype(float),
+            df["low"].values.astype(float),
+            n, init, init,
+        )
+        count += 1
+    return count
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompare vs {baseline_path} (rev {baseline['meta'].get('git_rev', '?')})")
+    for label, new in current["timings_s"].items():
+        old = baseline.get("timings_s", {}).get(label)
+        if old is None:
+            continue
+        ratio = old / new if new > 0 else float("inf")
+        print(f"  {label:<24s} {old:10.3f} s -> {new:10.3f} s   x{ratio:.2f}")
+    old_out = baseline.get("outputs", {})
+    diffs = [
+        f"{key}: {old_out.get(key)} -> {value}"
+        for key, value in current["outputs"].items()
+        if value is not None and old_out.get(key) is not None and old_out.get(key) != value
+    ]
+    if diffs:
+        print("  OUTPUTS DIFFER: " + "; ".join(diffs))
+    else:
+        print("  outputs identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest stack benchmark on synthetic data")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Preset stocks x years")
+    parser.add_argument("--stocks", type=int, help="Override number of stocks")
+    parser.add_argument("--years", type=float, help="Override history length in years")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument("--data-root", default=str(Path(tempfile.gettempdir()) / "zj_bench_data"),
+                        help="Where synthetic universes are cached")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (best is reported)")
+    parser.add_argument("--skip-sweep", action="store_true", help="Do not time run_sweep")
+    parser.add_argument("--output", help="Result JSON path (default output/benchmarks/...)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    n_stocks, years = SCALES[args.scale]
+    if args.stocks is not None:
+        n_stocks = args.stocks
+    if args.years is not None:
+        years = args.years
+
+    data_dir = Path(args.data_root) / f"synth_{n_stocks}x{years:g}_s{args.seed}"
+    t0 = time.perf_counter()
+    manifest = write_synthetic_universe(str(data_dir), n_stocks, years, args.seed)
+    gen_s = time.perf_counter() - t0
+    start_date, end_date = manifest["start_date"], manifest["end_date"]
+    codes = synthetic_codes(n_stocks)
+    print(f"universe: {n_stocks} stocks x {manifest['trading_days']} days "
+          f"({start_date} ~ {end_date}) at {data_dir} [{gen_s:.1f} s to prepare]")
+
+    params = get_default_config()
+    timings: dict[str, float] = {}
+
+    daily_data = timed(
+        "load_market_data",
+        quiet(lambda: load_market_data(str(data_dir), start_date, end_date, stock_codes=codes)),
+        args.repeat, timings,
+    )
+    timed(
+        "compute_kdj",
+        lambda: compute_kdj_all(daily_data, params["kdj_n"], params["kdj_init"]),
+        args.repeat, timings,
+    )
+    signals = timed("generate_signals", lambda: generate_signals(daily_data, params), args.repeat, timings)
+    result = timed("run_backtest", lambda: run_backtest(signals, daily_data, BT_CONFIG), args.repeat, timings)
+    sweep_results = None
+    if not args.skip_sweep:
+        sweep_results = timed(
+            "run_sweep",
+            lambda: sweep(daily_data, BENCH_PARAM_GRID, BT_CONFIG, progress=False),
+            1, timings,
+        )
+
+    report = {
+        "meta": {
+            "stocks": n_stocks,
+            "years": years,
+            "seed": args.seed,
+            "trading_days": manifest["trading_days"],
+            "repeat": args.repeat,
+            "git_rev": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "timings_s": timings,
+        "outputs": {
+            "loaded_stocks": len(daily_data),
+            "signal_dates": len(signals),
+            "signal_count": sum(len(v) for v in signals.values()),
+            "trade_count": result.trade_count,
+            "final_equity": float(result.final_equity),
+            "sweep_rows": None if args.skip_sweep else len(sweep_results),
+        },
+    }
+
+    if args.output:
+        out_path = Path(args.output)
+    else:
+        out_path = (project_root / "output" / "benchmarks"
+                    / f"backtest_{n_stocks}x{years:g}_{report['meta']['git_rev']}.json")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\noutputs: {report['outputs']}")
+    print(f"saved to {out_path}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
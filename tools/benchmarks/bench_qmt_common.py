@@ -0,0 +1,292 @@
+"""Micro-benchmarks for strategies/qmt_common.py.
+
+Times each shared QMT helper on synthetic inputs next to the per-script
+implementation it replaced (char-by-char digit scans, iterrows conversion),
+so fetch-path regressions or speed-ups show up for all strategies at once.
+The flaky-client case compares fixed chunks + per-code fallback against the
+adaptive ChunkSizer path.
+
+Usage:
+  python tools/benchmarks/bench_qmt_common.py
+  python tools/benchmarks/bench_qmt_common.py --codes 5000 --bars 180 --repeat 5
+"""
+
+import argparse
+import contextlib
+import datetime
+import os
+import sys
+import time
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root / "strategies"))
+
+import qmt_common  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Legacy reference implementations (as previously copied into each script)
+# ---------------------------------------------------------------------------
+
+def legacy_normalize_stock_code(stock_code):
+    if not stock_code:
+        return ""
+    s = str(stock_code).strip().upper()
+    if not s:
+        return ""
+    if "." in s:
+        left, right = s.split(".", 1)
+        if len(left) == 6 and right in ("SH", "SZ"):
+            return left + "." + right
+        if len(left) == 6 and right in ("XSHG", "SSE"):
+            return left + ".SH"
+        if len(left) == 6 and right in ("XSHE", "SZSE"):
+            return left + ".SZ"
+        if len(right) == 6 and left in ("SH", "SSE", "XSHG"):
+            return right + ".SH"
+        if len(right) == 6 and left in ("SZ", "SZSE", "XSHE"):
+            return right + ".SZ"
+        return s
+    if len(s) == 6 and s.isdigit():
+        if s.startswith(("600", "601", "603", "605", "688", "689")):
+            return s + ".SH"
+        return s + ".SZ"
+    return s
+
+
+def legacy_normalize_trade_date(value):
+    if value is None:
+        return ""
+    s = str(value).strip()
+    digits = "".join(ch for ch in s if ch.isdigit())
+    if len(digits) == 13:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits) / 1000.0).strftime("%Y%m%d")
+        except Exception:
+            return ""
+    if len(digits) == 10:
+        try:
+            return datetime.datetime.fromtimestamp(int(digits)).strftime("%Y%m%d")
+        except Exception:
+            return ""
+    if len(digits) >= 8:
+        return digits[:8]
+    return ""
+
+
+def legacy_daily_df_to_bars(df):
+    bars = []
+    for idx, row in df.iterrows():
+        digits = "".join(ch for ch in str(idx) if ch.isdigit())
+        date_str = digits[:8] if len(digits) >= 8 else ""
+        try:
+            bars.append(
+                {
+                    "date": date_str,
+                    "open": float(row["open"]),
+                    "high": float(row["high"]),
+                    "low": float(row["low"]),
+                    "close": float(row["close"]),
+                    "volume": float(row["volume"]),
+                }
+            )
+        except Exception:
+            continue
+    return bars
+
+
+def legacy_log(msg):
+    print("[{0}] {1}".format("bench", msg))
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+def make_codes(n: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    raw = []
+    for i in range(n):
+        num = "{0:06d}".format(600000 + i if i % 2 else i)
+        style = rng.integers(0, 4)
+        if style == 0:
+            raw.append(num + (".SH" if num.startswith("6") else ".SZ"))
+        elif style == 1:
+            raw.append(num)
+        elif style == 2:
+            raw.append(num + (".XSHG" if num.startswith("6") else ".XSHE"))
+        else:
+            raw.append(" " + num.lower() + (".sh" if num.startswith("6") else ".sz"))
+    return raw
+
+
+def make_daily_frames(n_codes: int, n_bars: int) -> list[pd.DataFrame]:
+    rng = np.random.default_rng(1)
+    index = [d.strftime("%Y%m%d") for d in pd.bdate_range("2024-01-02", periods=n_bars)]
+    frames = []
+    for _ in range(n_codes):
+        close = 10.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+        frames.append(
+            pd.DataFrame(
+                {
+                    "open": close * 0.99,
+                    "high": close * 1.01,
+                    "low": close * 0.98,
+                    "close": close,
+                    "volume": rng.integers(1e5, 1e7, n_bars).astype(float),
+                },
+                index=index,
+            )
+        )
+    return frames
+
+
+class FakeContext:
+    """Minimal get_market_data_ex serving prebuilt daily frames."""
+
+    def __init__(self, frames_by_code: dict[str, pd.DataFrame]):
+        self.frames_by_code = frames_by_code
+
+    def get_market_data_ex(self, fields, codes, period="1d", count=-1, **kwargs):
+        return {c: self.frames_by_code[c] for c in codes if c in self.frames_by_code}
+
+
+class FlakyContext(FakeContext):
+    """Slow client build: every call costs a fixed latency and large requests fail."""
+
+    def __init__(self, frames_by_code, max_codes=100, latency=0.01):
+        super().__init__(frames_by_code)
+        self.max_codes = max_codes
+        self.latency = latency
+
+    def get_market_data_ex(self, fields, codes, period="1d", count=-1, **kwargs):
+        time.sleep(self.latency)
+        if len(codes) > self.max_codes:
+            raise RuntimeError("request timed out")
+        return super().get_market_data_ex(fields, codes, period, count, **kwargs)
+
+
+def legacy_fetch_with_single_fallback(ctx, codes, end_date, count):
+    """Fixed 200-code chunks, then one call per missing code (old build_candidates)."""
+    result = {}
+    for batch_codes in qmt_common.chunked_unique_codes(codes, 200):
+        for end_ts in (end_date, end_date + "150000", end_date + "235959", ""):
+            try:
+                data = ctx.get_market_data_ex(qmt_common.DAILY_FIELDS, batch_codes, end_time=end_ts, count=count)
+            except Exception:
+                continue
+            if data:
+                for code, df in data.items():
+                    result[code] = qmt_common.daily_df_to_bars(df)
+                break
+    for code in codes:
+        if code not in result:
+            result[code] = qmt_common.fetch_daily_bars(ctx, code, end_date, count)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def bench(label: str, func, repeat: int) -> float:
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("  {0:<44s} {1:9.2f} ms".format(label, best * 1000.0))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="qmt_common micro-benchmarks")
+    parser.add_argument("--codes", type=int, default=3000, help="Universe size")
+    parser.add_argument("--bars", type=int, default=180, help="Daily bars per code")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    codes = make_codes(args.codes)
+    frames = make_daily_frames(min(args.codes, 500), args.bars)
+    normalized = [qmt_common.normalize_stock_code(c) for c in codes]
+    frames_by_code = dict(zip(normalized, frames))
+    ctx = FakeContext(frames_by_code)
+    timetags = [f"2024{m:02d}{d:02d}093100" for m in range(1, 13) for d in range(1, 29)] * 10
+    dates = [pd.Timestamp("2024-01-02") + pd.Timedelta(days=i % 365) for i in range(args.codes)]
+
+    print("codes={0} bars={1} frames={2}".format(args.codes, args.bars, len(frames)))
+    results = []
+
+    print("normalize_stock_code")
+    old = bench("legacy", lambda: [legacy_normalize_stock_code(c) for c in codes], args.repeat)
+    new = bench("qmt_common", lambda: [qmt_common.normalize_stock_code(c) for c in codes], args.repeat)
+    results.append(("normalize_stock_code", old, new))
+
+    print("normalize_trade_date")
+    old = bench("legacy", lambda: [legacy_normalize_trade_date(d) for d in dates], args.repeat)
+    new = bench("qmt_common", lambda: [qmt_common.normalize_trade_date(d) for d in dates], args.repeat)
+    results.append(("normalize_trade_date", old, new))
+
+    print("parse_timetag")
+    new = bench("qmt_common", lambda: [qmt_common.parse_timetag(t) for t in timetags], args.repeat)
+
+    print("daily_df_to_bars")
+    old = bench("legacy (iterrows)", lambda: [legacy_daily_df_to_bars(df) for df in frames], args.repeat)
+    new = bench("qmt_common (columnar)", lambda: [qmt_common.daily_df_to_bars(df) for df in frames], args.repeat)
+    results.append(("daily_df_to_bars", old, new))
+
+    print("fetch_daily_bars_batch")
+    bench(
+        "qmt_common (chunk=200)",
+        lambda: qmt_common.fetch_daily_bars_batch(ctx, list(frames_by_code), "20991231", args.bars),
+        args.repeat,
+    )
+
+    print("fetch_daily_bars_batch, flaky client (>100 codes per call fails)")
+    flaky = FlakyContext(frames_by_code)
+    fetch_codes = list(frames_by_code)
+    old = bench(
+        "fixed chunks + single-code fallback",
+        lambda: legacy_fetch_with_single_fallback(flaky, fetch_codes, "20991231", args.bars),
+        args.repeat,
+    )
+    sizer = qmt_common.ChunkSizer(200)
+    new = bench(
+        "adaptive chunks + batch retry",
+        lambda: qmt_common.fetch_daily_bars_batch(flaky, fetch_codes, "20991231", args.bars, sizer=sizer),
+        args.repeat,
+    )
+    print("  {0:<44s} {1}".format("sizer", sizer.describe()))
+    results.append(("flaky batch fetch", old, new))
+
+    print("logging ({0} per-code debug lines + 1 info line per bar, stdout -> devnull)".format(args.codes))
+    debug_args = [(c, "20240603", 1234.0, 5.0, 2.5) for c in codes]
+
+    def legacy_logging():
+        for a in debug_args:
+            legacy_log("vol_ratio_debug code={0} date={1} today={2:.0f}/{3:.1f}m ratio={4:.2f}".format(*a))
+            legacy_log("bar done")
+
+    log = qmt_common.BufferedLogger("bench", "INFO")
+
+    def buffered_logging():
+        for a in debug_args:
+            log.debug("vol_ratio_debug code={0} date={1} today={2:.0f}/{3:.1f}m ratio={4:.2f}", *a)
+            log.info("bar done")
+            log.flush()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        old = min(timeit.repeat(legacy_logging, number=1, repeat=args.repeat))
+        new = min(timeit.repeat(buffered_logging, number=1, repeat=args.repeat))
+    print("  {0:<44s} {1:9.2f} ms".format("print per message", old * 1000.0))
+    print("  {0:<44s} {1:9.2f} ms".format("BufferedLogger (INFO)", new * 1000.0))
+    results.append(("logging", old, new))
+
+    print("\nspeed-up vs legacy")
+    for name, old, new in results:
+        print("  {0:<28s} x{1:.1f}".format(name, old / new if new > 0 else float("inf")))
+
+
+if __name__ == "__main__":
+    main()
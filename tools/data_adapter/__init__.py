@@ -4,11 +4,25 @@ Provides unified data loading with canonical DataFrame schema:
   trade_date, open, high, low, close, vol
 
 Currently supports LocalCSVProvider. TushareProvider can be added later.
+synthetic.py writes seeded universes in the same CSV layout for benchmarks.
+local_minute.py loads minute bars (time, open, high, low, close, volume)
+for the intraday backtest.
 """
 
 from .local_csv import load_market_data, get_stock_list
-
-__all__ = ["load_market_data", "get_stock_list", "create_provider"]
+from .local_minute import load_minute_bars, minute_loader
+from .synthetic import generate_market_data, synthetic_minute_loader, write_synthetic_universe
+
+__all__ = [
+    "load_market_data",
+    "get_stock_list",
+    "create_provider",
+    "generate_market_data",
+    "write_synthetic_universe",
+    "load_minute_bars",
+    "minute_loader",
+    "synthetic_minute_loader",
+]
 
 
 def create_provider(config: dict):
@@ -100,7 +100,8 @@ def load_market_data(
             df = df.rename(columns={"volume": "vol"})
 
         # Convert date format YYYY-MM-DD → YYYYMMDD if needed
-        if df["trade_date"].dtype == object:
+        # (pandas >= 3 reads text columns as "str" rather than object dtype)
+        if df["trade_date"].dtype == object or pd.api.types.is_string_dtype(df["trade_date"]):
             df["trade_date"] = df["trade_date"].str.replace("-", "")
 
         # Ensure canonical schema: trade_date, open, high, low, close, vol
@@ -0,0 +1,86 @@
+"""LocalCSV minute-bar provider for the intraday backtest.
+
+Layout: <data_dir>/<YYYYMMDD>/<code>.csv, one file per stock and session,
+with columns time, open, high, low, close, volume. time may be HH:MM,
+HHMM, HH:MM:SS, a full timestamp or a QMT millisecond timetag; it is
+normalized to "HH:MM".
+
+Canonical minute schema: time, open, high, low, close, volume
+"""
+
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+MINUTE_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+
+
+# digit count -> where HHMM starts; 3 and 5 digits drop the hour's leading zero
+_TIME_DIGIT_LAYOUTS = {
+    3: 0,    # 930
+    4: 0,    # 0930
+    5: 0,    # 93000
+    6: 0,    # 093000
+    12: 8,   # 202501020930
+    14: 8,   # 20250102093000 / 2025-01-02 09:30:00
+    17: 8,   # 20250102093000000 (QMT timetag with milliseconds)
+}
+
+
+def normalize_minute_times(values) -> pd.Series:
+    """Map time / timestamp values to "HH:MM".
+
+    Separators are dropped and the digits are read by count (see
+    _TIME_DIGIT_LAYOUTS); any other count raises ValueError rather than
+    guessing where the hour is.
+    """
+    digits = pd.Series(values).astype(str).str.replace(r"\D", "", regex=True)
+    lengths = digits.str.len()
+    unknown = ~lengths.isin(list(_TIME_DIGIT_LAYOUTS))
+    if unknown.any():
+        raise ValueError(f"Unrecognised minute time format: {pd.Series(values)[unknown.values].iloc[0]!r}")
+    digits = digits.where(~lengths.isin([3, 5]), "0" + digits)
+    hhmm = digits.str[:4].where(lengths < 12, digits.str[8:12])
+    return hhmm.str[:2] + ":" + hhmm.str[2:4]
+
+
+def load_minute_bars(data_dir: str, trade_date: str, codes: list[str]) -> dict[str, pd.DataFrame]:
+    """Load one session's minute bars for codes.
+
+    Args:
+        data_dir: Root directory holding <YYYYMMDD>/<code>.csv files.
+        trade_date: Session date in YYYYMMDD format.
+        codes: Stock codes to load (e.g. ['000001', '600000']).
+
+    Returns:
+        {stock_code: DataFrame} with columns time, open, high, low, close,
+        volume, sorted by time. Missing or malformed files are left out;
+        unrecognised time values raise ValueError.
+    """
+    day_path = Path(data_dir) / trade_date
+    result = {}
+    for code in codes:
+        csv_file = day_path / f"{code}.csv"
+        if not csv_file.exists():
+            continue
+        try:
+            df = pd.read_csv(csv_file, dtype={"time": str})
+        except Exception:
+            continue
+        if "vol" in df.columns and "volume" not in df.columns:
+            df = df.rename(columns={"vol": "volume"})
+        if df.empty or not set(MINUTE_COLUMNS).issubset(df.columns):
+            continue
+        df = df[list(MINUTE_COLUMNS)].copy()
+        df["time"] = normalize_minute_times(df["time"]).values
+        result[code] = df.sort_values("time").reset_index(drop=True)
+    return result
+
+
+def minute_loader(data_dir: str) -> Callable[[str, list[str]], dict[str, pd.DataFrame]]:
+    """Return minute_loader(trade_date, codes) bound to data_dir, for run_intraday_backtest."""
+    if not Path(data_dir).exists():
+        raise FileNotFoundError(f"Minute data directory not found: {data_dir}")
+    return partial(load_minute_bars, data_dir)
@@ -0,0 +1,253 @@
+"""Seeded synthetic OHLCV universes in the local_csv schema.
+
+Writes one <code>.csv per stock with columns date, open, high, low, close,
+volume (date as YYYY-MM-DD), i.e. the tushare export layout that
+local_csv.load_market_data() reads. Lets benchmarks and gates run at a
+chosen scale without the private data directory.
+
+Each stock draws from its own generator seeded by (seed, stock index), so a
+universe is reproducible and a smaller universe is a prefix of a larger one
+with the same seed and dates.
+
+synthetic_minute_loader() derives 1-minute sessions from those daily bars on
+demand (same open/high/low/close, volume summing to the day's), seeded by
+(seed, code, date), for the intraday backtest.
+
+Usage:
+  python tools/data_adapter/synthetic.py --stocks 3000 --years 5 --out D:/bench/synth_3000x5
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 244
+DEFAULT_END_DATE = "20251231"
+MANIFEST_NAME = "synthetic_manifest.json"
+
+# Codes are filled round-robin over main-board prefixes first (7,000 codes);
+# larger universes continue with ChiNext/STAR prefixes, which get_stock_list()
+# skips, so pass those codes explicitly to load_market_data().
+_MAIN_BOARD_BLOCKS = ("600", "000", "601", "002", "603", "001", "605")
+_EXTRA_BLOCKS = ("300", "688", "301", "689")
+
+
+def _round_robin_codes(prefixes: tuple[str, ...]) -> list[str]:
+    return [f"{prefix}{num:03d}" for num in range(1000) for prefix in prefixes if f"{prefix}{num:03d}" != "000000"]
+
+
+def synthetic_codes(n_stocks: int) -> list[str]:
+    """Return n_stocks distinct codes (e.g. '600000', '000001'), main board first."""
+    codes = _round_robin_codes(_MAIN_BOARD_BLOCKS)
+    if n_stocks > len(codes):
+        codes += _round_robin_codes(_EXTRA_BLOCKS)
+    if n_stocks > len(codes):
+        raise ValueError(f"At most {len(codes)} synthetic codes supported")
+    return codes[:n_stocks]
+
+
+def synthetic_trading_dates(years: float, end_date: str = DEFAULT_END_DATE) -> list[str]:
+    """Weekday calendar of years * TRADING_DAYS_PER_YEAR days ending at end_date (YYYYMMDD)."""
+    periods = max(1, int(round(years * TRADING_DAYS_PER_YEAR)))
+    dates = pd.bdate_range(end=pd.Timestamp(end_date), periods=periods)
+    return [d.strftime("%Y%m%d") for d in dates]
+
+
+def generate_stock_frame(rng: np.random.Generator, dates: list[str]) -> pd.DataFrame:
+    """One stock in canonical schema: trade_date, open, high, low, close, vol.
+
+    Daily log returns with drift and volatility drawn per stock, plus rare
+    +4..9% breakout days on expanded volume so KDJ-reversal screens fire.
+    Moves are capped at the +/-10% daily limit.
+    """
+    n = len(dates)
+    vol_sigma = rng.uniform(0.012, 0.035)
+    drift = rng.normal(0.0002, 0.0004)
+    rets = rng.normal(drift, vol_sigma, n)
+    jump = rng.random(n) < 0.02
+    rets[jump] = rng.uniform(0.04, 0.09, int(jump.sum()))
+    rets = np.clip(rets, -0.0953, 0.0953)  # ln(1.1)
+
+    close = np.round(rng.uniform(3.0, 60.0) * np.exp(np.cumsum(rets)), 2)
+    close = np.maximum(close, 0.5)
+    prev_close = np.r_[close[0], close[:-1]]
+    open_ = np.round(prev_close * (1.0 + rng.normal(0.0, 0.006, n)), 2)
+    spread = np.abs(rng.normal(0.0, vol_sigma * 0.5, (2, n)))
+    high = np.round(np.maximum(open_, close) * (1.0 + spread[0]), 2)
+    low = np.round(np.minimum(open_, close) * (1.0 - spread[1]), 2)
+
+    base_vol = rng.uniform(2e4, 5e5)
+    vol = base_vol * rng.lognormal(0.0, 0.35, n)
+    vol[jump] *= rng.uniform(1.5, 3.5, int(jump.sum()))
+
+    return pd.DataFrame({
+        "trade_date": dates,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "vol": np.round(vol, 0),
+    })
+
+
+def generate_market_data(
+    n_stocks: int,
+    years: float,
+    seed: int = 0,
+    end_date: str = DEFAULT_END_DATE,
+) -> dict[str, pd.DataFrame]:
+    """In-memory synthetic universe: {code: DataFrame(trade_date, open, high, low, close, vol)}."""
+    dates = synthetic_trading_dates(years, end_date)
+    return {
+        code: generate_stock_frame(np.random.default_rng([seed, i]), dates)
+        for i, code in enumerate(synthetic_codes(n_stocks))
+    }
+
+
+def synthetic_minute_times() -> list[str]:
+    """Continuous-session minute bar times: 09:31-11:30 and 13:01-15:00 (240 bars)."""
+    times = []
+    for start, count in ((9 * 60 + 31, 120), (13 * 60 + 1, 120)):
+        times.extend(f"{m // 60:02d}:{m % 60:02d}" for m in range(start, start + count))
+    return times
+
+
+def generate_minute_frame(
+    rng: np.random.Generator,
+    open_: float,
+    high: float,
+    low: float,
+    close: float,
+    vol: float,
+) -> pd.DataFrame:
+    """One session of minute bars matching a daily bar: time, open, high, low, close, volume.
+
+    Prices follow a random bridge from open to close rescaled to the day's
+    low..high, so the session's extremes are the daily ones. Volume is
+    U-shaped over the session, with an opening burst on some days, and sums
+    to vol.
+    """
+    times = synthetic_minute_times()
+    n = len(times)
+    walk = np.cumsum(rng.normal(0.0, 1.0, n))
+    bridge = np.r_[0.0, walk - np.arange(1, n + 1) / n * walk[-1]]
+    trend = open_ + (close - open_) * np.arange(n + 1) / n
+    span = max(high - low, 0.01)
+    raw = trend + bridge * (0.8 * span / max(np.ptp(bridge), 1e-9))
+    if np.ptp(raw) > 0:
+        raw = low + (raw - raw.min()) / np.ptp(raw) * (high - low)
+    closes = np.clip(np.round(raw[1:], 2), low, high)
+    closes[-1] = close
+    opens = np.r_[open_, closes[:-1]]
+    highs = np.maximum(opens, closes)
+    lows = np.minimum(opens, closes)
+    highs[int(np.argmax(highs))] = high
+    lows[int(np.argmin(lows))] = low
+
+    t = np.arange(n)
+    weight = 1.0 + 4.0 * np.exp(-t / 8.0) + 1.5 * np.exp(-(n - 1 - t) / 15.0)
+    if rng.random() < 0.3:
+        weight[:5] *= rng.uniform(1.5, 4.0)
+    weight *= rng.lognormal(0.0, 0.3, n)
+    volume = np.round(vol * weight / weight.sum(), 0)
+
+    return pd.DataFrame({
+        "time": times,
+        "open": opens,
+        "high": highs,
+        "low": lows,
+        "close": closes,
+        "volume": volume,
+    })
+
+
+def synthetic_minute_loader(market_data: dict[str, pd.DataFrame], seed: int = 0):
+    """Return minute_loader(trade_date, codes) serving sessions derived from market_data.
+
+    Each (code, date) session is generated on request from its daily bar and
+    is the same on every call; codes without a bar that day are left out.
+    """
+    rows: dict[str, dict[str, int]] = {
+        code: {str(d): i for i, d in enumerate(df["trade_date"].values)} for code, df in market_data.items()
+    }
+
+    def load(trade_date: str, codes: list[str]) -> dict[str, pd.DataFrame]:
+        result = {}
+        for code in codes:
+            i = rows.get(code, {}).get(trade_date)
+            if i is None:
+                continue
+            bar = market_data[code].iloc[i]
+            rng = np.random.default_rng([seed, int(code), int(trade_date)])
+            result[code] = generate_minute_frame(
+                rng, float(bar["open"]), float(bar["high"]), float(bar["low"]), float(bar["close"]), float(bar["vol"])
+            )
+        return result
+
+    return load
+
+
+def write_synthetic_universe(
+    out_dir: str,
+    n_stocks: int,
+    years: float,
+    seed: int = 0,
+    end_date: str = DEFAULT_END_DATE,
+    force: bool = False,
+) -> dict:
+    """Write <code>.csv files to out_dir and return the manifest.
+
+    Skips generation when out_dir already holds a manifest with the same
+    parameters, unless force is set.
+    """
+    out_path = Path(out_dir)
+    manifest = {
+        "stocks": n_stocks,
+        "years": years,
+        "seed": seed,
+        "end_date": end_date,
+    }
+    manifest_path = out_path / MANIFEST_NAME
+    if not force and manifest_path.exists():
+        with open(manifest_path) as f:
+            existing = json.load(f)
+        if all(existing.get(k) == v for k, v in manifest.items()):
+            return existing
+
+    out_path.mkdir(parents=True, exist_ok=True)
+    dates = synthetic_trading_dates(years, end_date)
+    iso_dates = [f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in dates]
+    for i, code in enumerate(synthetic_codes(n_stocks)):
+        df = generate_stock_frame(np.random.default_rng([seed, i]), dates)
+        df = df.rename(columns={"trade_date": "date", "vol": "volume"})
+        df["date"] = iso_dates
+        df.to_csv(out_path / f"{code}.csv", index=False)
+
+    manifest["start_date"] = dates[0]
+    manifest["trading_days"] = len(dates)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic local_csv universe")
+    parser.add_argument("--stocks", type=int, default=500, help="Number of stocks")
+    parser.add_argument("--years", type=float, default=1, help="History length in years")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--end-date", default=DEFAULT_END_DATE, help="Last trading date (YYYYMMDD)")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the manifest matches")
+    args = parser.parse_args()
+
+    manifest = write_synthetic_universe(args.out, args.stocks, args.years, args.seed, args.end_date, args.force)
+    print(f"Synthetic universe: {manifest['stocks']} stocks, {manifest['trading_days']} days "
+          f"({manifest['start_date']} ~ {manifest['end_date']}) -> {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Signal cache for offline backtests.
+
+Persists generate_signals() output keyed by (market data fingerprint,
+strategy, params) so reruns that only change the cost model or
+max_positions skip screening.
+"""
+
+from .store import SignalCache, market_data_fingerprint
+
+__all__ = ["SignalCache", "market_data_fingerprint"]
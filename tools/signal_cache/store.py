@@ -0,0 +1,273 @@
+"""On-disk signal store keyed by market data, strategy code and params.
+
+Entries are .npz files holding the {trade_date: [candidates]} output as
+columns: trade_date and one array per candidate field, in the original
+order. Files are touched on every hit and the least recently used ones are
+evicted once the store exceeds max_bytes or max_entries.
+
+Key = hash(market_data fingerprint, strategy name, strategy source, params).
+Strategy source covers the module defining generate and the package helpers
+it imports (strategies.indicators), so kernel edits invalidate entries too.
+Unreadable entries count as misses and are deleted.
+Pass only screening params: keys that do not affect generate_signals (cost
+model, max_positions) would otherwise split identical signal sets.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import types
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "zj_signal_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+FINGERPRINT_COLUMNS = ("trade_date", "open", "high", "low", "close", "vol")
+
+_source_hashes: dict[str, str] = {}
+
+
+def market_data_fingerprint(market_data: dict[str, pd.DataFrame]) -> str:
+    """Hash codes plus trade_date/OHLCV columns of every frame.
+
+    Other columns are ignored; numeric columns are hashed as float64 so an
+    int volume column fingerprints the same as its float copy.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for code in sorted(market_data):
+        df = market_data[code]
+        h.update(code.encode())
+        h.update(len(df).to_bytes(8, "little"))
+        for col in FINGERPRINT_COLUMNS:
+            values = df[col].values
+            if col == "trade_date":
+                h.update("\0".join(str(v) for v in values).encode())
+            else:
+                h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _file_hash(path: str) -> str:
+    if path not in _source_hashes:
+        with open(path, "rb") as f:
+            _source_hashes[path] = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    return _source_hashes[path]
+
+
+def _helper_modules(module: types.ModuleType) -> list[types.ModuleType]:
+    """Modules of module's own top-level package that it imports, directly or as names."""
+    package = module.__name__.split(".")[0]
+    found = {}
+    for value in vars(module).values():
+        if isinstance(value, types.ModuleType):
+            helper = value
+        else:
+            name = getattr(value, "__module__", None)
+            helper = sys.modules.get(name) if isinstance(name, str) else None
+        if helper is not None and helper is not module and helper.__name__.split(".")[0] == package:
+            found[helper.__name__] = helper
+    return list(found.values())
+
+
+def strategy_source_hash(func: Callable) -> str:
+    """Hash of the source of func's module and the package helpers it imports.
+
+    Helpers are followed transitively within the module's top-level package
+    (e.g. strategies.st_b1.strategy -> strategies.indicators), so editing a
+    shared kernel invalidates every strategy built on it.
+    """
+    module = inspect.getmodule(func)
+    if module is None or not getattr(module, "__file__", None):
+        return getattr(func, "__qualname__", repr(func))
+    seen: dict[str, types.ModuleType] = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in seen or not getattr(current, "__file__", None):
+            continue
+        seen[current.__name__] = current
+        pending.extend(_helper_modules(current))
+    h = hashlib.blake2b(digest_size=8)
+    for name in sorted(seen):
+        h.update(name.encode())
+        h.update(_file_hash(seen[name].__file__).encode())
+    return h.hexdigest()
+
+
+def signals_to_columns(signals: dict[str, list[dict]]) -> dict[str, np.ndarray] | None:
+    """Flatten signals into column arrays; None if candidates have mixed fields."""
+    fields: list[str] | None = None
+    dates: list[str] = []
+    rows: list[dict] = []
+    for date, candidates in signals.items():
+        for cand in candidates:
+            if fields is None:
+                fields = list(cand)
+            elif len(cand) != len(fields) or any(k not in cand for k in fields):
+                return None
+            dates.append(str(date))
+            rows.append(cand)
+
+    columns = {"trade_date": np.array(dates, dtype=str)}
+    for field in fields or []:
+        if field == "trade_date":
+            return None
+        values = [row[field] for row in rows]
+        if all(isinstance(v, str) for v in values):
+            columns[field] = np.array(values, dtype=str)
+        elif all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) for v in values):
+            columns[field] = np.array(values)
+        else:
+            return None
+    # Dates that produced no candidates still need a key
+    empty = [str(d) for d, c in signals.items() if not c]
+    columns["_empty_dates"] = np.array(empty, dtype=str)
+    columns["_fields"] = np.array(fields or [], dtype=str)
+    return columns
+
+
+def columns_to_signals(columns) -> dict[str, list[dict]]:
+    """Rebuild {trade_date: [candidates]} from signals_to_columns output."""
+    fields = [str(f) for f in columns["_fields"]]
+    dates = columns["trade_date"].tolist()
+    values = [columns[f].tolist() for f in fields]
+    signals: dict[str, list[dict]] = {d: [] for d in columns["_empty_dates"].tolist()}
+    for i, date in enumerate(dates):
+        if date not in signals:
+            signals[date] = []
+        signals[date].append({f: v[i] for f, v in zip(fields, values)})
+    return dict(sorted(signals.items()))
+
+
+class SignalCache:
+    """LRU store of generated signals under cache_dir.
+
+    Usage:
+        cache = SignalCache()
+        signals = cache.get_or_generate(daily_data, "st_b2", params, generate_signals)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int | None = None,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fp_data: dict | None = None
+        self._fp: str = ""
+
+    def make_key(self, fingerprint: str, strategy: str, params: dict, source_hash: str = "") -> str:
+        payload = json.dumps(
+            {"data": fingerprint, "strategy": strategy, "source": source_hash, "params": params},
+            sort_keys=True, default=str,
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key: str) -> dict[str, list[dict]] | None:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as columns:
+                signals = columns_to_signals(columns)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            # Truncated or foreign entry: drop it so the miss regenerates it
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return signals
+
+    def put(self, key: str, signals: dict[str, list[dict]]) -> bool:
+        """Store signals; returns False if they cannot be laid out as columns."""
+        columns = signals_to_columns(signals)
+        if columns is None:
+            return False
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **columns)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Drop least recently used entries beyond max_bytes / max_entries."""
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort(reverse=True)
+        total = 0
+        for i, (_, size, path) in enumerate(entries):
+            total += size
+            over_count = self.max_entries is not None and i >= self.max_entries
+            if i > 0 and (total > self.max_bytes or over_count):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink()
+
+    def fingerprint(self, market_data: dict[str, pd.DataFrame]) -> str:
+        """market_data_fingerprint, memoized for the last dict seen.
+
+        Sweeps look up many param sets on one universe; the memo assumes the
+        dict and its frames are not mutated in between.
+        """
+        if market_data is not self._fp_data:
+            self._fp = market_data_fingerprint(market_data)
+            self._fp_data = market_data
+        return self._fp
+
+    def get_or_generate(
+        self,
+        market_data: dict[str, pd.DataFrame],
+        strategy: str,
+        params: dict,
+        generate: Callable[[dict, dict], dict[str, list[dict]]],
+    ) -> dict[str, list[dict]]:
+        """Return cached generate(market_data, params), computing and storing it on a miss."""
+        key = self.make_key(self.fingerprint(market_data), strategy, params, strategy_source_hash(generate))
+        signals = self.get(key)
+        if signals is not None:
+            self.hits += 1
+            return signals
+        self.misses += 1
+        signals = generate(market_data, params)
+        self.put(key, signals)
+        return signals
+
+    def describe(self) -> str:
+        return f"hits={self.hits} misses={self.misses} dir={self.cache_dir}"